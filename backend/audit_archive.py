@@ -0,0 +1,304 @@
+"""
+Audit log archival into compressed per-tenant, per-month segments.
+
+archive_old_logs() moves audit rows older than AUDIT_RETENTION_DAYS out of
+audit_logs into gzip NDJSON segments in S3, recording each segment's tenant,
+month and time bounds in the audit_archive_segments manifest. query_logs()
+serves /audit: it reads the hot table and merges in archived segments that
+overlap the requested range (newest first, stopping once the page is full).
+iter_logs() streams everything matching for /audit/export.
+
+Usage (from backend/):
+    python audit_archive.py          # archive rows older than AUDIT_RETENTION_DAYS
+    python audit_archive.py 30       # archive rows older than 30 days
+"""
+import io
+import sys
+import gzip
+import json
+import uuid
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, delete, and_, or_
+from config import AUDIT_RETENTION_DAYS, AUDIT_ARCHIVE_PREFIX, AUDIT_SEGMENT_MAX_ROWS
+from models import AuditLog, AuditArchiveSegment
+from pagination import MAX_PAGE_SIZE, encode_cursor, decode_cursor, like_pattern
+
+DELETE_CHUNK = 500
+_FIELDS = ["id", "timestamp", "user", "ngo_name", "action", "target", "status", "ip"]
+
+
+def s3_put(key: str, data: bytes):
+    # pylint: disable=import-outside-toplevel
+    from s3_service import get_s3, bucket
+    get_s3().put_object(
+        Bucket=bucket(), Key=key, Body=data,
+        ContentType="application/x-ndjson", ContentEncoding="gzip"
+    )
+
+
+def s3_fetch(key: str) -> bytes:
+    """Segment bytes, via the local download cache when it is enabled."""
+    # pylint: disable=import-outside-toplevel
+    from object_cache import get_object_cache
+    cache = get_object_cache()
+    path = cache.acquire(key) if cache else None
+    if path:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        finally:
+            cache.release(path)
+    from s3_service import get_s3, bucket
+    return get_s3().get_object(Bucket=bucket(), Key=key)["Body"].read()
+
+
+def _utc(value: datetime) -> datetime:
+    """Naive datetimes from SQLite are UTC; make everything aware for comparisons."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _row_dict(row) -> dict:
+    return {f: getattr(row, f) for f in _FIELDS}
+
+
+def _encode_segment(rows: list) -> bytes:
+    buf = io.BytesIO()
+    with gzip.GzipFile(fileobj=buf, mode="wb", mtime=0) as gz:
+        for r in rows:
+            line = json.dumps({**r, "timestamp": r["timestamp"].isoformat()}) + "\n"
+            gz.write(line.encode("utf-8"))
+    return buf.getvalue()
+
+
+def _decode_segment(data: bytes) -> list:
+    rows = []
+    for line in gzip.decompress(data).splitlines():
+        if line:
+            row = json.loads(line)
+            row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+            rows.append(row)
+    return rows
+
+
+def _segment_key(ngo_name: str, month: str) -> str:
+    tenant = quote(ngo_name, safe="")
+    return f"{AUDIT_ARCHIVE_PREFIX}/{tenant}/{month}/{uuid.uuid4().hex}.ndjson.gz"
+
+
+def _write_segment(db, ngo_name: str, month: str, rows: list, put) -> AuditArchiveSegment:
+    """Upload one segment, then record it and delete its rows in one transaction."""
+    data = _encode_segment(rows)
+    key = _segment_key(ngo_name, month)
+    # Upload first: a crash before commit leaves an unreferenced object, never lost rows
+    put(key, data)
+
+    segment = AuditArchiveSegment(
+        ngo_name=ngo_name,
+        month=month,
+        s3_key=key,
+        row_count=len(rows),
+        size_bytes=len(data),
+        min_timestamp=min(r["timestamp"] for r in rows),
+        max_timestamp=max(r["timestamp"] for r in rows)
+    )
+    db.add(segment)
+    ids = [r["id"] for r in rows]
+    for start in range(0, len(ids), DELETE_CHUNK):
+        db.execute(delete(AuditLog).where(AuditLog.id.in_(ids[start:start + DELETE_CHUNK])))
+    db.commit()
+    return segment
+
+
+def archive_old_logs(db, older_than_days: int = AUDIT_RETENTION_DAYS, put=s3_put) -> dict:
+    """
+    Move rows older than the cutoff into segments, one tenant and month at a time.
+
+    Returns:
+        {"segments": n, "rows": n}
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+    tenants = db.execute(
+        select(AuditLog.ngo_name).where(AuditLog.timestamp < cutoff).distinct()
+    ).scalars().all()
+
+    segments = archived = 0
+    for ngo_name in tenants:
+        while True:
+            # Oldest remaining rows via ix_audit_tenant_timestamp; each pass archives
+            # the oldest month in the chunk (or a full chunk of it) and deletes it
+            chunk = db.execute(
+                select(AuditLog)
+                .where(AuditLog.ngo_name == ngo_name)
+                .where(AuditLog.timestamp < cutoff)
+                .order_by(AuditLog.timestamp, AuditLog.id)
+                .limit(AUDIT_SEGMENT_MAX_ROWS)
+            ).scalars().all()
+            if not chunk:
+                break
+
+            month = _utc(chunk[0].timestamp).strftime("%Y-%m")
+            rows = [_row_dict(r) for r in chunk if _utc(r.timestamp).strftime("%Y-%m") == month]
+            db.expunge_all()
+            _write_segment(db, ngo_name, month, rows, put)
+            segments, archived = segments + 1, archived + len(rows)
+
+    return {"segments": segments, "rows": archived}
+
+
+def _newest_first(row: dict):
+    return (-_utc(row["timestamp"]).timestamp(), -row["id"])
+
+
+def _normalize_filters(filters: dict) -> dict:
+    filters = {k: v for k, v in (filters or {}).items() if v}
+    for key in ("since", "until"):
+        if key in filters:
+            filters[key] = _utc(filters[key])
+    return filters
+
+
+def _hot_select(ngo_name: str, filters: dict):
+    """
+    Live-table query for one tenant; action and user use their composite indexes.
+    Selects plain column rows, which skip ORM identity-map bookkeeping.
+    """
+    stmt = select(*(getattr(AuditLog, f) for f in _FIELDS))\
+        .where(AuditLog.ngo_name == ngo_name)  # Tenant isolation
+    if "action" in filters:
+        stmt = stmt.where(AuditLog.action == filters["action"])
+    if "user" in filters:
+        stmt = stmt.where(AuditLog.user == filters["user"])
+    if "target" in filters:
+        stmt = stmt.where(AuditLog.target.ilike(like_pattern(filters["target"]), escape="\\"))
+    if "since" in filters:
+        stmt = stmt.where(AuditLog.timestamp >= filters["since"])
+    if "until" in filters:
+        stmt = stmt.where(AuditLog.timestamp <= filters["until"])
+    return stmt
+
+
+def _matches(row: dict, filters: dict) -> bool:
+    """The _hot_select filters, applied to a row read from an archived segment."""
+    ts = _utc(row["timestamp"])
+    return (
+        row["action"] == filters.get("action", row["action"])
+        and row["user"] == filters.get("user", row["user"])
+        and filters.get("target", "").lower() in row["target"].lower()
+        and ("since" not in filters or ts >= filters["since"])
+        and ("until" not in filters or ts <= filters["until"])
+    )
+
+
+def _segments_select(ngo_name: str, filters: dict, before: datetime = None):
+    stmt = select(AuditArchiveSegment)\
+        .where(AuditArchiveSegment.ngo_name == ngo_name)  # Tenant isolation
+    if "since" in filters:
+        stmt = stmt.where(AuditArchiveSegment.max_timestamp >= filters["since"])
+    if "until" in filters:
+        stmt = stmt.where(AuditArchiveSegment.min_timestamp <= filters["until"])
+    if before:
+        stmt = stmt.where(AuditArchiveSegment.min_timestamp <= before)
+    return stmt
+
+
+async def _read_segment(segment, fetch) -> list:
+    # S3 (or cache) reads are blocking; keep them off the event loop
+    return _decode_segment(await run_in_threadpool(fetch, segment.s3_key))
+
+
+async def query_logs( # pylint: disable=R0913, R0917
+    db, ngo_name: str, limit: int, filters: dict = None, cursor: str = None, fetch=s3_fetch
+):
+    """
+    One newest-first page of a tenant's audit log from the live table plus archived segments.
+
+    filters may hold action, user (exact), target (substring), since and until.
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    filters = _normalize_filters(filters)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    last = None
+    stmt = _hot_select(ngo_name, filters)
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise HTTPException(400, "Invalid cursor")
+        last = (_utc(values[0]), values[1])
+        stmt = stmt.where(or_(
+            AuditLog.timestamp < last[0],
+            and_(AuditLog.timestamp == last[0], AuditLog.id < last[1])
+        ))
+
+    # One extra row tells whether another page exists
+    hot = await db.execute(
+        stmt.order_by(AuditLog.timestamp.desc(), AuditLog.id.desc()).limit(limit + 1)
+    )
+    rows = [r._asdict() for r in hot]
+
+    segments = await db.scalars(
+        _segments_select(ngo_name, filters, last[0] if last else None)
+        .order_by(AuditArchiveSegment.max_timestamp.desc())
+    )
+    for segment in segments.all():
+        if len(rows) > limit:
+            rows.sort(key=_newest_first)
+            # Nothing in this (or any older) segment can make it onto the page
+            if _utc(rows[limit]["timestamp"]) > _utc(segment.max_timestamp):
+                break
+        for r in await _read_segment(segment, fetch):
+            if _matches(r, filters) and (
+                last is None or (_utc(r["timestamp"]), r["id"]) < last
+            ):
+                rows.append(r)
+
+    rows.sort(key=_newest_first)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([_utc(rows[-1]["timestamp"]), rows[-1]["id"]])
+
+
+async def iter_logs(db, ngo_name: str, filters: dict = None, fetch=s3_fetch):
+    """
+    Every matching entry oldest first, for export: archived segments one at a time,
+    then the live table through a server-side cursor. Memory stays bounded by one
+    segment (AUDIT_SEGMENT_MAX_ROWS) regardless of history length.
+    """
+    filters = _normalize_filters(filters)
+    segments = await db.scalars(
+        _segments_select(ngo_name, filters)
+        .order_by(AuditArchiveSegment.min_timestamp, AuditArchiveSegment.id)
+    )
+    for segment in segments.all():
+        rows = [r for r in await _read_segment(segment, fetch) if _matches(r, filters)]
+        rows.sort(key=_newest_first, reverse=True)
+        for r in rows:
+            yield r
+
+    hot = await db.stream(
+        _hot_select(ngo_name, filters)
+        .order_by(AuditLog.timestamp, AuditLog.id)
+        .execution_options(yield_per=1000)
+    )
+    async for r in hot:
+        yield r._asdict()
+
+
+if __name__ == "__main__":
+    # pylint: disable=import-outside-toplevel
+    from database import SessionLocal
+    session = SessionLocal()
+    try:
+        days = int(sys.argv[1]) if len(sys.argv) > 1 else AUDIT_RETENTION_DAYS
+        result = archive_old_logs(session, days)
+        print(f"AUDIT: Archived {result['rows']} rows into {result['segments']} segments")
+    finally:
+        session.close()
@@ -0,0 +1,283 @@
+"""
+Buffered, asynchronous audit log writer.
+
+Request handlers call record(), which only enqueues the entry. A background
+thread drains the queue and writes batches with one multi-row INSERT,
+flushing when a batch is full or AUDIT_FLUSH_INTERVAL has passed.
+
+Delivery is at-least-once: if the queue is full (database slower than the
+request rate) or a batch insert fails, entries are appended to a local
+NDJSON spill file and replayed into the database later. Spill files from
+workers that have exited are adopted and replayed by a live worker. A
+replay interrupted mid-way may insert some rows twice.
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import insert
+from config import (
+    AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_QUEUE_MAX, AUDIT_SPILL_DIR
+)
+from models import AuditLog
+from response_cache import bump_version
+
+_WAKE = object()
+
+
+class AuditSink: # pylint: disable=too-many-instance-attributes
+    """Bounded queue + writer thread with a spill file for overflow and DB failures."""
+
+    def __init__( # pylint: disable=R0913, R0917
+        self, bind, spill_dir: str, batch_size: int = 200, flush_interval: float = 1.0,
+        queue_max: int = 10000, replay_interval: float = 5.0
+    ):
+        self.bind = bind
+        self.spill_dir = spill_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.replay_interval = replay_interval
+        self._queue = queue.Queue(maxsize=queue_max)
+        self._spill_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._closed = False
+        self._next_replay = 0.0
+        self._pid = os.getpid()
+        self._spill_path = os.path.join(spill_dir, f"spill-{self._pid}.ndjson")
+        self.stats = {"enqueued": 0, "written": 0, "spilled": 0, "replayed": 0, "failed_batches": 0}
+        os.makedirs(spill_dir, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="audit-sink", daemon=True)
+        self._thread.start()
+
+    def _count(self, key: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[key] += n
+
+    def snapshot(self) -> dict:
+        with self._stats_lock:
+            return {**self.stats, "queued": self._queue.qsize()}
+
+    def record( # pylint: disable=R0913, R0917
+        self, user: str, ngo_name: str, action: str, target: str, status: str, ip: str = None
+    ):
+        """Queue an audit entry. Never blocks on the database."""
+        entry = {
+            "timestamp": datetime.now(timezone.utc),
+            "user": user,
+            "ngo_name": ngo_name,
+            "action": action,
+            "target": target,
+            "status": status,
+            "ip": ip
+        }
+        if self._closed:
+            self._spill([entry])
+            return
+        try:
+            self._queue.put_nowait(entry)
+            self._count("enqueued")
+        except queue.Full:
+            self._spill([entry])
+
+    def close(self, timeout: float = 10.0):
+        """Flush everything queued; whatever can't be written in time is spilled."""
+        if self._closed:
+            return
+        self._closed = True
+        self._stopping.set()
+        try:
+            self._queue.put_nowait(_WAKE)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        leftover = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _WAKE:
+                leftover.append(item)
+        if leftover:
+            self._spill(leftover)
+
+    # --- writer thread ---
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._write(batch)
+            if not self._stopping.is_set() and time.monotonic() >= self._next_replay:
+                self._next_replay = time.monotonic() + self.replay_interval
+                self._replay_spills()
+
+    def _next_batch(self) -> list:
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if self._stopping.is_set():
+                timeout = 0
+            elif deadline is None:
+                timeout = self.flush_interval
+            else:
+                timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _WAKE:
+                continue
+            batch.append(item)
+            if deadline is None:
+                deadline = time.monotonic() + self.flush_interval
+        return batch
+
+    def _insert(self, rows: list):
+        with self.bind.begin() as conn:
+            conn.execute(insert(AuditLog).values(rows))
+            # Invalidate cached /audit pages of the tenants in this batch
+            for ngo_name in sorted({r["ngo_name"] for r in rows}):
+                bump_version(conn, ngo_name, "audit")
+
+    def _write(self, batch: list):
+        try:
+            self._insert(batch)
+            self._count("written", len(batch))
+        except Exception as e: # pylint: disable=broad-except
+            print(f"AUDIT: Batch insert of {len(batch)} entries failed, spilling: {str(e)}")
+            self._count("failed_batches")
+            self._spill(batch)
+
+    # --- spill files ---
+
+    def _spill(self, entries: list):
+        lines = "".join(json.dumps({
+            **e, "timestamp": e["timestamp"].isoformat()
+        }) + "\n" for e in entries)
+        with self._spill_lock:
+            with open(self._spill_path, "a", encoding="utf-8") as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+        self._count("spilled", len(entries))
+
+    def _claim_spills(self) -> list:
+        """Rename our own spill and any dead worker's files into replay files we own."""
+        own_replay = os.path.join(self.spill_dir, f"replay-{self._pid}.ndjson")
+        with self._spill_lock:
+            if os.path.exists(self._spill_path) and not os.path.exists(own_replay):
+                os.replace(self._spill_path, own_replay)
+
+        for name in os.listdir(self.spill_dir):
+            pid = _owner_pid(name)
+            if pid is None or pid == self._pid or _pid_alive(pid):
+                continue
+            try:
+                os.rename(
+                    os.path.join(self.spill_dir, name),
+                    os.path.join(self.spill_dir, f"replay-{self._pid}-from-{name}")
+                )
+            except FileNotFoundError:
+                continue  # another worker adopted it first
+
+        return sorted(
+            os.path.join(self.spill_dir, name) for name in os.listdir(self.spill_dir)
+            if name == f"replay-{self._pid}.ndjson"
+            or name.startswith(f"replay-{self._pid}-from-")
+        )
+
+    def _replay_spills(self):
+        try:
+            paths = self._claim_spills()
+        except OSError as e:
+            print(f"AUDIT: Could not scan spill directory: {str(e)}")
+            return
+        for path in paths:
+            if not self._replay_file(path):
+                return
+
+    def _replay_file(self, path: str) -> bool:
+        entries = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    entry["timestamp"] = datetime.fromisoformat(entry["timestamp"])
+                    entries.append(entry)
+                except (ValueError, KeyError, TypeError):
+                    print(f"AUDIT: Skipping unreadable spill line in {path}")
+
+        for start in range(0, len(entries), self.batch_size):
+            try:
+                self._insert(entries[start:start + self.batch_size])
+            except Exception as e: # pylint: disable=broad-except
+                print(f"AUDIT: Spill replay paused, database unavailable: {str(e)}")
+                _rewrite(path, entries[start:])
+                return False
+            self._count("replayed", len(entries[start:start + self.batch_size]))
+
+        os.remove(path)
+        return True
+
+
+def _owner_pid(name: str):
+    """pid that wrote a spill-<pid>.ndjson / replay-<pid>... file, else None."""
+    for prefix in ("spill-", "replay-"):
+        if name.startswith(prefix):
+            digits = name[len(prefix):].split("-")[0].split(".")[0]
+            return int(digits) if digits.isdigit() else None
+    return None
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _rewrite(path: str, entries: list):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for e in entries:
+            f.write(json.dumps({**e, "timestamp": e["timestamp"].isoformat()}) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+_sink = None
+_sink_lock = threading.Lock()
+
+def get_audit_sink() -> AuditSink:
+    """Process-wide sink, started on first use and flushed at interpreter exit."""
+    global _sink # pylint: disable=global-statement
+    with _sink_lock:
+        if _sink is None:
+            # pylint: disable=import-outside-toplevel
+            from database import engine
+            _sink = AuditSink(
+                engine, AUDIT_SPILL_DIR, AUDIT_BATCH_SIZE, AUDIT_FLUSH_INTERVAL, AUDIT_QUEUE_MAX
+            )
+            atexit.register(_sink.close)
+        return _sink
+
+
+def record( # pylint: disable=R0913, R0917
+    user: str, ngo_name: str, action: str, target: str, status: str, ip: str = None
+):
+    get_audit_sink().record(user, ngo_name, action, target, status, ip)
+
+
+def shutdown():
+    """Flush the process-wide sink if it was started."""
+    if _sink is not None:
+        _sink.close()
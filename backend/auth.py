@@ -1,11 +1,16 @@
 from datetime import datetime, timedelta
 import jwt
+import time
 import hashlib
 import base64
+import threading
 import bcrypt
-from config import JWT_SECRET, JWT_ALGO
-
-print("DEBUG: Loading auth module with fix v4 - direct bcrypt")
+from typing import Optional
+import config
+from config import (
+    JWT_ALGO, ACCESS_TOKEN_MINUTES, REFRESH_TOKEN_DAYS, TOKEN_VERSION_CACHE_SECONDS,
+    BCRYPT_ROUNDS
+)
 
 
 def _prehash(password: str) -> bytes:
@@ -28,7 +33,7 @@ def _prehash(password: str) -> bytes:
 def hash_password(password: str) -> str:
     """Hash a password using SHA256 + bcrypt."""
     prehashed = _prehash(password)
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(prehashed, salt)
     return hashed.decode('utf-8')
 
@@ -43,16 +48,77 @@ def verify_password(password: str, stored_hash: str) -> bool:
         return False
 
 
-def create_token(email: str) -> str:
+def needs_rehash(stored_hash: str) -> bool:
+    """True when a hash was made with a bcrypt cost other than BCRYPT_ROUNDS."""
+    try:
+        # $2b$<cost>$<salt+hash>
+        return int(stored_hash.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+
+def _encode(user, token_type: str, lifetime: timedelta) -> str:
     payload = {
-        "sub": email,
-        "exp": datetime.utcnow() + timedelta(hours=24)
+        "sub": user.email,
+        "ngo": user.ngo_name,
+        "role": user.role,
+        "ver": user.token_version or 0,
+        "typ": token_type,
+        "exp": datetime.utcnow() + lifetime
     }
-    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGO)
+    # Read per call: the secret comes from Secrets Manager, which import must not wait for
+    return jwt.encode(payload, config.JWT_SECRET, algorithm=JWT_ALGO)
+
+
+def create_token(user) -> str:
+    """
+    Short-lived access token. It carries everything get_current_user needs
+    (email, tenant, role, token version), so requests skip the user lookup.
+    """
+    return _encode(user, "access", timedelta(minutes=ACCESS_TOKEN_MINUTES))
+
+
+def create_refresh_token(user) -> str:
+    """Long-lived token accepted only by /auth/refresh, which re-reads the user."""
+    return _encode(user, "refresh", timedelta(days=REFRESH_TOKEN_DAYS))
+
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Verify signature and expiry and return the claims. Raises jwt.InvalidTokenError."""
+    data = jwt.decode(token, config.JWT_SECRET, algorithms=[JWT_ALGO])
+    if data.get("typ") != token_type or "ver" not in data:
+        raise jwt.InvalidTokenError(f"not an {token_type} token")
+    return data
+
+
+class TokenVersionCache:
+    """
+    Per-worker TTL cache of users' current token versions, so checking a token
+    for revocation costs a database read at most once per user per ttl.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def get(self, email: str) -> Optional[int]:
+        with self._lock:
+            entry = self._versions.get(email)
+            if entry is None:
+                return None
+            if time.monotonic() > entry[1]:
+                del self._versions[email]
+                return None
+            return entry[0]
 
+    def put(self, email: str, version: int):
+        with self._lock:
+            self._versions[email] = (version, time.monotonic() + self.ttl)
 
-def decode_token(token: str) -> str:
-    data = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
-    return data["sub"]
+    def invalidate(self, email: str):
+        with self._lock:
+            self._versions.pop(email, None)
 
 
+token_versions = TokenVersionCache(TOKEN_VERSION_CACHE_SECONDS)
@@ -1,8 +1,27 @@
 import json
-import boto3
-from botocore.exceptions import ClientError
+from functools import lru_cache
 import os
 
+# boto3 is imported on the first fetch, never at import: with a fresh cache a worker
+# starts without it (see secrets_provider.py)
+
+
+@lru_cache(maxsize=None)
+def _client(region_name: str):
+    """One Secrets Manager client per region, reused by every refresh."""
+    # pylint: disable=import-outside-toplevel
+    import boto3
+    from botocore.config import Config
+    return boto3.session.Session().client(
+        service_name='secretsmanager',
+        region_name=region_name,
+        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
+        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY"),
+        # Fail fast on an unreachable endpoint; the secrets provider falls back to its cache
+        config=Config(connect_timeout=2, read_timeout=5, retries={"max_attempts": 2})
+    )
+
+
 def get_secret(secret_name: str, region_name: str = None):
     """
     Retrieves a secret from AWS Secrets Manager.
@@ -15,23 +34,15 @@ def get_secret(secret_name: str, region_name: str = None):
         dict: The secret key-value pairs as a dictionary.
         None: If the secret cannot be retrieved or found.
     """
+    from botocore.exceptions import BotoCoreError, ClientError # pylint: disable=import-outside-toplevel
     if not region_name:
         region_name = os.getenv("AWS_REGION", "eu-north-1")
 
-    # Create a Secrets Manager client
-    session = boto3.session.Session()
-    client = session.client(
-        service_name='secretsmanager',
-        region_name=region_name,
-        aws_access_key_id=os.getenv("AWS_ACCESS_KEY_ID"),
-        aws_secret_access_key=os.getenv("AWS_SECRET_ACCESS_KEY")
-    )
-
     try:
-        get_secret_value_response = client.get_secret_value(
+        get_secret_value_response = _client(region_name).get_secret_value(
             SecretId=secret_name
         )
-    except ClientError as e:
+    except (ClientError, BotoCoreError) as e:
         # For this specific app, we'll just print the error and return None
         # In production, you might want to raise specific exceptions or log errors
         print(f"Error retrieving secret {secret_name}: {e}")
@@ -0,0 +1,96 @@
+"""
+Authenticated requests per second with and without the per-request user lookup.
+
+Drives a trivial authenticated endpoint with N concurrent clients, once with
+the previous dependency (decode the token, then SELECT the user by email) and
+once with the current one (claims from the token, version check from the
+per-worker cache). The endpoint does no other work, so the difference is the
+authentication cost itself.
+
+Usage (from backend/):
+    python -m benchmarks.auth_overhead --concurrency 50 --requests 5000
+"""
+import os
+import sys
+import asyncio
+import argparse
+import tempfile
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+)
+
+# pylint: disable=wrong-import-position
+from fastapi import FastAPI, Depends, Header, HTTPException
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from auth import create_token, decode_token
+from benchmarks.db_load import _drive
+from database import engine, get_async_db
+from dependencies import get_current_user
+from migrations import run_all
+from models import User
+
+TENANT = "Bench NGO"
+EMAIL = "auth-bench@ngo.org"
+
+
+async def _lookup_user(
+    authorization: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    """get_current_user as it was: one SELECT on users per request."""
+    email = decode_token(authorization.replace("Bearer ", ""))["sub"]
+    user = await db.scalar(select(User).where(User.email == email))
+    if not user:
+        raise HTTPException(401, "User not found")
+    return user
+
+
+def _bench_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/lookup")
+    async def lookup(user: User = Depends(_lookup_user)):
+        return {"ngo": user.ngo_name}
+
+    @app.get("/claims")
+    async def claims(user: User = Depends(get_current_user)):
+        return {"ngo": user.ngo_name}
+
+    return app
+
+
+async def _run(args):
+    user = User(email=EMAIL, ngo_name=TENANT, role="admin", token_version=0)
+    token = create_token(user)
+    app = _bench_app()
+    for path in ("/lookup", "/claims"):
+        await _drive(app, path, token, args.concurrency, args.concurrency)
+        result = await _drive(app, path, token, args.concurrency, args.requests)
+        print(f"{path:<8} rps={result['rps']:8.1f} "
+              f"p50={result['p50']:7.1f} ms p99={result['p99']:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    run_all(engine)
+    with engine.begin() as conn:
+        conn.execute(User.__table__.delete().where(User.email == EMAIL))
+        conn.execute(insert(User), [{
+            "email": EMAIL, "ngo_name": TENANT, "password_hash": "-", "role": "admin"
+        }])
+    print(f"database={engine.dialect.name} concurrency={args.concurrency} "
+          f"requests={args.requests}")
+    asyncio.run(_run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Per-row cost of building a file listing response.
+
+Seeds one tenant with the largest --rows count, then times two paths at each
+count: the old one (hydrate FileRecord objects, build dicts, run them through
+jsonable_encoder and the default JSONResponse) and the current one (select the
+listing columns as plain rows, build dicts, FastJSONResponse). Fetch, build and
+encode are timed separately and reported in microseconds per row.
+
+Usage (from backend/):
+    python -m benchmarks.listing_serialization --rows 10000,100000
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault(
+    "DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+)
+
+# pylint: disable=wrong-import-position
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert, select
+
+from database import Base, engine, SessionLocal
+from models import FileRecord
+from responses import FastJSONResponse, orjson
+from routes.file_routes import LISTING_COLUMNS, _listing_item
+
+TENANT = "Bench NGO"
+
+
+def _seed(rows: int):
+    Base.metadata.create_all(bind=engine)
+    base = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        conn.execute(FileRecord.__table__.delete().where(FileRecord.ngo_name == TENANT))
+        conn.execute(insert(FileRecord), [{
+            "id": f"bench_{i:07d}", "name": f"quarterly_report_{i}.pdf", "category": "Finance",
+            "original_size": 1000 + i, "compressed_size": 500, "compression_ratio": 50.0,
+            "compression_method": "seed", "uploaded_by": "bench@ngo.org", "ngo_name": TENANT,
+            "uploaded_at": base + timedelta(seconds=i), "s3_key": f"Finance/bench_{i}.pdf",
+            "status": "active"
+        } for i in range(rows)])
+
+
+def _orm_path(db, rows: int) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    files = db.query(FileRecord)\
+        .filter(FileRecord.ngo_name == TENANT)\
+        .order_by(FileRecord.uploaded_at.desc(), FileRecord.id.desc())\
+        .limit(rows)\
+        .all()
+    timings["fetch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    items = [_listing_item(f) for f in files]
+    timings["build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    JSONResponse(jsonable_encoder({"items": items, "next_cursor": None}))
+    timings["encode"] = time.perf_counter() - start
+    db.expunge_all()
+    return timings
+
+
+def _core_path(db, rows: int) -> dict:
+    timings = {}
+    start = time.perf_counter()
+    files = db.execute(
+        select(*LISTING_COLUMNS)
+        .filter(FileRecord.ngo_name == TENANT)
+        .order_by(FileRecord.uploaded_at.desc(), FileRecord.id.desc())
+        .limit(rows)
+    ).all()
+    timings["fetch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    items = [_listing_item(f) for f in files]
+    timings["build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    FastJSONResponse({"items": items, "next_cursor": None})
+    timings["encode"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=str, default="10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    counts = [int(n) for n in args.rows.split(",")]
+    _seed(max(counts))
+    print(f"encoder={'orjson' if orjson else 'json'}")
+
+    db = SessionLocal()
+    try:
+        for rows in counts:
+            for name, path in (("orm", _orm_path), ("core", _core_path)):
+                # Best of --repeat runs, per stage
+                runs = [path(db, rows) for _ in range(args.repeat)]
+                best = {stage: min(r[stage] for r in runs) for stage in runs[0]}
+                per_row = {stage: best[stage] / rows * 1e6 for stage in best}
+                print(
+                    f"rows={rows:<7} {name:<5} fetch={per_row['fetch']:5.2f} "
+                    f"build={per_row['build']:5.2f} encode={per_row['encode']:5.2f} "
+                    f"total={sum(per_row.values()):5.2f} us/row"
+                )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Import-time profile of the API, from python -X importtime.
+
+Imports main in fresh interpreters, then reports the best total, the modules
+with the largest cumulative cost, and any heavy modules (AWS SDK, imaging,
+PDF) that were imported eagerly instead of on first use. Exits non-zero when
+the best run is over --budget-ms. tests/test_startup.py enforces the same
+budget, both with plain environment settings and with AWS_SECRET_NAME set
+and a warm secrets cache.
+
+Usage (from backend/):
+    python -m benchmarks.startup --runs 5 --budget-ms 1000
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Only needed by specific requests; importing any of them at startup is a regression
+HEAVY_MODULES = ("boto3", "botocore", "PIL", "PyPDF2", "pymupdf", "fitz", "redis")
+
+
+def measure_import(module: str = "main", env: dict = None) -> dict:
+    """
+    Import module in a new interpreter. Returns total_ms, the per-module
+    (name, self_us, cumulative_us) rows and the heavy modules that got loaded.
+    """
+    code = (
+        f"import sys, json, {module}; "
+        f"print(json.dumps(sorted(m for m in {HEAVY_MODULES!r} if m in sys.modules)))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    rows, total_us = [], None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # column header
+        rows.append((name.rstrip(), int(self_us), int(cumulative_us)))
+        if name.strip() == module:
+            total_us = int(cumulative_us)
+    return {
+        "total_ms": total_us / 1000,
+        "modules": rows,
+        "heavy": json.loads(proc.stdout.strip().splitlines()[-1]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=1000.0)
+    args = parser.parse_args()
+
+    runs = [measure_import() for _ in range(args.runs)]
+    best = min(runs, key=lambda r: r["total_ms"])
+    print(f"import main: best={best['total_ms']:.1f} ms "
+          f"worst={max(r['total_ms'] for r in runs):.1f} ms over {args.runs} runs")
+    print(f"heavy modules imported: {', '.join(best['heavy']) or 'none'}")
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for name, self_us, cumulative_us in sorted(
+        best["modules"], key=lambda row: row[2], reverse=True
+    )[:args.top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:8.1f}  {name}")
+
+    if best["total_ms"] > args.budget_ms:
+        print(f"OVER BUDGET: {best['total_ms']:.1f} ms > {args.budget_ms:.0f} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,36 @@
 import os
-import io
 import sys
 import shutil
 import tempfile
 import subprocess
+import threading
 import zlib
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import metrics
 
-import boto3
-from PIL import Image
-from PyPDF2 import PdfReader, PdfWriter
+# Pillow and PyPDF2 are imported where they are used, so the API starts without them
 
-# --- AWS INITIALIZATION ---
-BUCKET_NAME = os.getenv('S3_BUCKET_NAME', 'safekeep-ngo-vault-149575e8')
-s3 = boto3.client('s3')
+# Ghostscript runs out-of-process and Pillow releases the GIL while encoding,
+# so a thread pool gives real parallelism for batch uploads.
+COMPRESSION_WORKERS = int(os.getenv('COMPRESSION_WORKERS', str(min(4, os.cpu_count() or 1))))
+_pool = None
+_pool_lock = threading.Lock()
 
+def get_compression_pool():
+    """Shared executor for compression jobs, created on first use."""
+    global _pool # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=COMPRESSION_WORKERS, thread_name_prefix="compress"
+            )
+            metrics.watch_executor("compression", _pool)
+        return _pool
+
+@lru_cache(maxsize=1)
 def find_ghostscript():
+    """Path to Ghostscript, searched once per process (the Windows fallback walks Program Files)."""
     possible_paths = ['gs', 'gswin64c.exe', 'gswin32c.exe',
                       'C:\\Program Files\\gs\\gs10.00.0\\bin\\gswin64c.exe',
                       'C:\\Program Files (x86)\\gs\\gs9.53.3\\bin\\gswin32c.exe',
@@ -54,25 +70,25 @@ def verify_ghostscript():
     except Exception as e: # pylint: disable=broad-except
         return False, f"Error: {str(e)}"
 
-def compress_pdf_fallback(pdf_bytes):
+# The compressors read the upload from src_path and write their output to dst_path, so
+# memory use does not grow with the file (Pillow still decodes an image in memory).
+# Each returns (method, ratio); only a positive ratio means dst_path holds the result.
+
+def compress_pdf_fallback(src_path, dst_path):
     """Fallback PDF compression using pikepdf (better than PyPDF2)"""
-    original_size = len(pdf_bytes)
+    original_size = os.path.getsize(src_path)
     print(f"COMPRESSION: Using pikepdf fallback for {original_size} bytes")
     
     try:
         import pikepdf
         
-        # Open PDF from bytes
-        input_pdf = io.BytesIO(pdf_bytes)
-        output_pdf = io.BytesIO()
-        
-        with pikepdf.open(input_pdf) as pdf:
+        with metrics.compression_engine("pikepdf"), pikepdf.open(src_path) as pdf:
             # Remove unreferenced resources
             pdf.remove_unreferenced_resources()
             
             # Save with aggressive compression
             pdf.save(
-                output_pdf,
+                dst_path,
                 compress_streams=True,
                 stream_decode_level=pikepdf.StreamDecodeLevel.generalized,
                 object_stream_mode=pikepdf.ObjectStreamMode.generate,
@@ -80,18 +96,17 @@ def compress_pdf_fallback(pdf_bytes):
                 deterministic_id=True
             )
         
-        compressed_data = output_pdf.getvalue()
-        compressed_size = len(compressed_data)
+        compressed_size = os.path.getsize(dst_path)
         
         # Calculate actual savings
         if compressed_size < original_size:
             saved_bytes = original_size - compressed_size
             ratio = (saved_bytes / original_size) * 100
             print(f"COMPRESSION: pikepdf SUCCESS - Original: {original_size}, Compressed: {compressed_size}, Saved: {ratio:.1f}%")
-            return (compressed_data, "pikepdf Optimized", ratio)
+            return ("pikepdf Optimized", ratio)
         else:
             print(f"COMPRESSION: pikepdf - No improvement (Original: {original_size}, Result: {compressed_size})")
-            return (pdf_bytes, "Already Optimized", 0)
+            return ("Already Optimized", 0)
         
     except Exception as e: # pylint: disable=broad-except
         print(f"COMPRESSION: pikepdf failed: {str(e)}, trying PyPDF2...")
@@ -99,36 +114,36 @@ def compress_pdf_fallback(pdf_bytes):
         # Final fallback to PyPDF2
         try:
             from PyPDF2 import PdfReader, PdfWriter
-            reader = PdfReader(io.BytesIO(pdf_bytes))
-            writer = PdfWriter()
-            
-            for page in reader.pages:
-                page.compress_content_streams()
-                writer.add_page(page)
-            
-            output = io.BytesIO()
-            writer.write(output)
-            compressed_data = output.getvalue()
-            compressed_size = len(compressed_data)
+            with metrics.compression_engine("pypdf2"):
+                reader = PdfReader(src_path)
+                writer = PdfWriter()
+
+                for page in reader.pages:
+                    page.compress_content_streams()
+                    writer.add_page(page)
+
+                with open(dst_path, 'wb') as output:
+                    writer.write(output)
+            compressed_size = os.path.getsize(dst_path)
             
             if compressed_size < original_size:
                 ratio = ((original_size - compressed_size) / original_size) * 100
                 print(f"COMPRESSION: PyPDF2 fallback - Saved: {ratio:.1f}%")
-                return (compressed_data, "PyPDF2 Optimized", ratio)
-            return (pdf_bytes, "Already Optimized", 0)
+                return ("PyPDF2 Optimized", ratio)
+            return ("Already Optimized", 0)
         except Exception as e2:
             print(f"COMPRESSION: All methods failed: {str(e2)}")
-            return pdf_bytes, "Compression Failed", 0
+            return "Compression Failed", 0
 
-def compress_pdf_with_ghostscript(pdf_bytes, quality_level="medium"): # pylint: disable=too-many-locals
-    original_size = len(pdf_bytes)
+def compress_pdf_with_ghostscript(src_path, dst_path, quality_level="medium"): # pylint: disable=too-many-locals
+    original_size = os.path.getsize(src_path)
     size_mb = original_size / (1024 * 1024)
     print(f"COMPRESSION: Starting PDF compression for {size_mb:.1f} MB, quality={quality_level}")
     
     # Skip very small files (under 100KB) - not worth compressing
     if original_size < 100 * 1024:
         print(f"COMPRESSION: File too small ({original_size} bytes), skipping")
-        return pdf_bytes, "Too Small", 0
+        return "Too Small", 0
     
     # Log warning for large files
     if size_mb > 10:
@@ -137,18 +152,9 @@ def compress_pdf_with_ghostscript(pdf_bytes, quality_level="medium"): # pylint:
     gs_path = find_ghostscript()
     if not gs_path:
         print("COMPRESSION: Ghostscript not found, using fallback")
-        return compress_pdf_fallback(pdf_bytes)
-    
-    temp_dir = tempfile.mkdtemp()
-    input_path, output_path = (
-        os.path.join(temp_dir, "input.pdf"),
-        os.path.join(temp_dir, "output.pdf")
-    )
+        return compress_pdf_fallback(src_path, dst_path)
     
     try:
-        with open(input_path, 'wb') as f:
-            f.write(pdf_bytes)
-        
         q_map = {"low": ("/printer", 200), "medium": ("/ebook", 150), "high": ("/screen", 72)}
         pdf_settings, dpi = q_map.get(quality_level, ("/ebook", 150))
         
@@ -163,30 +169,26 @@ def compress_pdf_with_ghostscript(pdf_bytes, quality_level="medium"): # pylint:
                       '-dPreserveEPSInfo=false', '-dPreserveOPIComments=false',
                       '-dPreserveOverprintSettings=false', '-dUCRandBGInfo=/Remove',
                       '-dUseCIEColor=false', '-dNOSAFER', '-dNOPAUSE', '-dBATCH', '-dQUIET',
-                      f'-sOutputFile={output_path}', input_path]
+                      f'-sOutputFile={dst_path}', src_path]
         
         print(f"COMPRESSION: Running Ghostscript with command: {' '.join(gs_command[:5])}...")
         import time
         start_time = time.time()
-        result = subprocess.run(gs_command, capture_output=True, text=True, timeout=300, check=False)
+        with metrics.compression_engine("ghostscript"):
+            result = subprocess.run(gs_command, capture_output=True, text=True, timeout=300, check=False)
         elapsed = time.time() - start_time
         print(f"COMPRESSION: Ghostscript completed in {elapsed:.1f} seconds, return code: {result.returncode}")
         
-        if result.returncode == 0 and os.path.exists(output_path):
-            with open(output_path, 'rb') as f:
-                compressed_data = f.read()
-            
-            compressed_size = len(compressed_data)
+        if result.returncode == 0 and os.path.exists(dst_path):
+            compressed_size = os.path.getsize(dst_path)
             ratio = ((original_size - compressed_size) / original_size) * 100
             
             print(f"COMPRESSION: Ghostscript SUCCESS - Original: {original_size}, Compressed: {compressed_size}, Ratio: {ratio:.1f}%")
             
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            
             # Return compressed if any improvement
             if ratio > 0 and compressed_size < original_size:
-                return (compressed_data, f"Ghostscript {quality_level}", ratio)
-            return (pdf_bytes, "Already Optimized", 0)
+                return (f"Ghostscript {quality_level}", ratio)
+            return ("Already Optimized", 0)
         
         print(f"COMPRESSION: Ghostscript failed with code {result.returncode}")
         if result.stderr:
@@ -194,59 +196,100 @@ def compress_pdf_with_ghostscript(pdf_bytes, quality_level="medium"): # pylint:
         if result.stdout:
             print(f"COMPRESSION: Ghostscript stdout: {result.stdout[:1000]}")
         
-        shutil.rmtree(temp_dir, ignore_errors=True)
-        return compress_pdf_fallback(pdf_bytes)
+        return compress_pdf_fallback(src_path, dst_path)
         
     except subprocess.TimeoutExpired:
         print(f"COMPRESSION: Ghostscript TIMEOUT after 300 seconds!")
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        return compress_pdf_fallback(pdf_bytes)
+        return compress_pdf_fallback(src_path, dst_path)
         
     except Exception as e: # pylint: disable=broad-except
         print(f"COMPRESSION: Exception during Ghostscript: {str(e)}")
-        if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir, ignore_errors=True)
-        return compress_pdf_fallback(pdf_bytes)
+        return compress_pdf_fallback(src_path, dst_path)
 
-def compress_image_really(image_bytes, quality_level="medium"):
-    original_size = len(image_bytes)
+def compress_image_really(src_path, dst_path, quality_level="medium"):
+    original_size = os.path.getsize(src_path)
     print(f"COMPRESSION: Starting image compression for {original_size} bytes, quality={quality_level}")
     
     try:
-        img = Image.open(io.BytesIO(image_bytes))
-        print(f"COMPRESSION: Image format={img.format}, size={img.size}, mode={img.mode}")
-        
-        # Skip very small images
-        if original_size < 50 * 1024:
-            print(f"COMPRESSION: Image too small ({original_size} bytes), skipping")
-            return image_bytes, "Too Small", 0
-        
-        q = {"low": 85, "medium": 70, "high": 50}.get(quality_level, 70)
-        
-        output = io.BytesIO()
-        
-        # Convert to RGB if needed
-        if img.mode in ('RGBA', 'P', 'LA'):
-            img = img.convert('RGB')
-        elif img.mode != 'RGB':
-            img = img.convert('RGB')
-        
-        # Save as optimized JPEG
-        img.save(output, format='JPEG', quality=q, optimize=True)
-        compressed_data = output.getvalue()
+        from PIL import Image # pylint: disable=import-outside-toplevel
+        with Image.open(src_path) as img:
+            print(f"COMPRESSION: Image format={img.format}, size={img.size}, mode={img.mode}")
+            
+            # Skip very small images
+            if original_size < 50 * 1024:
+                print(f"COMPRESSION: Image too small ({original_size} bytes), skipping")
+                return "Too Small", 0
+            
+            q = {"low": 85, "medium": 70, "high": 50}.get(quality_level, 70)
+            
+            # Convert to RGB if needed
+            if img.mode in ('RGBA', 'P', 'LA'):
+                img = img.convert('RGB')
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            
+            # Save as optimized JPEG
+            with metrics.compression_engine("pillow"):
+                img.save(dst_path, format='JPEG', quality=q, optimize=True)
         
-        compressed_size = len(compressed_data)
+        compressed_size = os.path.getsize(dst_path)
         ratio = ((original_size - compressed_size) / original_size) * 100
         
         print(f"COMPRESSION: Image result - Original: {original_size}, Compressed: {compressed_size}, Ratio: {ratio:.1f}%")
         
         # Return compressed if any improvement
         if ratio > 0 and compressed_size < original_size:
-            return (compressed_data, f"Image {quality_level}", ratio)
-        return (image_bytes, "Already Optimized", 0)
+            return (f"Image {quality_level}", ratio)
+        return ("Already Optimized", 0)
         
     except Exception as e: # pylint: disable=broad-except
         print(f"COMPRESSION: Image compression failed: {str(e)}")
-        return image_bytes, "Compression Failed", 0
+        return "Compression Failed", 0
+
+
+IMAGE_EXTENSIONS = ["jpg", "jpeg", "png", "gif", "bmp", "tiff"]
 
+def compress_upload_file(src_path, file_name, compression_level="medium", work_dir=None):
+    """Pick the compressor for a file on disk by extension.
+
+    Returns (output_path, method, ratio, content_type). output_path is a new
+    temporary file in work_dir that the caller removes, or src_path itself
+    when compression saved nothing.
+    """
+    ext = file_name.lower().split(".")[-1]
+    level = compression_level.lower()
+
+    if ext == "pdf":
+        compress, content_type = compress_pdf_with_ghostscript, "application/pdf"
+    elif ext in IMAGE_EXTENSIONS:
+        compress = compress_image_really
+        content_type = f"image/{ext}" if ext != "jpg" else "image/jpeg"
+    else:
+        return src_path, "No Compression", 0, "application/octet-stream"
+
+    fd, dst_path = tempfile.mkstemp(prefix="safekeep-compressed-", dir=work_dir)
+    os.close(fd)
+    try:
+        method, ratio = compress(src_path, dst_path, level)
+    except BaseException:
+        os.remove(dst_path)
+        raise
+    if ratio > 0:
+        return dst_path, method, ratio, content_type
+    os.remove(dst_path)
+    return src_path, method, ratio, content_type
+
+def compress_upload(file_bytes, file_name, compression_level="medium"):
+    """In-memory form of compress_upload_file, for small payloads such as the warm-up canaries.
+
+    Returns (compressed_data, method, ratio, content_type).
+    """
+    with tempfile.TemporaryDirectory(prefix="safekeep-compress-") as work_dir:
+        src_path = os.path.join(work_dir, "input")
+        with open(src_path, "wb") as f:
+            f.write(file_bytes)
+        out_path, method, ratio, content_type = compress_upload_file(
+            src_path, file_name, compression_level, work_dir
+        )
+        with open(out_path, "rb") as f:
+            return f.read(), method, ratio, content_type
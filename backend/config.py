@@ -1,22 +1,46 @@
 import os
+import tempfile
+import threading
 
 # --- AWS Secrets Manager Integration ---
-try:
-    from aws_secrets import get_secret
-except ImportError:
-    # Fallback if aws_secrets.py is missing or dependencies fail
-    def get_secret(*args, **kwargs): return None
-
+# Secret-backed settings are resolved on access through a provider with an
+# encrypted local cache (see secrets_provider.py), so importing config costs no
+# network call and a warm restart needs none at all. JWT_SECRET and
+# S3_BUCKET_NAME are looked up on every access, so a rotation the provider
+# refreshes reaches running workers; everything reading them does so per call.
 AWS_SECRET_NAME = os.getenv("AWS_SECRET_NAME")
-_secrets = {}
+SECRETS_CACHE_PATH = os.getenv(
+    "SECRETS_CACHE_PATH", os.path.join(tempfile.gettempdir(), "safekeep-secrets.cache")
+)
+SECRETS_CACHE_KEY = os.getenv("SECRETS_CACHE_KEY")  # Fernet key; unset keeps secrets in memory
+SECRETS_TTL_SECONDS = float(os.getenv("SECRETS_TTL_SECONDS", "3600"))
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_secrets_provider():
+    """The provider for AWS_SECRET_NAME, or None when no secret is configured."""
+    global _provider # pylint: disable=global-statement
+    if _provider is not None or not AWS_SECRET_NAME:
+        return _provider
+    # One provider per process: concurrent first reads must not start two refreshers
+    with _provider_lock:
+        if _provider is None:
+            # pylint: disable=import-outside-toplevel
+            from secrets_provider import SecretsProvider
+            try:
+                from aws_secrets import get_secret
+            except ImportError:
+                # Fallback if aws_secrets.py is missing or dependencies fail
+                def get_secret(*args, **kwargs): return None
+            print(f"Loading configuration from AWS Secrets Manager: {AWS_SECRET_NAME}")
+            _provider = SecretsProvider(
+                lambda: get_secret(AWS_SECRET_NAME), SECRETS_CACHE_PATH, SECRETS_CACHE_KEY,
+                SECRETS_TTL_SECONDS
+            )
+    return _provider
 
-if AWS_SECRET_NAME:
-    print(f"Loading configuration from AWS Secrets Manager: {AWS_SECRET_NAME}")
-    _fetched = get_secret(AWS_SECRET_NAME)
-    if _fetched:
-        _secrets = _fetched
-    else:
-        print("Warning: Failed to fetch secrets, falling back to environment variables.")
 
 # --- Configuration Variables ---
 # Priority: Secrets Manager > Environment Variables > Defaults
@@ -24,10 +48,132 @@ if AWS_SECRET_NAME:
 AWS_ACCESS_KEY_ID = os.getenv("AWS_ACCESS_KEY_ID")
 AWS_SECRET_ACCESS_KEY = os.getenv("AWS_SECRET_ACCESS_KEY")
 AWS_REGION = os.getenv("AWS_REGION", "eu-north-1")
-S3_BUCKET_NAME = _secrets.get("S3_BUCKET_NAME", os.getenv("S3_BUCKET_NAME"))
 
-# Database (optional for now)
-DATABASE_URL = _secrets.get("DATABASE_URL", os.getenv("DATABASE_URL", "sqlite:///./safekeep.db"))
+# Resolved lazily by __getattr__ below
+_SECRET_SETTINGS = {
+    "S3_BUCKET_NAME": lambda: os.getenv("S3_BUCKET_NAME"),
+    # Database (optional for now)
+    "DATABASE_URL": lambda: os.getenv("DATABASE_URL", "sqlite:///./safekeep.db"),
+    "JWT_SECRET": lambda: os.getenv("JWT_SECRET", "CHANGE_ME_SUPER_SECRET"),
+}
+
+
+# database.py builds its engines from the environment at import, so the URL is read
+# once here and a new one needs a restart
+_FIXED_SETTINGS = ("DATABASE_URL",)
+
+
+def __getattr__(name):
+    if name not in _SECRET_SETTINGS:
+        raise AttributeError(f"module 'config' has no attribute '{name}'")
+    provider = get_secrets_provider()
+    value = provider.get(name) if provider else None
+    if value is None:
+        value = _SECRET_SETTINGS[name]()
+    if name in _FIXED_SETTINGS:
+        globals()[name] = value  # later lookups skip __getattr__
+    return value
+
 
-JWT_SECRET = _secrets.get("JWT_SECRET", os.getenv("JWT_SECRET", "CHANGE_ME_SUPER_SECRET"))
 JWT_ALGO = "HS256"
+
+# Access tokens carry the user's claims and are short-lived; refresh tokens renew them.
+# A revoked token keeps working on a worker for at most TOKEN_VERSION_CACHE_SECONDS.
+ACCESS_TOKEN_MINUTES = int(os.getenv("ACCESS_TOKEN_MINUTES", "15"))
+REFRESH_TOKEN_DAYS = int(os.getenv("REFRESH_TOKEN_DAYS", "7"))
+TOKEN_VERSION_CACHE_SECONDS = float(os.getenv("TOKEN_VERSION_CACHE_SECONDS", "30"))
+
+# Password hashing (see login_guard.py). Raising BCRYPT_ROUNDS rehashes passwords on next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "16"))
+# Login attempts allowed in a burst, then refilled per minute: per address, per account
+# from one address, and per account from all addresses together
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "10"))
+LOGIN_ACCOUNT_BURST = int(os.getenv("LOGIN_ACCOUNT_BURST", "5"))
+LOGIN_ACCOUNT_PER_MINUTE = float(os.getenv("LOGIN_ACCOUNT_PER_MINUTE", "5"))
+LOGIN_ACCOUNT_TOTAL_BURST = int(os.getenv("LOGIN_ACCOUNT_TOTAL_BURST", "50"))
+LOGIN_ACCOUNT_TOTAL_PER_MINUTE = float(os.getenv("LOGIN_ACCOUNT_TOTAL_PER_MINUTE", "30"))
+
+# Startup warm-up (see warmup.py); /ready answers 503 until it has finished
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() in ("1", "true", "yes")
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "2"))
+WARMUP_STAGE_TIMEOUT = float(os.getenv("WARMUP_STAGE_TIMEOUT", "30"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+
+# File ids are this prefix plus a time-sortable ULID (see ids.py)
+FILE_ID_PREFIX = "file_"
+
+# Direct browser-to-S3 uploads
+DIRECT_UPLOAD_PREFIX = "incoming/direct"
+DIRECT_UPLOAD_MAX_BYTES = int(os.getenv("DIRECT_UPLOAD_MAX_BYTES", str(500 * 1024 * 1024)))
+DIRECT_UPLOAD_EXPIRY = int(os.getenv("DIRECT_UPLOAD_EXPIRY", "900"))
+
+# Resumable chunked uploads (local scratch; use a shared volume for multi-instance)
+UPLOAD_SCRATCH_DIR = os.getenv(
+    "UPLOAD_SCRATCH_DIR", os.path.join(tempfile.gettempdir(), "safekeep-uploads")
+)
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_SESSION_TTL = int(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+# Sessions preallocate their declared size on disk, so it is capped like a direct upload
+UPLOAD_SESSION_MAX_BYTES = int(os.getenv("UPLOAD_SESSION_MAX_BYTES", str(DIRECT_UPLOAD_MAX_BYTES)))
+
+# Streaming ZIP export
+EXPORT_PREFETCH_WINDOW = int(os.getenv("EXPORT_PREFETCH_WINDOW", "4"))
+EXPORT_MAX_FILES = int(os.getenv("EXPORT_MAX_FILES", "5000"))
+
+# Multi-file batch uploads
+BATCH_UPLOAD_MAX_FILES = int(os.getenv("BATCH_UPLOAD_MAX_FILES", "200"))
+
+# Local read-through cache for downloads (OBJECT_CACHE_MAX_BYTES=0 disables it)
+OBJECT_CACHE_DIR = os.getenv(
+    "OBJECT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "safekeep-object-cache")
+)
+OBJECT_CACHE_MAX_BYTES = int(os.getenv("OBJECT_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+OBJECT_CACHE_REVALIDATE_SECONDS = int(os.getenv("OBJECT_CACHE_REVALIDATE_SECONDS", "300"))
+
+# Full-text search: cap on extracted document text stored per file
+SEARCH_MAX_CONTENT_CHARS = int(os.getenv("SEARCH_MAX_CONTENT_CHARS", "200000"))
+
+# Buffered audit writer (spill dir should be on a persistent volume in production)
+AUDIT_BATCH_SIZE = int(os.getenv("AUDIT_BATCH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "1.0"))
+AUDIT_QUEUE_MAX = int(os.getenv("AUDIT_QUEUE_MAX", "10000"))
+AUDIT_SPILL_DIR = os.getenv(
+    "AUDIT_SPILL_DIR", os.path.join(tempfile.gettempdir(), "safekeep-audit-spill")
+)
+
+# Audit archival: rows older than the retention window move to S3 segments
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "90"))
+AUDIT_ARCHIVE_PREFIX = os.getenv("AUDIT_ARCHIVE_PREFIX", "archive/audit")
+AUDIT_SEGMENT_MAX_ROWS = int(os.getenv("AUDIT_SEGMENT_MAX_ROWS", "50000"))
+
+# Database connection pool (pre-ping/recycle guard against connections the server dropped)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# SQLite fallback: WAL lets readers run alongside the single writer
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+# Read replica routing (DATABASE_REPLICA_URL enables it; see db_router.py)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "10"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "5"))
+
+# Tenant-scoped cache for listing responses (RESPONSE_CACHE_MAX_BYTES=0 disables it)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "")
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "600"))
+
+# Request profiling (see profiler.py). Admins send X-Profile: 1 or ?profile=1;
+# PROFILE_SAMPLE_RATE also profiles that fraction of all requests (0 disables it).
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "safekeep-profiles"))
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
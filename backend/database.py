@@ -1,6 +1,12 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import metrics
+from config import (
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    SQLITE_BUSY_TIMEOUT_MS, SQLITE_MMAP_SIZE, SQLITE_CACHE_SIZE_KB
+)
 
 # Get DATABASE_URL from environment
 DB_URL = os.getenv("DATABASE_URL", "sqlite:///./safekeep.db")
@@ -15,12 +21,106 @@ elif DB_URL.startswith("postgresql://"):
 else:
     print(f"DATABASE: Using SQLite (data will NOT persist on redeploy!)")
 
-connect_args = {"check_same_thread": False} if DB_URL.startswith("sqlite") else {}
+# Optional read replica (a streaming Postgres standby, or a copy of the SQLite file)
+REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+if REPLICA_URL.startswith("postgres://"):
+    REPLICA_URL = REPLICA_URL.replace("postgres://", "postgresql://", 1)
+if REPLICA_URL:
+    print("DATABASE: Routing list/search/audit/stats reads to a replica")
 
-engine = create_engine(DB_URL, connect_args=connect_args)
+IS_SQLITE = DB_URL.startswith("sqlite")
+connect_args = {"check_same_thread": False} if IS_SQLITE else {}
+
+def _pool_options(url: str) -> dict:
+    # In-memory SQLite uses a single shared connection; the pool cannot be sized
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/") == "sqlite:"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def _sqlite_pragmas(dbapi_connection, _connection_record):
+    """Per-connection SQLite tuning so concurrent writers wait instead of failing."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    # Durable at checkpoints; only the last transactions can be lost on power failure
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    # Negative cache_size is in KiB rather than pages
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.close()
+
+engine = create_engine(DB_URL, connect_args=connect_args, **_pool_options(DB_URL))
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False) # pylint: disable=invalid-name
 Base = declarative_base()
 
+def _async_url(url: str) -> str:
+    """Same database through its asyncio driver (asyncpg / aiosqlite)."""
+    if url.startswith("postgresql://"):
+        # asyncpg takes ssl=, not libpq's sslmode=
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1).replace("sslmode=", "ssl=")
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    return url
+
+# Async routes use this engine; background threads, scripts and sync routes use the one above
+async_engine = create_async_engine(_async_url(DB_URL), **_pool_options(DB_URL))
+AsyncSessionLocal = async_sessionmaker( # pylint: disable=invalid-name
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
+
+replica_engine = async_replica_engine = None
+ReplicaSessionLocal = AsyncReplicaSessionLocal = None # pylint: disable=invalid-name
+if REPLICA_URL:
+    replica_engine = create_engine(
+        REPLICA_URL,
+        connect_args={"check_same_thread": False} if REPLICA_URL.startswith("sqlite") else {},
+        **_pool_options(REPLICA_URL)
+    )
+    async_replica_engine = create_async_engine(
+        _async_url(REPLICA_URL), **_pool_options(REPLICA_URL)
+    )
+    ReplicaSessionLocal = sessionmaker( # pylint: disable=invalid-name
+        bind=replica_engine, autoflush=False, autocommit=False
+    )
+    AsyncReplicaSessionLocal = async_sessionmaker( # pylint: disable=invalid-name
+        bind=async_replica_engine, autoflush=False, expire_on_commit=False
+    )
+
+for _engine in (engine, async_engine, replica_engine, async_replica_engine):
+    if _engine is not None and _engine.dialect.name == "sqlite":
+        event.listen(getattr(_engine, "sync_engine", _engine), "connect", _sqlite_pragmas)
+
+for _name, _engine in (
+    ("primary", engine), ("primary", async_engine),
+    ("replica", replica_engine), ("replica", async_replica_engine)
+):
+    if _engine is not None:
+        metrics.instrument_engine(_name, _engine)
+
+def pool_stats() -> dict:
+    """Checked-in/out and overflow counts for each engine's connection pool."""
+    stats = {}
+    engines = {
+        "sync": engine, "async": async_engine,
+        "replica_sync": replica_engine, "replica_async": async_replica_engine,
+    }
+    for name, pool in ((n, e.pool) for n, e in engines.items() if e is not None):
+        stats[name] = {"class": type(pool).__name__}
+        if hasattr(pool, "checkedout"):
+            stats[name].update({
+                "size": pool.size(),
+                "checked_in": pool.checkedin(),
+                "checked_out": pool.checkedout(),
+                "overflow": pool.overflow(),
+            })
+    return stats
+
 def get_db():
     db = SessionLocal()
     try:
@@ -28,3 +128,7 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
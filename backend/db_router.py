@@ -0,0 +1,163 @@
+"""
+Read-replica routing for read-only endpoints.
+
+When DATABASE_REPLICA_URL is set, list, search, audit and stats reads get a
+replica session from get_read_db()/get_sync_read_db(); everything else
+stays on the primary. A tenant whose session committed a change in the last
+READ_YOUR_WRITES_SECONDS reads from the primary so it sees its own write,
+and all reads fall back to the primary while the replica is unreachable or
+more than REPLICA_MAX_LAG_SECONDS behind. A background thread measures the
+lag every REPLICA_LAG_CHECK_INTERVAL seconds.
+
+Writes are noticed through ORM session events, so any commit that touches a
+row with an ngo_name opens the window. The window is tracked per worker
+process; another worker may serve that tenant from the replica, which is at
+most REPLICA_MAX_LAG_SECONDS stale.
+"""
+import time
+import threading
+from typing import Optional
+from fastapi import Depends
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+from config import READ_YOUR_WRITES_SECONDS, REPLICA_MAX_LAG_SECONDS, REPLICA_LAG_CHECK_INTERVAL
+from database import (
+    SessionLocal, AsyncSessionLocal, ReplicaSessionLocal, AsyncReplicaSessionLocal, replica_engine
+)
+from dependencies import get_current_user
+from models import User
+
+# Seconds since the last replayed transaction, 0 when the standby has replayed everything
+# it received (an idle primary otherwise looks like growing lag) or is not in recovery
+PG_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END"
+)
+
+
+class ReplicaRouter:
+    """Decides per tenant whether a read may go to the replica."""
+
+    def __init__(
+        self, replica, window: float = 5.0, max_lag: float = 10.0, check_interval: float = 5.0
+    ):
+        self.replica = replica
+        self.window = window
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag: Optional[float] = None  # None until measured, or while the replica is down
+        self._last_write = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+        self.stats = {"replica_reads": 0, "primary_reads": 0}
+
+    def start(self):
+        self.check_lag()
+        self._thread = threading.Thread(target=self._run, name="replica-lag", daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stopping.set()
+
+    def _run(self):
+        while not self._stopping.wait(self.check_interval):
+            self.check_lag()
+
+    def check_lag(self) -> Optional[float]:
+        try:
+            with self.replica.connect() as conn:
+                if self.replica.dialect.name == "postgresql":
+                    self.lag = float(conn.execute(PG_LAG_SQL).scalar() or 0)
+                else:
+                    # A SQLite copy has no replication stream; only check it answers
+                    conn.execute(text("SELECT 1"))
+                    self.lag = 0.0
+        except Exception as e: # pylint: disable=broad-except
+            if self.lag is not None:
+                print(f"REPLICA: Unavailable, reading from primary: {e}")
+            self.lag = None
+        return self.lag
+
+    def note_write(self, ngo_name: str):
+        with self._lock:
+            self._last_write[ngo_name] = time.monotonic()
+
+    def use_replica(self, ngo_name: str) -> bool:
+        with self._lock:
+            wrote = self._last_write.get(ngo_name)
+            if wrote is not None and time.monotonic() - wrote > self.window:
+                del self._last_write[ngo_name]
+                wrote = None
+            ok = wrote is None and self.lag is not None and self.lag <= self.max_lag
+            self.stats["replica_reads" if ok else "primary_reads"] += 1
+        return ok
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats, "lag_seconds": self.lag,
+                "tenants_in_write_window": len(self._last_write)
+            }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+def get_replica_router() -> Optional[ReplicaRouter]:
+    """Process-wide router, started on first use. None when no replica is configured."""
+    global _router # pylint: disable=global-statement
+    if replica_engine is None:
+        return None
+    with _router_lock:
+        if _router is None:
+            _router = ReplicaRouter(
+                replica_engine, READ_YOUR_WRITES_SECONDS, REPLICA_MAX_LAG_SECONDS,
+                REPLICA_LAG_CHECK_INTERVAL
+            )
+            _router.start()
+        return _router
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_tenants(session, _flush_context):
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        ngo_name = getattr(obj, "ngo_name", None)
+        if ngo_name:
+            session.info.setdefault("written_tenants", set()).add(ngo_name)
+
+
+@event.listens_for(Session, "after_commit")
+def _open_write_windows(session):
+    tenants = session.info.pop("written_tenants", None)
+    router = get_replica_router() if tenants else None
+    if router:
+        for ngo_name in tenants:
+            router.note_write(ngo_name)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_written_tenants(session):
+    session.info.pop("written_tenants", None)
+
+
+def read_session_factory(ngo_name: str, asynchronous: bool = True):
+    """Session factory for a read on behalf of ngo_name: replica when safe, else primary."""
+    router = get_replica_router()
+    if router and router.use_replica(ngo_name):
+        return AsyncReplicaSessionLocal if asynchronous else ReplicaSessionLocal
+    return AsyncSessionLocal if asynchronous else SessionLocal
+
+
+async def get_read_db(current_user: User = Depends(get_current_user)):
+    async with read_session_factory(current_user.ngo_name)() as db:
+        yield db
+
+
+def get_sync_read_db(current_user: User = Depends(get_current_user)):
+    db = read_session_factory(current_user.ngo_name, asynchronous=False)()
+    try:
+        yield db
+    finally:
+        db.close()
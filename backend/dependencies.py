@@ -2,20 +2,39 @@
 Authentication dependencies for FastAPI routes.
 Extracts user information from JWT tokens.
 """
-from fastapi import Depends, HTTPException, Header
-from sqlalchemy.orm import Session
+from fastapi import HTTPException, Header
+from sqlalchemy import select
 from typing import Optional
-from database import get_db
+from database import AsyncSessionLocal
 from models import User
-from auth import decode_token
+from auth import decode_token, token_versions
 
-def get_current_user(
-    authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
-) -> User:
+async def verified_claims(token: str) -> dict:
+    """Claims of a valid token that has not been revoked; raises HTTPException(401) otherwise."""
+    try:
+        claims = decode_token(token)
+    except Exception as e:
+        raise HTTPException(401, f"Invalid token: {str(e)}")
+
+    email = claims["sub"]
+    version = token_versions.get(email)
+    if version is None:
+        async with AsyncSessionLocal() as db:
+            version = await db.scalar(select(User.token_version).where(User.email == email))
+        if version is None:
+            raise HTTPException(401, "User not found")
+        token_versions.put(email, version)
+    if claims["ver"] != version:
+        raise HTTPException(401, "Token has been revoked")
+    return claims
+
+
+async def get_current_user(authorization: Optional[str] = Header(None)) -> User:
     """
     Extract and validate user from JWT token.
-    Returns the User object for the authenticated user.
+    Returns a detached User built from the token's claims. The only database
+    read is the token version check, and that is cached per worker. It uses
+    its own short session so the request's connection is not held for it.
     """
     if not authorization:
         raise HTTPException(401, "Missing authorization header")
@@ -24,14 +43,9 @@ def get_current_user(
         raise HTTPException(401, "Invalid authorization header format")
     
     token = authorization.replace("Bearer ", "")
+    claims = await verified_claims(token)
     
-    try:
-        email = decode_token(token)
-    except Exception as e:
-        raise HTTPException(401, f"Invalid token: {str(e)}")
-    
-    user = db.query(User).filter(User.email == email).first()
-    if not user:
-        raise HTTPException(401, "User not found")
-    
-    return user
+    return User(
+        email=claims["sub"], ngo_name=claims["ngo"], role=claims["role"],
+        token_version=claims["ver"]
+    )
@@ -0,0 +1,125 @@
+"""
+Streaming ZIP export of vault files.
+
+Members are written to a non-seekable sink, so the archive is produced as a
+generator of byte chunks and never held in memory. Upcoming objects are
+fetched concurrently within a bounded window into spooled temp files, which
+keeps memory flat while hiding S3 latency. Member order follows the input.
+"""
+import shutil
+import tempfile
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config import EXPORT_PREFETCH_WINDOW
+from profiler import attributed
+
+COPY_CHUNK_SIZE = 1024 * 1024
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes for the generator to drain."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        if data:
+            self._chunks.append(bytes(data))
+            self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def s3_fetch(s3_key: str):
+    """Default fetcher: stream an S3 object into a spooled temp file."""
+    # pylint: disable=import-outside-toplevel
+    from s3_service import get_s3, bucket
+    body = get_s3().get_object(Bucket=bucket(), Key=s3_key)["Body"]
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) # pylint: disable=consider-using-with
+    shutil.copyfileobj(body, spool, COPY_CHUNK_SIZE)
+    spool.seek(0)
+    return spool
+
+
+def archive_names(records):
+    """Deterministic, unique member paths: <category>/<name>, de-duplicated with (n)."""
+    used = set()
+    names = []
+    for rec in records:
+        base = f"{rec['category']}/{rec['name']}"
+        stem, dot, ext = base.rpartition(".")
+        if not dot or "/" in ext:
+            stem, dot, ext = base, "", ""
+        path, count = base, 1
+        while path in used:
+            count += 1
+            path = f"{stem} ({count}){dot}{ext}"
+        used.add(path)
+        names.append(path)
+    return names
+
+
+def stream_zip(records, fetch=s3_fetch, window: int = EXPORT_PREFETCH_WINDOW):
+    """
+    Yield a ZIP archive of records as byte chunks.
+
+    Args:
+        records: list of dicts with s3_key, name, category and optional uploaded_at
+        fetch: callable(s3_key) -> readable file object (closed after use)
+        window: how many upcoming objects may be fetched ahead of the writer
+    """
+    sink = _ChunkSink()
+    names = archive_names(records)
+
+    with ThreadPoolExecutor(max_workers=max(1, window)) as pool:
+        pending = deque()
+        upcoming = iter(range(len(records)))
+
+        def _fill():
+            while len(pending) < max(1, window):
+                idx = next(upcoming, None)
+                if idx is None:
+                    return
+                pending.append((idx, pool.submit(attributed(fetch), records[idx]["s3_key"])))
+
+        # Files are already compressed by the upload pipeline, so store them as-is
+        with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+            _fill()
+            while pending:
+                idx, future = pending.popleft()
+                _fill()
+
+                info = zipfile.ZipInfo(names[idx], _zip_time(records[idx].get("uploaded_at")))
+                info.compress_type = zipfile.ZIP_STORED
+                src = future.result()
+                try:
+                    with zf.open(info, mode="w", force_zip64=True) as dest:
+                        while True:
+                            block = src.read(COPY_CHUNK_SIZE)
+                            if not block:
+                                break
+                            dest.write(block)
+                            yield from sink.drain()
+                finally:
+                    src.close()
+                yield from sink.drain()
+
+        yield from sink.drain()
+
+
+def _zip_time(uploaded_at):
+    ts = uploaded_at if isinstance(uploaded_at, datetime) else datetime(1980, 1, 1)
+    return (max(ts.year, 1980), ts.month, ts.day, ts.hour, ts.minute, ts.second)
@@ -0,0 +1,79 @@
+"""
+Time-sortable unique ids in the ULID layout.
+
+A 48-bit millisecond timestamp followed by 80 random bits, Crockford base32
+encoded into 26 characters, so ids sort as strings in creation order.
+Within a process ids strictly increase: another id in the same millisecond
+increments the random part instead of drawing a new one. Each worker draws
+its own random part, so ids from different processes do not collide.
+"""
+import os
+import time
+import threading
+from datetime import datetime, timedelta, timezone
+
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"  # Crockford base32: no I, L, O, U
+ULID_LENGTH = 26
+_RANDOM_BITS = 80
+_RANDOM_MAX = (1 << _RANDOM_BITS) - 1
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_lock = threading.Lock()
+_last_ms = 0
+_last_random = 0
+
+
+def _reset_after_fork():
+    # A forked worker must not continue the parent's sequence, or the two would collide
+    global _last_ms, _last_random  # pylint: disable=global-statement
+    _last_ms, _last_random = 0, 0
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _encode(value: int, length: int) -> str:
+    chars = []
+    for _ in range(length):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def _random() -> int:
+    return int.from_bytes(os.urandom(_RANDOM_BITS // 8), "big")
+
+
+def new_ulid() -> str:
+    """A new id, greater than every id this process generated before."""
+    global _last_ms, _last_random  # pylint: disable=global-statement
+    with _lock:
+        now_ms = time.time_ns() // 1_000_000
+        if now_ms > _last_ms:
+            _last_ms, _last_random = now_ms, _random()
+        elif _last_random < _RANDOM_MAX:
+            # Same millisecond, or the clock stepped back: keep counting from the last id
+            _last_random += 1
+        else:
+            _last_ms, _last_random = _last_ms + 1, _random()
+        return _encode(_last_ms, 10) + _encode(_last_random, 16)
+
+
+def ulid_at(moment: datetime) -> str:
+    """A random id stamped with the given time (for backfilling existing rows)."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    ms = (moment - _EPOCH) // timedelta(milliseconds=1)
+    return _encode(ms, 10) + _encode(_random(), 16)
+
+
+def ulid_time(ulid: str) -> datetime:
+    """Creation time encoded in an id."""
+    ms = 0
+    for char in ulid[:10]:
+        ms = ms * 32 + ALPHABET.index(char)
+    return _EPOCH + timedelta(milliseconds=ms)
+
+
+def is_ulid(value: str) -> bool:
+    return len(value) == ULID_LENGTH and all(c in ALPHABET for c in value)
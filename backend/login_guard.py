@@ -0,0 +1,164 @@
+"""
+Admission control for password hashing.
+
+bcrypt is deliberately slow, so login and register hash on a dedicated pool
+of PASSWORD_HASH_WORKERS threads instead of the shared threadpool that runs
+sync routes and S3 calls. A burst of logins then queues behind itself and
+cannot starve file operations. Once PASSWORD_HASH_MAX_PENDING hashes are
+queued or running, further attempts get a 503 straight away rather than
+waiting in an unbounded queue.
+
+Before any hashing, login attempts draw from three token buckets: one per
+client IP, a strict one per account and IP, and a looser one per account
+across all addresses. A brute-force run against one account, or from one
+address, is rejected with 429 and Retry-After without costing any bcrypt
+time. Since the strict bucket is per address, guessing someone's password
+from one machine does not lock them out of their own. Buckets are per
+worker process.
+"""
+import math
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+import metrics
+from profiler import attributed
+from config import (
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE,
+    LOGIN_ACCOUNT_BURST, LOGIN_ACCOUNT_PER_MINUTE,
+    LOGIN_ACCOUNT_TOTAL_BURST, LOGIN_ACCOUNT_TOTAL_PER_MINUTE
+)
+
+# Buckets beyond this many keys are pruned of ones that have refilled completely
+MAX_BUCKETS = 10000
+
+
+class RateLimiter:
+    """Token buckets keyed by string: burst tokens, refilled at per_minute."""
+
+    def __init__(self, burst: int, per_minute: float):
+        self.burst = burst
+        self.rate = per_minute / 60.0
+        self._lock = threading.Lock()
+        self._buckets = {}  # key -> (tokens, last refill time)
+        self.rejected = 0
+
+    def acquire(self, key: str) -> float:
+        """Take a token. Returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                if len(self._buckets) > MAX_BUCKETS:
+                    self._prune(now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return (1 - tokens) / self.rate if self.rate > 0 else 60.0
+
+    def _prune(self, now: float):
+        full = [
+            key for key, (tokens, last) in self._buckets.items()
+            if tokens + (now - last) * self.rate >= self.burst
+        ]
+        for key in full:
+            del self._buckets[key]
+
+
+class PasswordPool:
+    """Small executor for bcrypt work that refuses new jobs once max_pending are in flight."""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.max_pending = max_pending
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.stats = {"completed": 0, "rejected_busy": 0}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {**self.stats, "pending": self._pending, "max_pending": self.max_pending}
+
+    def queue_depth(self) -> int:
+        """Jobs in flight that are not yet running on a worker."""
+        with self._lock:
+            return max(0, self._pending - self.workers)
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool. Raises HTTPException(503) when the pool is saturated."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.stats["rejected_busy"] += 1
+                raise HTTPException(
+                    503, "Too many sign-in attempts in progress, retry shortly",
+                    headers={"Retry-After": "1"}
+                )
+            self._pending += 1
+        try:
+            future = self._executor.submit(attributed(fn), *args)
+        except BaseException:
+            self._done(None)
+            raise
+        # Counted down when the job itself ends, not when the caller stops waiting:
+        # a cancelled request leaves its hash running or queued on the pool
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    def _done(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self.stats["completed"] += 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_password_pool() -> PasswordPool:
+    """Shared pool for password hashing, created on first use."""
+    global _pool # pylint: disable=global-statement
+    with _pool_lock:
+        if _pool is None:
+            _pool = PasswordPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+            metrics.watch_pool("password_hash", _pool.queue_depth)
+        return _pool
+
+
+ip_limiter = RateLimiter(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE)
+account_limiter = RateLimiter(LOGIN_ACCOUNT_BURST, LOGIN_ACCOUNT_PER_MINUTE)
+account_total_limiter = RateLimiter(LOGIN_ACCOUNT_TOTAL_BURST, LOGIN_ACCOUNT_TOTAL_PER_MINUTE)
+
+
+def throttle_stats() -> dict:
+    """Attempts rejected by each bucket (counted under the bucket's own lock)."""
+    return {
+        "ip": ip_limiter.rejected,
+        "account": account_limiter.rejected,
+        "account_total": account_total_limiter.rejected
+    }
+
+
+def _reject(retry_after: float):
+    raise HTTPException(
+        429, "Too many sign-in attempts, try again later",
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+def throttle_ip(ip: str):
+    """Raise 429 when this address has used up its attempts."""
+    wait = ip_limiter.acquire(ip)
+    if wait:
+        _reject(wait)
+
+
+def throttle_login(ip: str, email: str):
+    """Raise 429 when the address or the account has used up its login attempts."""
+    throttle_ip(ip)
+    account = email.strip().lower()
+    wait = account_limiter.acquire(f"{account}\0{ip}") or account_total_limiter.acquire(account)
+    if wait:
+        _reject(wait)
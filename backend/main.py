@@ -1,21 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
-from database import Base, engine
+from fastapi.responses import JSONResponse, Response
+from config import WARMUP_ENABLED
+from database import engine, async_engine, async_replica_engine, pool_stats
+from warmup import get_warmup
+import metrics
+from profiler import ProfilingMiddleware
+import audit_sink
+from db_router import get_replica_router
 from routes.auth_routes import router as auth_router
 from routes.file_routes import router as file_router
 from routes.audit_routes import router as audit_router
+from routes.stats_routes import router as stats_router
+from routes.profile_routes import router as profile_router
 
-app = FastAPI(title="Safekeep NGO Vault Backend")
 
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # Warm up in the background: /health answers at once, /ready once this is done
+    warmup = get_warmup()
+    task = asyncio.create_task(warmup.run()) if WARMUP_ENABLED else None
+    if task is None:
+        warmup.mark_ready()
+    yield
+    if task is not None:
+        task.cancel()
+    # Flush queued audit entries before the worker exits
+    audit_sink.shutdown()
+    await async_engine.dispose()
+    if async_replica_engine is not None:
+        await async_replica_engine.dispose()
+
+app = FastAPI(title="Safekeep NGO Vault Backend", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
+# Outermost, so a profile covers the whole request including the metrics middleware
+app.add_middleware(ProfilingMiddleware)
+
+# Schema creation and upgrades are a separate deploy step: python migrations.py
 
 app.include_router(auth_router)
 app.include_router(file_router)
 app.include_router(audit_router)
+app.include_router(stats_router)
+app.include_router(profile_router)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/ready")
+def ready():
+    """Readiness for load balancers: 503 until the startup warm-up has finished"""
+    state = get_warmup().snapshot()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """Prometheus scrape target: latency histograms, upload stages, pools and caches"""
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
+
 @app.get("/health/compression")
 def compression_health():
     """Check if Ghostscript is available for compression"""
@@ -27,3 +72,46 @@ def compression_health():
         "status": "ready" if available else "fallback_only"
     }
 
+
+@app.get("/health/cache")
+def cache_health():
+    """Hit/miss/eviction counters for the local download cache"""
+    from object_cache import get_object_cache
+    cache = get_object_cache()
+    if not cache:
+        return {"enabled": False}
+    return {"enabled": True, **cache.snapshot()}
+
+
+@app.get("/health/responses")
+def response_cache_health():
+    """Hit/miss/304 counters for the cached /files and /audit listings"""
+    from response_cache import get_response_cache
+    cache = get_response_cache()
+    if not cache:
+        return {"enabled": False}
+    return {"enabled": True, **cache.snapshot()}
+
+
+@app.get("/health/auth")
+def auth_health():
+    """Password hashing pool load and how many logins the throttles rejected"""
+    from login_guard import get_password_pool, throttle_stats
+    return {"hash_pool": get_password_pool().snapshot(), "throttled": throttle_stats()}
+
+
+@app.get("/health/audit")
+def audit_health():
+    """Queue depth and write/spill counters for the buffered audit writer"""
+    return audit_sink.get_audit_sink().snapshot()
+
+
+@app.get("/health/db")
+def db_health():
+    """Connection pool usage per engine, and replica routing when a replica is configured"""
+    router = get_replica_router()
+    return {
+        "dialect": engine.dialect.name,
+        "pools": pool_stats(),
+        "replica": router.snapshot() if router else None
+    }
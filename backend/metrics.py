@@ -0,0 +1,202 @@
+"""
+Prometheus metrics, served as text by GET /metrics.
+
+  safekeep_http_request_duration_seconds   per method, route template and status
+  safekeep_upload_stage_seconds            read, compress, extract, s3_put, db_commit
+  safekeep_compression_engine_seconds      time inside ghostscript, pikepdf, pypdf2, pillow
+  safekeep_compression_ratio_percent       space saved, per compression method
+  safekeep_s3_call_seconds                 every S3 API call, per operation
+  safekeep_db_query_seconds                every statement, per engine and verb
+  safekeep_pool_queue_depth                jobs waiting for a compression/S3/bcrypt worker
+  safekeep_db_pool_connections             checked in/out and overflow, per engine
+  safekeep_cache_events_total              hits, misses, evictions... per cache
+
+Pools and caches are registered by whatever creates them (watch_pool,
+watch_cache) and read when /metrics is scraped, so a scrape never creates
+one. Values are per process, so with several uvicorn workers each one has
+to be scraped on its own.
+"""
+import time
+import threading
+from prometheus_client import (
+    Histogram, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+)
+from prometheus_client.core import GaugeMetricFamily, CounterMetricFamily
+
+# Uploads of large PDFs run for minutes, so the top buckets go well past the defaults
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5)
+RATIO_BUCKETS = (0, 5, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+
+REQUEST_SECONDS = Histogram(
+    "safekeep_http_request_duration_seconds", "Time to serve a request, body included",
+    ("method", "route", "status"), buckets=LATENCY_BUCKETS
+)
+UPLOAD_STAGE_SECONDS = Histogram(
+    "safekeep_upload_stage_seconds", "Time spent in each stage of an upload",
+    ("stage",), buckets=LATENCY_BUCKETS
+)
+COMPRESSION_SECONDS = Histogram(
+    "safekeep_compression_engine_seconds", "Time spent inside each compression engine",
+    ("engine",), buckets=LATENCY_BUCKETS
+)
+COMPRESSION_RATIO = Histogram(
+    "safekeep_compression_ratio_percent", "Space saved by compression, in percent",
+    ("method",), buckets=RATIO_BUCKETS
+)
+S3_CALL_SECONDS = Histogram(
+    "safekeep_s3_call_seconds", "Latency of S3 API calls",
+    ("operation",), buckets=LATENCY_BUCKETS
+)
+DB_QUERY_SECONDS = Histogram(
+    "safekeep_db_query_seconds", "Latency of database statements",
+    ("engine", "statement"), buckets=QUERY_BUCKETS
+)
+
+# Anything else (PRAGMA, WITH, SAVEPOINT...) is reported as OTHER to keep labels bounded
+STATEMENT_VERBS = ("SELECT", "INSERT", "UPDATE", "DELETE", "BEGIN", "COMMIT", "ROLLBACK")
+
+
+def upload_stage(stage: str):
+    """Context manager timing one upload stage."""
+    return UPLOAD_STAGE_SECONDS.labels(stage).time()
+
+
+def compression_engine(engine: str):
+    """Context manager timing one run of a compression engine."""
+    return COMPRESSION_SECONDS.labels(engine).time()
+
+
+def record_compression(method: str, ratio: float):
+    COMPRESSION_RATIO.labels(method).observe(max(0.0, ratio))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency under the matched route's template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router records the matched route in the scope; /files/{file_id}, not the id
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+def instrument_engine(name: str, eng):
+    """Time every statement run on a SQLAlchemy engine (the sync engine of an async one)."""
+    # pylint: disable=import-outside-toplevel, too-many-arguments, unused-argument
+    from sqlalchemy import event
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        context.metrics_start = time.perf_counter()
+
+    def after(conn, cursor, statement, parameters, context, executemany):
+        verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+        DB_QUERY_SECONDS.labels(name, verb if verb in STATEMENT_VERBS else "OTHER").observe(
+            time.perf_counter() - context.metrics_start
+        )
+
+    eng = getattr(eng, "sync_engine", eng)
+    event.listen(eng, "before_cursor_execute", before)
+    event.listen(eng, "after_cursor_execute", after)
+
+
+def instrument_s3(client):
+    """Time every API call made through a boto3 S3 client."""
+    def before(context, **_kwargs):
+        context["metrics_start"] = time.perf_counter()
+
+    def after(model, context, **_kwargs):
+        if "metrics_start" in context:
+            S3_CALL_SECONDS.labels(model.name).observe(time.perf_counter() - context["metrics_start"])
+
+    client.meta.events.register("before-call.s3", before)
+    client.meta.events.register("after-call.s3", after)
+
+
+_pools = {}
+_caches = {}
+_watch_lock = threading.Lock()
+
+
+def watch_pool(name: str, depth):
+    """Report depth() as the queue depth of pool name at each scrape."""
+    with _watch_lock:
+        _pools[name] = depth
+
+
+def watch_executor(name: str, executor):
+    # pylint: disable=protected-access
+    watch_pool(name, lambda: executor._work_queue.qsize())
+
+
+def watch_cache(name: str, cache):
+    """Report the counters in cache.stats at each scrape."""
+    with _watch_lock:
+        _caches[name] = cache
+
+
+class StateCollector:
+    """Reads pool, connection and cache state when /metrics is scraped."""
+
+    def describe(self):
+        # Lets the registry skip a collect() at registration, which would import database
+        return []
+
+    def collect(self):
+        with _watch_lock:
+            pools, caches = dict(_pools), dict(_caches)
+
+        depth = GaugeMetricFamily(
+            "safekeep_pool_queue_depth", "Jobs waiting for a worker", labels=("pool",)
+        )
+        for name, fn in pools.items():
+            depth.add_metric((name,), fn())
+        yield depth
+
+        from database import pool_stats # pylint: disable=import-outside-toplevel
+        connections = GaugeMetricFamily(
+            "safekeep_db_pool_connections", "Database pool connections by state",
+            labels=("engine", "state")
+        )
+        for name, stats in pool_stats().items():
+            for state in ("checked_in", "checked_out", "overflow"):
+                if state in stats:
+                    connections.add_metric((name, state), stats[state])
+        yield connections
+
+        events = CounterMetricFamily(
+            "safekeep_cache_events", "Cache lookups and evictions by outcome",
+            labels=("cache", "event")
+        )
+        for name, cache in caches.items():
+            stats = cache.snapshot()
+            for event in cache.stats:
+                events.add_metric((name, event), stats[event])
+        yield events
+
+
+REGISTRY.register(StateCollector())
+
+
+def render() -> tuple:
+    """The exposition body and its content type."""
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
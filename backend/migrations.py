@@ -0,0 +1,180 @@
+"""
+Idempotent schema upgrades that create_all() cannot perform on existing tables.
+
+create_all() only creates missing tables, so columns and indexes added to a
+model later never reach databases created before them. ensure_columns() adds
+missing columns that have a server default. ensure_indexes() creates any
+missing model index and drops indexes the composites have superseded.
+normalize_sqlite_timestamps() rewrites second-precision SQLite timestamps
+into the format keyset cursors compare against. migrate_legacy_file_ids()
+gives files created before time-sortable ids a ULID from their upload time.
+
+run_all() applies all of them after creating missing tables. It is a deploy
+step run once before the API starts (python migrations.py), not something
+every worker does on import:
+    python migrations.py && uvicorn main:app
+"""
+import re
+from datetime import datetime, timezone
+from sqlalchemy import inspect, text
+from config import FILE_ID_PREFIX
+from database import Base
+from ids import ULID_LENGTH, ulid_at
+
+# Ids written before ULIDs: file_<epoch> and later file_<epoch>_<8 hex chars>
+LEGACY_FILE_ID = re.compile(r"file_[0-9]+(_[0-9a-f]+)?")
+
+# Columns used as keyset sort keys
+KEYSET_TIMESTAMPS = {
+    "files": "uploaded_at",
+    "audit_logs": "timestamp",
+}
+
+# Single-column tenant indexes replaced by the composite indexes in models.py
+SUPERSEDED_INDEXES = {
+    "files": ["ix_files_ngo_name"],
+    "audit_logs": ["ix_audit_logs_ngo_name"],
+}
+
+
+def ensure_columns(engine):
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or column.server_default is None:
+                continue
+            print(f"MIGRATION: Adding column {table.name}.{column.name}")
+            col_type = column.type.compile(dialect=engine.dialect)
+            default = column.server_default.arg
+            null = "" if column.nullable else " NOT NULL"
+            with engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type} "
+                    f"DEFAULT '{default}'{null}"
+                ))
+
+
+def ensure_indexes(engine):
+    inspector = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+
+        for index in table.indexes:
+            if index.name not in existing:
+                print(f"MIGRATION: Creating index {index.name}")
+                index.create(bind=engine)
+
+        for name in SUPERSEDED_INDEXES.get(table.name, []):
+            if name in existing:
+                print(f"MIGRATION: Dropping superseded index {name}")
+                with engine.begin() as conn:
+                    conn.execute(text(f"DROP INDEX {name}"))
+
+
+def normalize_sqlite_timestamps(engine):
+    """
+    SQLite stores CURRENT_TIMESTAMP as 'YYYY-MM-DD HH:MM:SS' but SQLAlchemy binds
+    'YYYY-MM-DD HH:MM:SS.ffffff', so text comparison puts a row from the same
+    second on the wrong side of a cursor. Pad old values to the longer format.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table, column in KEYSET_TIMESTAMPS.items():
+            if not inspector.has_table(table):
+                continue
+            result = conn.execute(text(
+                f"UPDATE {table} SET {column} = {column} || '.000000' "
+                f"WHERE length({column}) = 19"
+            ))
+            if result.rowcount:
+                print(f"MIGRATION: Normalized {result.rowcount} {table}.{column} values")
+
+
+def migrate_legacy_file_ids(engine, batch_size: int = 500):
+    """
+    Replace 'file_<epoch>[_<hex>]' ids with FILE_ID_PREFIX + a ULID stamped with
+    the row's uploaded_at, so ids sort by upload time, and repoint the search index.
+    Old ids stop resolving, so clients holding one must re-list. Ids in any other
+    format are left alone. The "files" version of every tenant with a renamed row is
+    bumped in the same transaction, so no cached listing (Redis entries outlive a
+    deploy) keeps serving the old ids.
+    """
+    from response_cache import bump_version # pylint: disable=import-outside-toplevel
+
+    id_length = len(FILE_ID_PREFIX) + ULID_LENGTH
+    inspector = inspect(engine)
+    if not inspector.has_table("files"):
+        return
+    has_search = inspector.has_table("file_search")
+    has_versions = inspector.has_table("tenant_versions")
+
+    migrated, after = 0, ""
+    while True:
+        with engine.begin() as conn:
+            # Walk the candidates by id, since rows that are not legacy stay where they are
+            rows = conn.execute(text(
+                "SELECT id, uploaded_at, ngo_name FROM files WHERE length(id) != :n AND id > :after "
+                "ORDER BY id LIMIT :batch"
+            ), {"n": id_length, "after": after, "batch": batch_size}).all()
+            if not rows:
+                break
+            after = rows[-1].id
+            legacy = [row for row in rows if LEGACY_FILE_ID.fullmatch(row.id)]
+            if not legacy:
+                continue
+            renames = [{
+                "old": row.id,
+                "new": FILE_ID_PREFIX + ulid_at(_as_datetime(row.uploaded_at))
+            } for row in legacy]
+            conn.execute(text("UPDATE files SET id = :new WHERE id = :old"), renames)
+            if has_search:
+                conn.execute(
+                    text("UPDATE file_search SET file_id = :new WHERE file_id = :old"), renames
+                )
+            if has_versions:
+                for ngo_name in sorted({row.ngo_name for row in legacy}):
+                    bump_version(conn, ngo_name, "files")
+            migrated += len(renames)
+    if migrated:
+        print(f"MIGRATION: Reassigned {migrated} legacy file ids")
+
+
+def _as_datetime(value) -> datetime:
+    # Raw SQLite rows return the stored text rather than a datetime
+    if value is None:
+        return datetime.now(timezone.utc)
+    if isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def run_all(engine):
+    """Bring a database of any age up to the current schema. Idempotent."""
+    # pylint: disable=import-outside-toplevel
+    import models # pylint: disable=unused-import  # registers the tables on Base
+    from search_index import ensure_search_schema
+    from usage_stats import backfill_if_empty
+    from sqlalchemy.orm import Session
+
+    Base.metadata.create_all(bind=engine)
+    ensure_columns(engine)
+    ensure_indexes(engine)
+    normalize_sqlite_timestamps(engine)
+    ensure_search_schema(engine)
+    migrate_legacy_file_ids(engine)
+    with Session(engine) as db:
+        backfill_if_empty(db)
+
+
+if __name__ == "__main__":
+    # pylint: disable=import-outside-toplevel
+    from database import engine as _engine
+    run_all(_engine)
+    print("MIGRATION: Schema is up to date")
@@ -1,7 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Float, Text, Index
+from datetime import datetime, timezone
 from sqlalchemy.sql import func
 from database import Base
 
+
+def _utcnow():
+    # Set client-side so SQLite stores the same microsecond format keyset cursors bind
+    return datetime.now(timezone.utc)
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True)
@@ -9,6 +15,8 @@ class User(Base):
     email = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=False)
     role = Column(String, default="admin") # "admin" or "user"
+    # Embedded in tokens; bumping it revokes every token issued to the user
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now()) # pylint: disable=not-callable
 
 class FileRecord(Base):
@@ -23,19 +31,74 @@ class FileRecord(Base):
     compression_method = Column(String, nullable=False)
 
     uploaded_by = Column(String, nullable=False)
-    ngo_name = Column(String, nullable=False, index=True)  # Tenant isolation
-    uploaded_at = Column(DateTime(timezone=True), server_default=func.now()) # pylint: disable=not-callable
+    ngo_name = Column(String, nullable=False)  # Tenant isolation
+    uploaded_at = Column(
+        DateTime(timezone=True), default=_utcnow, server_default=func.now() # pylint: disable=not-callable
+    )
 
     s3_key = Column(String, nullable=False)
     status = Column(String, default="active")
 
+    # Every listing filters on (tenant, status) and keyset-sorts with id as tiebreaker
+    __table_args__ = (
+        Index("ix_files_tenant_status_uploaded", "ngo_name", "status", "uploaded_at", "id"),
+        Index("ix_files_tenant_status_category_uploaded",
+              "ngo_name", "status", "category", "uploaded_at", "id"),
+        Index("ix_files_tenant_status_name", "ngo_name", "status", "name", "id"),
+        Index("ix_files_tenant_status_size", "ngo_name", "status", "original_size", "id"),
+    )
+
 class AuditLog(Base):
     __tablename__ = "audit_logs"
     id = Column(Integer, primary_key=True)
-    timestamp = Column(DateTime(timezone=True), server_default=func.now()) # pylint: disable=not-callable
+    timestamp = Column(
+        DateTime(timezone=True), default=_utcnow, server_default=func.now() # pylint: disable=not-callable
+    )
     user = Column(String, nullable=False)
-    ngo_name = Column(String, nullable=False, index=True)  # Tenant isolation
+    ngo_name = Column(String, nullable=False)  # Tenant isolation
     action = Column(String, nullable=False)
     target = Column(Text, nullable=False)
     status = Column(String, nullable=False)
     ip = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_audit_tenant_timestamp", "ngo_name", "timestamp", "id"),
+        Index("ix_audit_tenant_action_timestamp", "ngo_name", "action", "timestamp", "id"),
+        Index("ix_audit_tenant_user_timestamp", "ngo_name", "user", "timestamp", "id"),
+    )
+
+class TenantUsage(Base):
+    """Running per-category totals, updated in the same transaction as file changes."""
+    __tablename__ = "tenant_usage"
+    ngo_name = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    file_count = Column(Integer, nullable=False, default=0)
+    original_bytes = Column(BigInteger, nullable=False, default=0)
+    compressed_bytes = Column(BigInteger, nullable=False, default=0)
+    last_upload_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class TenantVersion(Base):
+    """Change counter per tenant and data scope; cached responses are keyed by it."""
+    __tablename__ = "tenant_versions"
+    ngo_name = Column(String, primary_key=True)
+    scope = Column(String, primary_key=True)  # "files" or "audit"
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+class AuditArchiveSegment(Base):
+    """Manifest entry for one archived block of a tenant's audit log (see audit_archive.py)."""
+    __tablename__ = "audit_archive_segments"
+    id = Column(Integer, primary_key=True)
+    ngo_name = Column(String, nullable=False)  # Tenant isolation
+    month = Column(String, nullable=False)  # YYYY-MM
+    s3_key = Column(String, nullable=False)
+    row_count = Column(Integer, nullable=False)
+    size_bytes = Column(Integer, nullable=False)
+    min_timestamp = Column(DateTime(timezone=True), nullable=False)
+    max_timestamp = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now()) # pylint: disable=not-callable
+
+    __table_args__ = (
+        Index("ix_audit_archive_tenant_range", "ngo_name", "max_timestamp", "min_timestamp"),
+    )
@@ -0,0 +1,286 @@
+"""
+Read-through on-disk LRU cache for vault objects.
+
+Entries are keyed by s3_key + ETag and stored as plain files so hits can be
+served with FileResponse straight from disk. Concurrent misses for the same
+object are coalesced into one S3 fetch; other callers wait for it. The byte
+budget is enforced by evicting least-recently-used entries.
+
+acquire() pins the file it returns until release(): an entry evicted or
+replaced while pinned leaves the index at once, but its file is only deleted
+when the last reader lets go, so a response opening it later still finds it.
+Objects known to be larger than the whole cache are never fetched into it.
+"""
+import os
+import time
+import shutil
+import hashlib
+import tempfile
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import Future
+import metrics
+from config import OBJECT_CACHE_DIR, OBJECT_CACHE_MAX_BYTES, OBJECT_CACHE_REVALIDATE_SECONDS
+
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def s3_head(s3_key: str) -> dict:
+    # pylint: disable=import-outside-toplevel
+    from s3_service import get_s3, bucket
+    res = get_s3().head_object(Bucket=bucket(), Key=s3_key)
+    return {"etag": res["ETag"].strip('"'), "size": res["ContentLength"]}
+
+
+def s3_open(s3_key: str):
+    """Return (etag, size, readable body) for an object."""
+    # pylint: disable=import-outside-toplevel
+    from s3_service import get_s3, bucket
+    res = get_s3().get_object(Bucket=bucket(), Key=s3_key)
+    return res["ETag"].strip('"'), res["ContentLength"], res["Body"]
+
+
+class ObjectCache: # pylint: disable=too-many-instance-attributes
+    """Disk LRU with a byte budget, miss coalescing and hit/miss/eviction counters."""
+
+    def __init__( # pylint: disable=R0913, R0917
+        self, root: str, max_bytes: int, revalidate_seconds: int = 300,
+        head_fn=s3_head, open_fn=s3_open
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._head = head_fn
+        self._open = open_fn
+        self._lock = threading.Lock()
+        # s3_key -> {"etag", "path", "size", "checked_at"}; order = LRU (oldest first)
+        self._entries = OrderedDict()
+        # s3_key -> [future, waiters] for fetches in progress
+        self._inflight = {}
+        # path -> readers holding it; paths dropped from the index while pinned
+        self._pins = Counter()
+        self._doomed = set()
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "bypassed": 0}
+        os.makedirs(root, exist_ok=True)
+        self._clear_orphans()
+
+    def _clear_orphans(self):
+        # The index is in-memory, so files left by a previous process are unreachable
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if os.path.isfile(path):
+                os.remove(path)
+
+    def _path_for(self, s3_key: str, etag: str) -> str:
+        digest = hashlib.sha256(f"{s3_key}\0{etag}".encode("utf-8")).hexdigest()
+        return os.path.join(self.root, digest)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hit_rate": (self.stats["hits"] / lookups) if lookups else 0.0
+            }
+
+    def acquire(self, s3_key: str, size: int = None):
+        """
+        Return a local path holding the object's bytes, fetching it on a miss.
+        The file stays on disk until release(path) is called for it.
+        Returns None if the object is too large to cache (caller should stream).
+        size, when the caller knows it, saves a HEAD before fetching a miss.
+        """
+        with self._lock:
+            entry = self._entries.get(s3_key)
+            fresh = entry and time.time() - entry["checked_at"] < self.revalidate_seconds
+            if fresh:
+                self._entries.move_to_end(s3_key)
+                self.stats["hits"] += 1
+                return self._pin_locked(entry["path"])
+
+        if entry:
+            # Stale: a HEAD is much cheaper than re-downloading an unchanged object
+            head = self._head(s3_key)
+            with self._lock:
+                current = self._entries.get(s3_key)
+                if current and current["etag"] == head["etag"]:
+                    current["checked_at"] = time.time()
+                    self._entries.move_to_end(s3_key)
+                    self.stats["hits"] += 1
+                    return self._pin_locked(current["path"])
+            size = head["size"]
+
+        if size is None:
+            size = self._head(s3_key)["size"]
+        if size > self.max_bytes:
+            with self._lock:
+                self.stats["bypassed"] += 1
+            return None
+
+        return self._fetch_coalesced(s3_key)
+
+    def release(self, path: str):
+        """Unpin a path returned by acquire(); deletes it if it was evicted meanwhile."""
+        with self._lock:
+            self._pins[path] -= 1
+            if self._pins[path] > 0:
+                return
+            del self._pins[path]
+            if path not in self._doomed:
+                return
+            self._doomed.discard(path)
+        _unlink(path)
+
+    def _pin_locked(self, path: str) -> str:
+        self._pins[path] += 1
+        return path
+
+    def _drop_locked(self, path: str):
+        """Delete a file that left the index, or defer that until it is unpinned."""
+        if self._pins[path] > 0:
+            self._doomed.add(path)
+        else:
+            _unlink(path)
+
+    def _fetch_coalesced(self, s3_key: str):
+        with self._lock:
+            inflight = self._inflight.get(s3_key)
+            leader = inflight is None
+            if leader:
+                inflight = self._inflight[s3_key] = [Future(), 0]
+                self.stats["misses"] += 1
+            else:
+                # The leader pins the file for every waiter when it lands
+                inflight[1] += 1
+                self.stats["coalesced"] += 1
+
+        if not leader:
+            return inflight[0].result()
+
+        try:
+            path = self._fetch(s3_key)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(s3_key, None)
+            inflight[0].set_exception(e)
+            raise
+        inflight[0].set_result(path)
+        return path
+
+    def _fetch(self, s3_key: str):
+        etag, size, body = self._open(s3_key)
+        if size > self.max_bytes:
+            # Only if the object grew past the budget since it was sized
+            _close(body)
+            with self._lock:
+                self._inflight.pop(s3_key, None)
+                self.stats["bypassed"] += 1
+            return None
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".partial-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                shutil.copyfileobj(body, f, COPY_CHUNK_SIZE)
+            path = self._path_for(s3_key, etag)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        finally:
+            _close(body)
+
+        with self._lock:
+            old = self._entries.pop(s3_key, None)
+            if old:
+                self._bytes -= old["size"]
+                if old["path"] != path:
+                    self._drop_locked(old["path"])
+            self._entries[s3_key] = {
+                "etag": etag, "path": path, "size": size, "checked_at": time.time()
+            }
+            self._bytes += size
+            # Pinned for the leader and each waiter before any eviction can see it;
+            # later callers find the entry in the index instead of waiting
+            _, waiters = self._inflight.pop(s3_key)
+            self._pins[path] += 1 + waiters
+            self._doomed.discard(path)
+            self._evict_locked(keep=s3_key)
+        return path
+
+    def _evict_locked(self, keep: str):
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            victim_key = next(iter(self._entries))
+            if victim_key == keep:
+                self._entries.move_to_end(keep)
+                continue
+            victim = self._entries.pop(victim_key)
+            self._bytes -= victim["size"]
+            self._drop_locked(victim["path"])
+            self.stats["evictions"] += 1
+
+    def invalidate(self, s3_key: str):
+        with self._lock:
+            entry = self._entries.pop(s3_key, None)
+            if entry:
+                self._bytes -= entry["size"]
+                self._drop_locked(entry["path"])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._doomed.clear()
+            self._bytes = 0
+        shutil.rmtree(self.root, ignore_errors=True)
+        os.makedirs(self.root, exist_ok=True)
+
+
+def _close(body):
+    close = getattr(body, "close", None)
+    if close:
+        close()
+
+
+def _unlink(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_dead_worker_dirs(base: str):
+    """Each worker caches under its own pid-<n> dir; drop dirs of exited workers."""
+    if not os.path.isdir(base):
+        return
+    for name in os.listdir(base):
+        if not name.startswith("pid-"):
+            continue
+        try:
+            os.kill(int(name[4:]), 0)
+        except (ValueError, ProcessLookupError):
+            shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+        except OSError:
+            continue
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_object_cache():
+    """Process-wide cache, or None when OBJECT_CACHE_MAX_BYTES is 0."""
+    global _cache # pylint: disable=global-statement
+    if OBJECT_CACHE_MAX_BYTES <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _remove_dead_worker_dirs(OBJECT_CACHE_DIR)
+            _cache = ObjectCache(
+                os.path.join(OBJECT_CACHE_DIR, f"pid-{os.getpid()}"),
+                OBJECT_CACHE_MAX_BYTES, OBJECT_CACHE_REVALIDATE_SECONDS
+            )
+            metrics.watch_cache("object", _cache)
+        return _cache
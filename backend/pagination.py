@@ -0,0 +1,109 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A page is ordered by (sort column, id) and the cursor stores the last row's
+values for both, so the next page is a range scan starting after that row
+instead of an OFFSET that re-reads everything before it.
+"""
+import json
+import base64
+from datetime import datetime
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+MAX_PAGE_SIZE = 500
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if not isinstance(values, list):
+            raise ValueError("cursor must encode a list")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError) as e:
+        raise HTTPException(400, "Invalid cursor") from e
+
+
+def keyset_apply( # pylint: disable=R0913, R0917
+    query, sort_column, id_column, descending: bool, limit: int, cursor: str = None
+):
+    """
+    Add the cursor predicate, ordering and limit to a Query or select().
+
+    Returns:
+        (query, limit) with limit clamped; the query fetches limit + 1 rows
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise HTTPException(400, "Invalid cursor")
+        last_sort, last_id = values
+        if descending:
+            query = query.filter(or_(
+                sort_column < last_sort,
+                and_(sort_column == last_sort, id_column < last_id)
+            ))
+        else:
+            query = query.filter(or_(
+                sort_column > last_sort,
+                and_(sort_column == last_sort, id_column > last_id)
+            ))
+
+    if descending:
+        query = query.order_by(sort_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(sort_column.asc(), id_column.asc())
+
+    # Fetch one extra row to know whether another page exists
+    return query.limit(limit + 1), limit
+
+
+def keyset_split(rows, sort_column, id_column, limit: int):
+    """Trim the extra row fetched by keyset_apply. Returns (rows, next_cursor)."""
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([
+        getattr(last, sort_column.key), getattr(last, id_column.key)
+    ])
+
+
+def keyset_page( # pylint: disable=R0913, R0917
+    query, sort_column, id_column, descending: bool, limit: int, cursor: str = None
+):
+    """
+    Apply ordering, the cursor predicate and the limit to query and run it.
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    query, limit = keyset_apply(query, sort_column, id_column, descending, limit, cursor)
+    return keyset_split(query.all(), sort_column, id_column, limit)
+
+
+def like_pattern(text: str) -> str:
+    """Substring LIKE pattern with user wildcards escaped. Use with escape="\\"."""
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
@@ -0,0 +1,322 @@
+"""
+On-demand and sampled request profiling.
+
+An admin adds X-Profile: 1 (or ?profile=1) to any request and that request
+runs under a stack sampler. The response carries X-Profile-Id, and the
+profile can be downloaded from /admin/profiles/{id}. With PROFILE_SAMPLE_RATE
+above 0, that fraction of all requests is also profiled, to catch
+regressions in production.
+
+The sampler is a thread that reads every thread's stack each
+PROFILE_INTERVAL_MS, and keeps only the stacks doing this request's work:
+the event loop while the request's own task is running on it, AnyIO worker
+threads running a job the request handed to run_in_threadpool (including
+sync endpoints and dependencies), and jobs on the backend's own executors
+and threads, which are wrapped with attributed() where they are submitted.
+Other requests running at the same time, possibly for other tenants, never
+show up in the stacks.
+
+Besides the folded stacks, a profile records wall time, process CPU time and
+the tracemalloc peak. Those three are process-wide and include concurrent
+requests; only one request is profiled at a time.
+Profiles are JSON files in PROFILE_DIR, and only the newest
+PROFILE_MAX_STORED are kept. Sampled requests without a valid token belong
+to no tenant; they go to PROFILE_DIR/unattributed, which has a cap of its
+own, so they cannot push admins' profiles out.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import functools
+import threading
+import contextvars
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from urllib.parse import parse_qs
+from fastapi.concurrency import run_in_threadpool
+from config import PROFILE_DIR, PROFILE_SAMPLE_RATE, PROFILE_INTERVAL_MS, PROFILE_MAX_STORED
+from ids import new_ulid
+from fastapi import HTTPException
+from dependencies import verified_claims
+
+PROFILE_HEADER = b"x-profile"
+ENABLED_VALUES = ("1", "true", "yes")
+# Only readable on disk: the API serves a tenant's profiles and these have none
+UNATTRIBUTED_DIR = os.path.join(PROFILE_DIR, "unattributed")
+
+# The sampler of the request being profiled. AnyIO copies the context into its
+# worker threads; attributed() carries it onto other threads.
+_active = contextvars.ContextVar("active_profile", default=None)
+
+
+def _fold(frame) -> str:
+    """Root-first "file.py:function;..." stack."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def _job_sampler(frame):
+    """
+    The sampler active in the context an AnyIO worker thread runs its job in.
+    AnyIO's worker calls context.run(func) from its run() frame; on any other
+    thread (or an AnyIO that does this differently) the answer is None, so the
+    stacks are left out rather than attributed to the wrong request.
+    """
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == "run" and "context" in code.co_varnames:
+            context = frame.f_locals.get("context")
+            if isinstance(context, contextvars.Context):
+                return context.get(_active)
+        frame = frame.f_back
+    return None
+
+
+def attributed(fn):
+    """
+    fn, wrapped so that the thread running it counts toward the profile of the
+    request that called attributed(). For jobs on the backend's own executors
+    and threads, which do not inherit the request's context. Returns fn itself
+    when no request is being profiled.
+    """
+    sampler = _active.get()
+    if sampler is None:
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        # Jobs this one submits are attributed too
+        token = _active.set(sampler)
+        try:
+            with sampler.attached():
+                return fn(*args, **kwargs)
+        finally:
+            _active.reset(token)
+    return run
+
+
+class StackSampler:
+    """Counts the folded stacks of one request's task and jobs, sampled on a timer."""
+
+    def __init__(self, interval: float, home_thread: int, task: asyncio.Task):
+        self.interval = interval
+        self.home_thread = home_thread
+        self.task = task
+        self.stacks = Counter()
+        self.samples = 0
+        self._jobs = Counter()  # thread ident -> attributed jobs running on it
+        self._jobs_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    @contextmanager
+    def attached(self):
+        """Count the calling thread's stacks toward this profile while the block runs."""
+        ident = threading.get_ident()
+        with self._jobs_lock:
+            self._jobs[ident] += 1
+        try:
+            yield
+        finally:
+            with self._jobs_lock:
+                self._jobs[ident] -= 1
+                if not self._jobs[ident]:
+                    del self._jobs[ident]
+
+    def _owns(self, ident: int, frame) -> bool:
+        if ident == self.home_thread:
+            # The loop runs other requests' tasks too; only this one's turns count
+            return asyncio.current_task(self.task.get_loop()) is self.task
+        with self._jobs_lock:
+            if ident in self._jobs:
+                return True
+        return _job_sampler(frame) is self
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stopping.wait(self.interval):
+            self.samples += 1
+            for ident, frame in sys._current_frames().items(): # pylint: disable=protected-access
+                if ident != me and self._owns(ident, frame):
+                    self.stacks[_fold(frame)] += 1
+
+
+class RequestProfile:
+    """
+    Measures one request: stack samples, wall and CPU time, tracemalloc peak.
+    Created on the request's own task, which the sampler then follows.
+    """
+
+    def __init__(self, trigger: str, ngo_name, method: str, path: str):
+        self.id = new_ulid()
+        self.trigger = trigger
+        self.ngo_name = ngo_name
+        self.method = method
+        self.path = path
+        self.started_at = datetime.utcnow().isoformat()
+        self.sampler = StackSampler(
+            PROFILE_INTERVAL_MS / 1000, threading.get_ident(), asyncio.current_task()
+        )
+        self._owns_tracemalloc = False
+        self._wall = self._cpu = 0.0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._owns_tracemalloc = True
+        tracemalloc.reset_peak()
+        self._wall, self._cpu = time.perf_counter(), time.process_time()
+        self.sampler.start()
+
+    def stop(self, status: int) -> dict:
+        self.sampler.stop()
+        wall, cpu = time.perf_counter() - self._wall, time.process_time() - self._cpu
+        peak = tracemalloc.get_traced_memory()[1]
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+        return {
+            "id": self.id,
+            "trigger": self.trigger,
+            "ngo_name": self.ngo_name,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "started_at": self.started_at,
+            "wall_ms": round(wall * 1000, 1),
+            "cpu_ms": round(cpu * 1000, 1),
+            "tracemalloc_peak_bytes": peak,
+            "interval_ms": PROFILE_INTERVAL_MS,
+            "samples": self.sampler.samples,
+            "stacks": dict(self.sampler.stacks.most_common()),
+        }
+
+
+def save_profile(profile: dict, directory: str = PROFILE_DIR, keep: int = PROFILE_MAX_STORED):
+    os.makedirs(directory, exist_ok=True)
+    tmp = os.path.join(directory, f"{profile['id']}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profile, f)
+    os.replace(tmp, os.path.join(directory, f"{profile['id']}.json"))
+    # ULIDs sort by creation time, so the oldest come first
+    stored = sorted(name for name in os.listdir(directory) if name.endswith(".json"))
+    for name in stored[:max(0, len(stored) - keep)]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+
+
+def load_profile(profile_id: str, directory: str = PROFILE_DIR):
+    """The stored profile, or None (also for ids that could not be ours)."""
+    if not profile_id.isalnum():
+        return None
+    try:
+        with open(os.path.join(directory, f"{profile_id}.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def list_profiles(ngo_name: str, directory: str = PROFILE_DIR) -> list:
+    """Summaries of a tenant's stored profiles, newest first."""
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        profile = load_profile(name[:-len(".json")], directory) if name.endswith(".json") else None
+        if profile and profile["ngo_name"] == ngo_name:
+            profile.pop("stacks")
+            summaries.append(profile)
+    return summaries
+
+
+def collapsed(profile: dict) -> str:
+    """Stacks in the folded format read by flamegraph.pl and speedscope."""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+
+async def _claims(headers: dict):
+    """Claims of the request's token, checked like get_current_user, or None."""
+    authorization = headers.get(b"authorization", b"").decode("latin-1")
+    if not authorization.startswith("Bearer "):
+        return None
+    try:
+        return await verified_claims(authorization[len("Bearer "):])
+    except HTTPException:
+        return None
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles admin-flagged requests and a random sample of the rest."""
+
+    def __init__(self, app, sample_rate: float = PROFILE_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+        self._busy = threading.Lock()
+
+    async def _trigger(self, scope) -> tuple:
+        """("requested" or "sampled", tenant) when this request should be profiled."""
+        headers = dict(scope["headers"])
+        flag = headers.get(PROFILE_HEADER, b"").decode("latin-1")
+        if not flag:
+            flag = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile", [""])[0]
+        if flag.lower() in ENABLED_VALUES:
+            claims = await _claims(headers)
+            if claims and claims.get("role") == "admin":
+                return "requested", claims["ngo"]
+        if self.sample_rate > 0 and random.random() < self.sample_rate:
+            claims = await _claims(headers)
+            return "sampled", claims["ngo"] if claims else None
+        return None, None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        trigger, ngo_name = await self._trigger(scope)
+        # tracemalloc and the CPU clock are process-wide, so one profile at a time
+        if trigger is None or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(trigger, ngo_name, scope["method"], scope["path"])
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", []), (b"x-profile-id", profile.id.encode())
+                ]
+            await send(message)
+
+        profile.start()
+        token = _active.set(profile.sampler)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            _active.reset(token)
+            result = profile.stop(status)
+            self._busy.release()
+            await run_in_threadpool(
+                save_profile, result, PROFILE_DIR if ngo_name else UNATTRIBUTED_DIR
+            )
+            print(f"PROFILE: {trigger} {profile.method} {profile.path} "
+                  f"{result['wall_ms']} ms, saved as {profile.id}")
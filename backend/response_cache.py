@@ -0,0 +1,175 @@
+"""
+Tenant-scoped cache for listing responses, invalidated by version counters.
+
+Every write that changes what a tenant's listings return bumps a counter in
+tenant_versions inside the same transaction: scope "files" for upload
+and delete (via usage_stats), scope "audit" when the audit sink inserts a
+batch. A cached response is keyed by (tenant, path, query params,
+version), so a write makes old entries unreachable instead of having to find
+and delete them; they age out of the LRU.
+
+The key doubles as a strong ETag. A client that sends it back in
+If-None-Match gets a 304, and a repeated listing from any client costs one
+version read plus a cache lookup. Entries live in an in-process LRU with an
+optional Redis tier (RESPONSE_CACHE_REDIS_URL) shared by all workers.
+"""
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Request, Response
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from config import RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_REDIS_URL, RESPONSE_CACHE_TTL
+from models import TenantVersion
+import metrics
+
+REDIS_PREFIX = "safekeep:response:"
+
+
+def bump_version(db, ngo_name: str, scope: str):
+    """Invalidate a tenant's cached responses for scope. Takes a Session or Connection."""
+    dialect = db.dialect.name if hasattr(db, "dialect") else db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(TenantVersion)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(TenantVersion)
+    else:
+        raise RuntimeError(f"tenant_versions upsert not supported on {dialect}")
+    stmt = stmt.values(ngo_name=ngo_name, scope=scope, version=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[TenantVersion.ngo_name, TenantVersion.scope],
+        set_={"version": TenantVersion.version + 1}
+    ))
+
+
+class ResponseCache:
+    """In-process LRU of response bodies with a byte budget, optionally backed by Redis."""
+
+    def __init__(self, max_bytes: int, shared=None, ttl: int = 600):
+        self.max_bytes = max_bytes
+        self.shared = shared
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.stats = {"hits": 0, "shared_hits": 0, "misses": 0, "evictions": 0, "not_modified": 0}
+
+    def count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats, "entries": len(self._entries), "bytes": self._bytes,
+                "shared": self.shared is not None
+            }
+
+    def _put_local(self, key: str, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = body
+            self._bytes += len(body)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.stats["evictions"] += 1
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return body
+        if self.shared is not None:
+            try:
+                body = self.shared.get(REDIS_PREFIX + key)
+            except Exception as e: # pylint: disable=broad-except
+                print(f"CACHE: Shared response cache unavailable: {str(e)}")
+                body = None
+            if body is not None:
+                self.count("shared_hits")
+                self._put_local(key, body)
+                return body
+        self.count("misses")
+        return None
+
+    def put(self, key: str, body: bytes):
+        self._put_local(key, body)
+        if self.shared is not None:
+            try:
+                self.shared.set(REDIS_PREFIX + key, body, ex=self.ttl)
+            except Exception as e: # pylint: disable=broad-except
+                print(f"CACHE: Shared response cache unavailable: {str(e)}")
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Process-wide cache, or None when RESPONSE_CACHE_MAX_BYTES is 0."""
+    global _cache # pylint: disable=global-statement
+    if RESPONSE_CACHE_MAX_BYTES <= 0:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            shared = None
+            if RESPONSE_CACHE_REDIS_URL:
+                # Only imported when configured, so it stays out of startup
+                try:
+                    import redis # pylint: disable=import-outside-toplevel
+                    shared = redis.Redis.from_url(RESPONSE_CACHE_REDIS_URL)
+                except ImportError:
+                    print("CACHE: RESPONSE_CACHE_REDIS_URL set but redis is not installed")
+            _cache = ResponseCache(RESPONSE_CACHE_MAX_BYTES, shared, RESPONSE_CACHE_TTL)
+            metrics.watch_cache("response", _cache)
+        return _cache
+
+
+def _cache_key(ngo_name: str, request: Request, version: int) -> str:
+    raw = json.dumps([
+        ngo_name, request.url.path, sorted(request.query_params.multi_items()), version
+    ], separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    return if_none_match.strip() == "*" or etag in (t.strip() for t in if_none_match.split(","))
+
+
+async def cached_json(request: Request, db, ngo_name: str, scope: str, build) -> Response:
+    """
+    Serve a JSON listing through the cache. build is an async callable returning the
+    uncached response; it only runs on a miss. db is the request's AsyncSession.
+    """
+    version = await db.scalar(
+        select(TenantVersion.version)
+        .where(TenantVersion.ngo_name == ngo_name)  # Tenant isolation
+        .where(TenantVersion.scope == scope)
+    ) or 0
+    key = _cache_key(ngo_name, request, version)
+    headers = {"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+    cache = get_response_cache()
+
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        if cache:
+            cache.count("not_modified")
+        return Response(status_code=304, headers=headers)
+
+    body = cache.get(key) if cache else None
+    if body is None:
+        response = await build()
+        if response.status_code != 200:
+            return response
+        body = response.body
+        if cache:
+            cache.put(key, body)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,42 @@
+"""
+Response classes.
+
+Returning FastJSONResponse(content) from a route skips FastAPI's
+jsonable_encoder pass over every value. The body is encoded with orjson
+when it is installed and with the stdlib json module otherwise, so content
+must already be plain JSON types (format datetimes before returning).
+Clients get the same JSON as from JSONResponse, but not always the same
+bytes: orjson writes some floats differently (0.00001 for 1e-05).
+
+CachedFileResponse serves a file pinned in the object cache and releases the
+pin once the response is over, however it ends.
+"""
+import json
+from typing import Any
+from fastapi.responses import JSONResponse, FileResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+
+class CachedFileResponse(FileResponse):
+    def __init__(self, path: str, cache, **kwargs):
+        super().__init__(path, **kwargs)
+        self.cache = cache
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.cache.release(self.path)
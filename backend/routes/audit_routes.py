@@ -1,29 +1,116 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from database import get_db
-from models import AuditLog, User
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from db_router import get_read_db, read_session_factory
+from models import User
 from dependencies import get_current_user
+from audit_archive import query_logs, iter_logs
+from responses import FastJSONResponse
+from response_cache import cached_json
+import audit_sink
 
 router = APIRouter(prefix="/audit", tags=["audit"])
 
+EXPORT_FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+EXPORT_COLUMNS = ["timestamp", "user", "action", "target", "status", "ip_address"]
+EXPORT_CHUNK_ROWS = 500
+
+def _log_response(l: dict) -> dict:
+    return {
+        "timestamp": l["timestamp"].isoformat(),
+        "user": l["user"],
+        "action": l["action"],
+        "target": l["target"],
+        "status": l["status"],
+        "ip_address": l["ip"]
+    }
+
 @router.get("")
-def list_audit(
+async def list_audit( # pylint: disable=R0913, R0917
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
-    limit: int = 100
+    db: AsyncSession = Depends(get_read_db),
+    limit: int = 100,
+    action: Optional[str] = None,
+    user: Optional[str] = None,
+    target: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    cursor: Optional[str] = None
 ):
+    """
+    One newest-first page of the tenant's audit log, filtered in SQL.
+    Older ranges are served from archived segments. Pass next_cursor back as cursor.
+    """
     # Filter audit logs by NGO
-    logs = db.query(AuditLog)\
-        .filter(AuditLog.ngo_name == current_user.ngo_name)\
-        .order_by(AuditLog.timestamp.desc())\
-        .limit(limit)\
-        .all()
-    
-    return [{
-        "timestamp": l.timestamp.isoformat(),
-        "user": l.user,
-        "action": l.action,
-        "target": l.target,
-        "status": l.status,
-        "ip_address": l.ip
-    } for l in logs]
+    filters = {"action": action, "user": user, "target": target, "since": since, "until": until}
+
+    async def build():
+        logs, next_cursor = await query_logs(db, current_user.ngo_name, limit, filters, cursor)
+        return FastJSONResponse({
+            "items": [_log_response(l) for l in logs],
+            "next_cursor": next_cursor
+        })
+
+    return await cached_json(request, db, current_user.ngo_name, "audit", build)
+
+@router.get("/export")
+async def export_audit( # pylint: disable=R0913, R0917
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    fmt: str = "csv",
+    action: Optional[str] = None,
+    user: Optional[str] = None,
+    target: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None
+):
+    """Stream every matching entry, oldest first, as CSV or NDJSON in constant memory."""
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(400, f"Invalid format: {fmt}. Must be one of {list(EXPORT_FORMATS)}")
+
+    ngo_name = current_user.ngo_name
+    filters = {"action": action, "user": user, "target": target, "since": since, "until": until}
+    session_factory = read_session_factory(ngo_name)
+
+    async def _stream():
+        # Own session: the request-scoped one may be closed while we stream
+        async with session_factory() as db:
+            buf = io.StringIO()
+            writer = csv.writer(buf)
+            if fmt == "csv":
+                writer.writerow(EXPORT_COLUMNS)
+            i = 0
+            async for log in iter_logs(db, ngo_name, filters):
+                row = _log_response(log)
+                if fmt == "csv":
+                    writer.writerow([row[c] for c in EXPORT_COLUMNS])
+                else:
+                    buf.write(json.dumps(row) + "\n")
+                i += 1
+                if i % EXPORT_CHUNK_ROWS == 0:
+                    yield buf.getvalue()
+                    buf.seek(0)
+                    buf.truncate()
+            yield buf.getvalue()
+
+    audit_sink.record(
+        current_user.email,
+        ngo_name,  # Tenant isolation
+        "AUDIT_EXPORT",
+        fmt + "".join(f" {k}={v}" for k, v in filters.items() if v),
+        "Success",
+        request.client.host if request.client else None
+    )
+
+    filename = f"audit_log_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    return StreamingResponse(
+        _stream(),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
@@ -1,44 +1,95 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
-from sqlalchemy.orm import Session
-from database import get_db
-from models import User, AuditLog
-from schemas import LoginRequest, RegisterRequest
-from auth import hash_password, verify_password, create_token
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import ACCESS_TOKEN_MINUTES
+from database import get_async_db
+from dependencies import get_current_user
+from models import User
+from schemas import LoginRequest, RefreshRequest, RegisterRequest
+from auth import (
+    hash_password, verify_password, needs_rehash, create_token, create_refresh_token,
+    decode_token, token_versions
+)
+from login_guard import get_password_pool, throttle_ip, throttle_login
+import audit_sink
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 @router.post("/login")
-def login(req: LoginRequest, request: Request, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == req.email).first()
-    if not user or not verify_password(req.password, user.password_hash):
-        db.add(AuditLog(
-            user=req.email,
-            ngo_name=user.ngo_name if user else "Unknown",  # Fix: Check if user exists
-            action="LOGIN_FAILED",
-            target="System",
-            status="Failed",
-            ip=request.client.host if request.client else None
-        ))
-        db.commit()
+async def login(req: LoginRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    client_ip = request.client.host if request.client else "unknown"
+    # Reject brute force before spending any bcrypt time on it
+    throttle_login(client_ip, req.email)
+
+    pool = get_password_pool()
+    user = await db.scalar(select(User).where(User.email == req.email))
+    if not user or not await pool.run(verify_password, req.password, user.password_hash):
+        audit_sink.record(
+            req.email,
+            user.ngo_name if user else "Unknown",  # Fix: Check if user exists
+            "LOGIN_FAILED",
+            "System",
+            "Failed",
+            request.client.host if request.client else None
+        )
         raise HTTPException(401, "Invalid credentials")
 
-    token = create_token(req.email)
-    db.add(AuditLog(
-        user=req.email,
-        ngo_name=user.ngo_name,  # Tenant isolation
-        action="LOGIN",
-        target="System",
-        status="Success",
-        ip=request.client.host if request.client else None
-    ))
-    db.commit()
+    if needs_rehash(user.password_hash):
+        # BCRYPT_ROUNDS changed since this hash was made; upgrade it while we have the password
+        user.password_hash = await pool.run(hash_password, req.password)
+        await db.commit()
+
+    token = create_token(user)
+    audit_sink.record(
+        req.email,
+        user.ngo_name,  # Tenant isolation
+        "LOGIN",
+        "System",
+        "Success",
+        request.client.host if request.client else None
+    )
 
-    return {"token": token, "email": user.email, "name": user.ngo_name, "ngo": user.ngo_name, "role": user.role}
+    return {
+        "token": token, "refresh_token": create_refresh_token(user),
+        "expires_in": ACCESS_TOKEN_MINUTES * 60,
+        "email": user.email, "name": user.ngo_name, "ngo": user.ngo_name, "role": user.role
+    }
+
+@router.post("/refresh")
+async def refresh(req: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Trade a refresh token for a new access token with the user's current claims."""
+    try:
+        claims = decode_token(req.refresh_token, token_type="refresh")
+    except Exception as e:
+        raise HTTPException(401, f"Invalid token: {str(e)}")
+
+    user = await db.scalar(select(User).where(User.email == claims["sub"]))
+    if not user or user.token_version != claims["ver"]:
+        raise HTTPException(401, "Token has been revoked")
+    token_versions.put(user.email, user.token_version)
+    return {"token": create_token(user), "expires_in": ACCESS_TOKEN_MINUTES * 60}
+
+@router.post("/logout")
+async def logout(
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Revoke every access and refresh token issued to the user so far."""
+    await db.execute(
+        update(User)
+        .where(User.email == current_user.email)
+        .values(token_version=User.token_version + 1)
+    )
+    await db.commit()
+    # Other workers notice within TOKEN_VERSION_CACHE_SECONDS
+    token_versions.invalidate(current_user.email)
+    return {"ok": True}
 
 @router.post("/register")
-def register(req: RegisterRequest, request: Request, db: Session = Depends(get_db)):
+async def register(req: RegisterRequest, request: Request, db: AsyncSession = Depends(get_async_db)):
+    throttle_ip(request.client.host if request.client else "unknown")
     try:
-        existing = db.query(User).filter(User.email == req.email).first()
+        existing = await db.scalar(select(User).where(User.email == req.email))
         if existing:
             raise HTTPException(400, "Email already exists")
         
@@ -49,19 +100,19 @@ def register(req: RegisterRequest, request: Request, db: Session = Depends(get_d
         user = User(
             ngo_name=req.ngo_name,
             email=req.email,
-            password_hash=hash_password(req.password),
+            password_hash=await get_password_pool().run(hash_password, req.password),
             role=req.role  # Use role from request (defaults to 'admin' if not provided)
         )
         db.add(user)
-        db.add(AuditLog(
-            user=req.email,
-            ngo_name=req.ngo_name,  # Tenant isolation
-            action="REGISTER",
-            target="System",
-            status="Success",
-            ip=request.client.host if request.client else None
-        ))
-        db.commit()
+        await db.commit()
+        audit_sink.record(
+            req.email,
+            req.ngo_name,  # Tenant isolation
+            "REGISTER",
+            "System",
+            "Success",
+            request.client.host if request.client else None
+        )
 
         return {"ok": True}
     except HTTPException:
@@ -73,6 +124,6 @@ def register(req: RegisterRequest, request: Request, db: Session = Depends(get_d
         error_details = traceback.format_exc()
         print(f"Registration error: {str(e)}")
         print(error_details)
-        db.rollback()
+        await db.rollback()
         raise HTTPException(500, f"Internal server error: {str(e)}")
 
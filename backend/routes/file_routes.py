@@ -1,98 +1,166 @@
 from datetime import datetime
-import time
-from fastapi import APIRouter, UploadFile, File, Depends, Form, HTTPException, Request
+import os
+import json
+import queue
+import shutil
+import tempfile
+import threading
+from typing import List, Optional
+from fastapi import APIRouter, UploadFile, File, Depends, Form, HTTPException, Request, Header
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
-from database import get_db
-from models import FileRecord, AuditLog, User
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db, SessionLocal
+from db_router import get_read_db
+from models import FileRecord, User
 from dependencies import get_current_user
 
-from compression_engine import compress_pdf_with_ghostscript, compress_image_really
-from s3_service import upload_bytes_to_s3
+from config import (
+    FILE_ID_PREFIX, DIRECT_UPLOAD_PREFIX, DIRECT_UPLOAD_MAX_BYTES, EXPORT_MAX_FILES, BATCH_UPLOAD_MAX_FILES
+)
+from schemas import (
+    DirectUploadInitRequest, DirectUploadCompleteRequest, ResumableUploadCreateRequest,
+    ExportRequest
+)
+import upload_sessions
+from ids import new_ulid
+from upload_sessions import UploadSessionError
+from compression_engine import compress_upload_file, get_compression_pool
+from export_service import stream_zip
+from profiler import attributed
+from responses import FastJSONResponse, CachedFileResponse
+from response_cache import cached_json
+from pagination import keyset_apply, keyset_split, like_pattern, encode_cursor, decode_cursor
+import audit_sink
+import metrics
+import search_index
+import usage_stats
+from search_index import extract_text
+from object_cache import get_object_cache
+from s3_service import (
+    upload_file_to_s3, generate_presigned_upload, head_direct_upload, download_to_file,
+    delete_object,
+    get_upload_pool, client_error
+)
 
 router = APIRouter(prefix="/files", tags=["files"])
 
-@router.post("/upload")
-async def upload_file( # pylint: disable=R0913, R0917, R0914
-    request: Request,
-    current_user: User = Depends(get_current_user),
-    category: str = Form(...),
-    compression_level: str = Form("medium"),
-    user_email: str = Form(...),
-    upload: UploadFile = File(...),
-    db: Session = Depends(get_db)
-):
-    file_name = upload.filename
-    file_bytes = await upload.read()
-    original_size = len(file_bytes)
+def _new_file_id() -> str:
+    # Time-ordered, so new rows append to the end of the files indexes
+    return f"{FILE_ID_PREFIX}{new_ulid()}"
+
+# Uploads are staged to local files and flow through the pipeline from disk, so a
+# worker's memory does not grow with the size of the files it is handling
+STAGING_COPY_CHUNK = 1024 * 1024
 
-    ext = file_name.lower().split(".")[-1]
+def _staging_path() -> str:
+    fd, path = tempfile.mkstemp(prefix="safekeep-upload-")
+    os.close(fd)
+    return path
 
+def _stage_upload(upload: UploadFile) -> str:
+    """Copy a multipart upload into a staging file of its own."""
+    path = _staging_path()
+    upload.file.seek(0)
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload.file, f, STAGING_COPY_CHUNK)
+    return path
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _compress_file(path: str, file_name: str, compression_level: str) -> dict:
+    """Stage 1 of an upload: run the compression pipeline on a staged file."""
     # ==== YOUR COMPRESSION LOGIC ====
-    if ext == "pdf":
-        compressed_data, method, ratio = compress_pdf_with_ghostscript(
-            file_bytes, compression_level.lower()
-        )
-        content_type = "application/pdf"
-    elif ext in ["jpg", "jpeg", "png", "gif", "bmp", "tiff"]:
-        compressed_data, method, ratio = compress_image_really(
-            file_bytes, compression_level.lower()
+    with metrics.upload_stage("compress"):
+        compressed_path, method, ratio, content_type = compress_upload_file(
+            path, file_name, compression_level
         )
-        content_type = f"image/{ext}" if ext != "jpg" else "image/jpeg"
-    else:
-        compressed_data = file_bytes
-        method = "No Compression"
-        ratio = 0
-        content_type = "application/octet-stream"
-
-    compressed_size = len(compressed_data)
+    metrics.record_compression(method, ratio)
+    with metrics.upload_stage("extract"):
+        search_text = extract_text(path, file_name)
+    return {
+        "name": file_name,
+        "original_size": os.path.getsize(path),
+        "source_path": path,
+        "compressed_path": compressed_path,
+        "compressed_size": os.path.getsize(compressed_path),
+        "compression_ratio": ratio,
+        "compression_method": method,
+        "compression_level": compression_level,
+        "content_type": content_type,
+        "search_text": search_text
+    }
 
-    # Upload compressed to S3
+def _put_compressed(item: dict, category: str) -> dict:
+    """Stage 2 of an upload: stream the compressed file to S3, then remove it."""
     metadata = {
-        "original-size": original_size,
-        "compressed-size": compressed_size,
-        "compression-ratio": f"{ratio:.1f}",
-        "compression-method": method,
-        "original-filename": file_name,
-        "compression-level": compression_level,
+        "original-size": item["original_size"],
+        "compressed-size": item["compressed_size"],
+        "compression-ratio": f"{item['compression_ratio']:.1f}",
+        "compression-method": item["compression_method"],
+        "original-filename": item["name"],
+        "compression-level": item["compression_level"],
         "upload-date": datetime.utcnow().isoformat()
     }
 
-    s3_key, s3_path = upload_bytes_to_s3(
-        data=compressed_data,
-        filename=file_name,
-        category=category,
-        metadata=metadata,
-        content_type=content_type
-    )
+    # Assigned before the PUT so the object key can carry it
+    item["id"] = _new_file_id()
+    try:
+        with metrics.upload_stage("s3_put"):
+            s3_key, s3_path = upload_file_to_s3(
+                path=item["compressed_path"],
+                file_id=item["id"],
+                filename=item["name"],
+                category=category,
+                metadata=metadata,
+                content_type=item["content_type"]
+            )
+    finally:
+        # The compressor's output is ours; the staged source belongs to whoever staged it
+        if item["compressed_path"] != item["source_path"]:
+            _remove_quietly(item["compressed_path"])
+    item["s3_key"] = s3_key
+    item["s3_path"] = s3_path
+    return item
 
-    file_id = f"file_{int(time.time())}"
+def _add_upload_rows(
+    db: Session, item: dict, category: str, user_email: str, ngo_name: str
+) -> FileRecord:
+    """Stage 3 of an upload: stage the FileRecord and counters (caller commits, then audits)."""
     rec = FileRecord(
-        id=file_id,
-        name=file_name,
+        id=item["id"],
+        name=item["name"],
         category=category,
-        original_size=original_size,
-        compressed_size=compressed_size,
-        compression_ratio=ratio,
-        compression_method=method,
+        original_size=item["original_size"],
+        compressed_size=item["compressed_size"],
+        compression_ratio=item["compression_ratio"],
+        compression_method=item["compression_method"],
         uploaded_by=user_email,
-        ngo_name=current_user.ngo_name,  # Tenant isolation
-        s3_key=s3_key,
+        ngo_name=ngo_name,  # Tenant isolation
+        s3_key=item["s3_key"],
         status="active"
     )
 
     db.add(rec)
+    search_index.index_file(
+        db, rec.id, ngo_name, item["name"], category, item.get("search_text", "")
+    )
+    usage_stats.record_upload(
+        db, ngo_name, category, item["original_size"], item["compressed_size"]
+    )
+    return rec
 
-    db.add(AuditLog(
-        user=user_email,
-        ngo_name=current_user.ngo_name,  # Tenant isolation
-        action="UPLOAD",
-        target=file_name,
-        status="Success",
-        ip=request.client.host if request.client else None
-    ))
-
-    db.commit()
+def _audit_upload(item: dict, user_email: str, ngo_name: str, ip: str = None):
+    # Queued only after commit so a rolled-back upload is never logged
+    audit_sink.record(user_email, ngo_name, "UPLOAD", item["name"], "Success", ip)
 
+def _file_response(rec: FileRecord, s3_path: str) -> dict:
     return {
         "id": rec.id,
         "name": rec.name,
@@ -110,18 +178,301 @@ async def upload_file( # pylint: disable=R0913, R0917, R0914
         "s3_path": s3_path
     }
 
-@router.get("")
-def list_files(
+async def _store_upload( # pylint: disable=R0913, R0917
+    db: AsyncSession,
+    path: str,
+    file_name: str,
+    category: str,
+    compression_level: str,
+    user_email: str,
+    ngo_name: str,
+    ip: str = None
+):
+    """
+    Compress, push to S3 and record a single upload staged at path (left for the
+    caller to remove). Returns the API response dict.
+    """
+    item = await run_in_threadpool(
+        lambda: _put_compressed(_compress_file(path, file_name, compression_level), category)
+    )
+    with metrics.upload_stage("db_commit"):
+        rec = await db.run_sync(_add_upload_rows, item, category, user_email, ngo_name)
+        await db.commit()
+    # Reload as stored, like the sync session's expire-on-commit did
+    await db.refresh(rec)
+    _audit_upload(item, user_email, ngo_name, ip)
+    return _file_response(rec, item["s3_path"])
+
+@router.post("/upload")
+async def upload_file( # pylint: disable=R0913, R0917
+    request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    category: str = Form(...),
+    compression_level: str = Form("medium"),
+    user_email: str = Form(...),
+    upload: UploadFile = File(...),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    # Filter files by NGO
-    files = db.query(FileRecord)\
-        .filter(FileRecord.ngo_name == current_user.ngo_name)\
-        .filter(FileRecord.status == "active")\
-        .order_by(FileRecord.uploaded_at.desc())\
-        .all()
-    return [{
+    with metrics.upload_stage("read"):
+        path = await run_in_threadpool(_stage_upload, upload)
+    try:
+        return await _store_upload(
+            db, path, upload.filename, category, compression_level,
+            user_email, current_user.ngo_name,
+            ip=request.client.host if request.client else None
+        )
+    finally:
+        _remove_quietly(path)
+
+@router.post("/upload/batch")
+def upload_batch( # pylint: disable=R0913, R0917
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    category: str = Form(...),
+    compression_level: str = Form("medium"),
+    user_email: str = Form(...),
+    uploads: List[UploadFile] = File(...)
+):
+    """
+    Upload many files in one request.
+
+    Every file is staged to disk before the response starts, so nothing is
+    read from the request once the endpoint has returned. Files are then
+    compressed in parallel on the compression pool and each S3 PUT starts as
+    soon as its file is compressed. A batch thread commits each stored file's
+    FileRecord as it arrives and emits one NDJSON line per file in completion
+    order, then a final {"done": true, ...} line. The thread runs to the end
+    whether or not the client keeps reading the stream.
+    """
+    if len(uploads) > BATCH_UPLOAD_MAX_FILES:
+        raise HTTPException(413, f"Batch is limited to {BATCH_UPLOAD_MAX_FILES} files")
+
+    ngo_name = current_user.ngo_name
+    ip = request.client.host if request.client else None
+    names = [upload.filename for upload in uploads]
+    staged = []
+    try:
+        for upload in uploads:
+            with metrics.upload_stage("read"):
+                staged.append(_stage_upload(upload))
+    except Exception:
+        for path in staged:
+            _remove_quietly(path)
+        raise
+
+    results = queue.Queue()
+    lines = queue.Queue()
+
+    def _put(idx, item):
+        try:
+            results.put((idx, _put_compressed(item, category), None))
+        except Exception as e: # pylint: disable=broad-except
+            results.put((idx, None, e))
+        finally:
+            _remove_quietly(item["source_path"])
+
+    def _compress(idx, path):
+        try:
+            item = _compress_file(path, names[idx], compression_level)
+            get_upload_pool().submit(attributed(_put), idx, item)
+        except Exception as e: # pylint: disable=broad-except
+            _remove_quietly(path)
+            results.put((idx, None, e))
+
+    def _failed(idx, error):
+        return json.dumps({"index": idx, "name": names[idx],
+                           "status": "failed", "error": str(error)}) + "\n"
+
+    def _run():
+        pool = get_compression_pool()
+        for idx, path in enumerate(staged):
+            pool.submit(attributed(_compress), idx, path)
+
+        files = []
+        # Own session: the request-scoped one is closed once the endpoint returns
+        db = SessionLocal()
+        try:
+            for _ in staged:
+                idx, item, error = results.get()
+                if error is not None:
+                    lines.put(_failed(idx, error))
+                    continue
+                try:
+                    with metrics.upload_stage("db_commit"):
+                        rec = _add_upload_rows(db, item, category, user_email, ngo_name)
+                        db.commit()
+                except Exception as e: # pylint: disable=broad-except
+                    db.rollback()
+                    lines.put(_failed(idx, e))
+                    continue
+                _audit_upload(item, user_email, ngo_name, ip)
+                files.append(_file_response(rec, item["s3_path"]))
+                lines.put(json.dumps({
+                    "index": idx, "id": rec.id, "name": item["name"], "status": "stored",
+                    "original_size": item["original_size"],
+                    "compressed_size": item["compressed_size"],
+                    "compression_ratio": item["compression_ratio"],
+                    "compression_method": item["compression_method"],
+                    "s3_path": item["s3_path"]
+                }) + "\n")
+        finally:
+            db.close()
+            lines.put(json.dumps({
+                "done": True, "committed": len(files),
+                "failed": len(staged) - len(files), "files": files
+            }) + "\n")
+            lines.put(None)
+
+    threading.Thread(target=attributed(_run), name="batch-upload", daemon=True).start()
+
+    def _stream():
+        while (line := lines.get()) is not None:
+            yield line
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
+
+@router.post("/upload/initiate")
+def initiate_direct_upload(
+    req: DirectUploadInitRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Return a presigned POST so the client can send bytes straight to S3."""
+    if req.size is not None and req.size > DIRECT_UPLOAD_MAX_BYTES:
+        raise HTTPException(413, f"File exceeds {DIRECT_UPLOAD_MAX_BYTES} bytes")
+
+    try:
+        return generate_presigned_upload(
+            req.filename, req.category, current_user.ngo_name, current_user.email
+        )
+    except client_error() as e:
+        raise HTTPException(500, f"Error creating upload URL: {str(e)}")
+
+@router.post("/upload/complete")
+async def complete_direct_upload(
+    req: DirectUploadCompleteRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Compress and record an object the client uploaded via /upload/initiate."""
+    if not req.key.startswith(f"{DIRECT_UPLOAD_PREFIX}/") or ".." in req.key:
+        raise HTTPException(400, "Invalid upload key")
+
+    try:
+        metadata, size = await run_in_threadpool(head_direct_upload, req.key)
+    except client_error() as e:
+        raise HTTPException(404, f"Upload not found: {str(e)}")
+
+    # Tenant is pinned in the signed policy, so this cannot be spoofed by the client
+    if metadata.get("ngo-name") != current_user.ngo_name:
+        raise HTTPException(404, "Upload not found")
+    # The policy caps the size too; checked again before anything is downloaded
+    if size > DIRECT_UPLOAD_MAX_BYTES:
+        raise HTTPException(413, f"File exceeds {DIRECT_UPLOAD_MAX_BYTES} bytes")
+
+    path = _staging_path()
+    try:
+        try:
+            with metrics.upload_stage("read"):
+                await run_in_threadpool(download_to_file, req.key, path)
+        except client_error() as e:
+            raise HTTPException(404, f"Upload not found: {str(e)}")
+
+        result = await _store_upload(
+            db, path, req.key.rsplit("/", 1)[-1],
+            metadata.get("category", "Uncategorized"), req.compression_level,
+            req.user_email or metadata.get("uploaded-by", current_user.email),
+            current_user.ngo_name,
+            ip=request.client.host if request.client else None
+        )
+    finally:
+        _remove_quietly(path)
+
+    await run_in_threadpool(delete_object, req.key)
+    return result
+
+def _session_error(e: UploadSessionError) -> HTTPException:
+    return HTTPException(e.status_code, e.detail)
+
+@router.post("/uploads")
+def create_resumable_upload(
+    req: ResumableUploadCreateRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Open a resumable upload session. Chunks are then PUT at byte offsets."""
+    try:
+        return upload_sessions.create_session(
+            current_user.ngo_name, current_user.email, req.filename, req.category,
+            req.size, req.compression_level, req.sha256
+        )
+    except UploadSessionError as e:
+        raise _session_error(e)
+
+@router.put("/uploads/{upload_id}")
+async def put_upload_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    x_chunk_sha256: Optional[str] = Header(None)
+):
+    """Store one chunk. The body is the raw chunk bytes; X-Chunk-SHA256 is required."""
+    data = await request.body()
+    try:
+        return await run_in_threadpool(
+            upload_sessions.write_chunk,
+            upload_id, current_user.ngo_name, offset, data, x_chunk_sha256
+        )
+    except UploadSessionError as e:
+        raise _session_error(e)
+
+@router.get("/uploads/{upload_id}")
+def get_upload_status(
+    upload_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Report received ranges so a client can resume after a failure."""
+    try:
+        return upload_sessions.session_status(
+            upload_sessions.get_session(upload_id, current_user.ngo_name)
+        )
+    except UploadSessionError as e:
+        raise _session_error(e)
+
+@router.post("/uploads/{upload_id}/complete")
+async def complete_resumable_upload(
+    upload_id: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Assemble the session, run the compression pipeline and record the file."""
+    try:
+        with metrics.upload_stage("read"):
+            meta, path = await run_in_threadpool(
+                upload_sessions.read_completed, upload_id, current_user.ngo_name
+            )
+    except UploadSessionError as e:
+        raise _session_error(e)
+
+    result = await _store_upload(
+        db, path, meta["filename"], meta["category"], meta["compression_level"],
+        meta["user_email"], current_user.ngo_name,
+        ip=request.client.host if request.client else None
+    )
+
+    await run_in_threadpool(upload_sessions.discard_session, upload_id)
+    return result
+
+# Only what a listing returns, selected as plain rows rather than hydrated FileRecords
+LISTING_COLUMNS = (
+    FileRecord.id, FileRecord.name, FileRecord.category, FileRecord.original_size,
+    FileRecord.compressed_size, FileRecord.compression_ratio, FileRecord.uploaded_by,
+    FileRecord.uploaded_at, FileRecord.s3_key
+)
+
+def _listing_item(f) -> dict:
+    return {
         "id": f.id,
         "name": f.name,
         "category": f.category,
@@ -131,90 +482,269 @@ def list_files(
         "uploaded_by": f.uploaded_by,
         "uploaded_at": f.uploaded_at.isoformat() if f.uploaded_at else None,
         "s3_path": f.s3_key
-    } for f in files]
+    }
 
-@router.delete("/{file_id}")
-def delete_file(
-    file_id: str,
-    user_email: str,
+# sort name -> (column, descending)
+FILE_SORTS = {
+    "newest": (FileRecord.uploaded_at, True),
+    "oldest": (FileRecord.uploaded_at, False),
+    "name_asc": (FileRecord.name, False),
+    "name_desc": (FileRecord.name, True),
+    "largest": (FileRecord.original_size, True),
+}
+
+@router.get("")
+async def list_files( # pylint: disable=R0913, R0917
     request: Request,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db),
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    uploaded_by: Optional[str] = None,
+    min_size: Optional[int] = None,
+    max_size: Optional[int] = None,
+    sort: str = "newest",
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    include_total: bool = False
 ):
-    rec = db.query(FileRecord)\
-        .filter(FileRecord.id == file_id)\
+    """
+    One page of the tenant's active files, filtered and sorted in SQL.
+    Pass next_cursor back as cursor to fetch the following page.
+    """
+    if sort not in FILE_SORTS:
+        raise HTTPException(400, f"Invalid sort: {sort}. Must be one of {list(FILE_SORTS)}")
+
+    async def build():
+        # Filter files by NGO
+        query = select(*LISTING_COLUMNS)\
+            .filter(FileRecord.ngo_name == current_user.ngo_name)\
+            .filter(FileRecord.status == "active")
+        if q:
+            query = query.filter(FileRecord.name.ilike(like_pattern(q), escape="\\"))
+        if category and category != "All":
+            query = query.filter(FileRecord.category == category)
+        if uploaded_by:
+            query = query.filter(FileRecord.uploaded_by == uploaded_by)
+        if min_size is not None:
+            query = query.filter(FileRecord.original_size >= min_size)
+        if max_size is not None:
+            query = query.filter(FileRecord.original_size <= max_size)
+
+        total = await db.scalar(
+            select(func.count()).select_from(query.subquery())
+        ) if include_total else None
+
+        sort_column, descending = FILE_SORTS[sort]
+        page, page_size = keyset_apply(
+            query, sort_column, FileRecord.id, descending, limit, cursor
+        )
+        files, next_cursor = keyset_split(
+            (await db.execute(page)).all(), sort_column, FileRecord.id, page_size
+        )
+
+        return FastJSONResponse({
+            "items": [_listing_item(f) for f in files],
+            "next_cursor": next_cursor,
+            "total": total
+        })
+
+    return await cached_json(request, db, current_user.ngo_name, "files", build)
+
+@router.get("/search")
+async def search_files( # pylint: disable=R0913, R0917
+    q: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_db),
+    category: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None
+):
+    """Ranked full-text search over names, categories and document text."""
+    limit = max(1, min(limit, 100))
+    offset = 0
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise HTTPException(400, "Invalid cursor")
+        offset = values[0]
+
+    if category == "All":
+        category = None
+
+    async def build():
+        # One extra hit tells us whether there is another page
+        hits = await db.run_sync(
+            search_index.search, current_user.ngo_name, q, category, limit + 1, offset
+        )
+        next_cursor = encode_cursor([offset + limit]) if len(hits) > limit else None
+        hits = hits[:limit]
+
+        records = {
+            f.id: f for f in await db.execute(
+                select(*LISTING_COLUMNS)
+                .filter(FileRecord.id.in_([h["file_id"] for h in hits]))
+                .filter(FileRecord.ngo_name == current_user.ngo_name)
+                .filter(FileRecord.status == "active")
+            )
+        } if hits else {}
+
+        return FastJSONResponse({
+            "items": [
+                {**_listing_item(f), "rank": h["rank"], "snippet": h["snippet"]}
+                for h in hits for f in [records.get(h["file_id"])] if f
+            ],
+            "next_cursor": next_cursor
+        })
+
+    return await cached_json(request, db, current_user.ngo_name, "files", build)
+
+@router.post("/export")
+async def export_files(
+    req: ExportRequest,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Stream a ZIP of the selected files (by id list or category) in constant memory."""
+    if not req.file_ids and not req.category:
+        raise HTTPException(400, "Provide file_ids or category")
+
+    query = select(
+        FileRecord.id, FileRecord.name, FileRecord.category,
+        FileRecord.s3_key, FileRecord.uploaded_at
+    )\
         .filter(FileRecord.ngo_name == current_user.ngo_name)\
-        .first()
-    
+        .filter(FileRecord.status == "active")
+    if req.file_ids:
+        query = query.filter(FileRecord.id.in_(req.file_ids))
+    if req.category:
+        query = query.filter(FileRecord.category == req.category)
+
+    rows = (await db.execute(
+        query.order_by(FileRecord.uploaded_at, FileRecord.id)\
+            .limit(EXPORT_MAX_FILES + 1)
+    )).all()
+    if not rows:
+        raise HTTPException(404, "No files to export")
+    if len(rows) > EXPORT_MAX_FILES:
+        raise HTTPException(413, f"Export is limited to {EXPORT_MAX_FILES} files")
+
+    # Keep the caller's order when ids were given explicitly
+    records = [row._asdict() for row in rows]
+    if req.file_ids:
+        position = {file_id: i for i, file_id in enumerate(req.file_ids)}
+        records.sort(key=lambda r: position[r["id"]])
+
+    audit_sink.record(
+        current_user.email,
+        current_user.ngo_name,  # Tenant isolation
+        "EXPORT",
+        f"{len(records)} files" + (f" ({req.category})" if req.category else ""),
+        "Success",
+        request.client.host if request.client else None
+    )
+
+    filename = f"safekeep_export_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}.zip"
+    return StreamingResponse(
+        stream_zip(records),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+def _delete_rows(db: Session, rec: FileRecord):
+    if rec.status == "active":
+        usage_stats.record_delete(
+            db, rec.ngo_name, rec.category, rec.original_size, rec.compressed_size
+        )
+    rec.status = "deleted"
+    search_index.remove_file(db, rec.id)
+
+async def _get_file(db: AsyncSession, file_id: str, ngo_name: str) -> FileRecord:
+    rec = await db.scalar(
+        select(FileRecord)\
+            .filter(FileRecord.id == file_id)\
+            .filter(FileRecord.ngo_name == ngo_name)  # Tenant isolation
+    )
     if not rec:
         raise HTTPException(404, "File not found")
-    
-    rec.status = "deleted"
-    db.add(AuditLog(
-        user=user_email,
-        ngo_name=current_user.ngo_name,  # Tenant isolation
-        action="DELETE",
-        target=rec.name,
-        status="Success",
-        ip=request.client.host if request.client else None
-    ))
-    db.commit()
+    return rec
+
+@router.delete("/{file_id}")
+async def delete_file(
+    file_id: str,
+    user_email: str,
+    request: Request,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    rec = await _get_file(db, file_id, current_user.ngo_name)
+    await db.run_sync(lambda session: _delete_rows(session, rec))
+    await db.commit()
+    audit_sink.record(
+        user_email,
+        current_user.ngo_name,  # Tenant isolation
+        "DELETE",
+        rec.name,
+        "Success",
+        request.client.host if request.client else None
+    )
     return {"ok": True}
 
 @router.get("/{file_id}/download")
-def download_file(
+async def download_file(
     file_id: str,
     user_email: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Generate a presigned URL or return file bytes (for simple DB storage)"""
-    rec = db.query(FileRecord)\
-        .filter(FileRecord.id == file_id)\
-        .filter(FileRecord.ngo_name == current_user.ngo_name)\
-        .first()
-    if not rec:
-        raise HTTPException(404, "File not found")
-    
+    rec = await _get_file(db, file_id, current_user.ngo_name)
+
     # In a real S3 setup, we would generate a presigned URL
     # url = s3_generate_presigned_url(rec.s3_key)
     # return {"url": url}
 
-    # Since we are likely simulating or using direct bytes for this resumes project,
-    # and s3_service might not actually be hooked to real S3 for retrieval yet?
-    # backend/s3_service.py uses boto3. 
-    # If the user has real AWS creds (which they do now!), we can fetch from S3.
-    
-    from s3_service import s3, S3_BUCKET_NAME
-    from fastapi.responses import StreamingResponse
-    import botocore
-
+    # Hot objects are served from the local disk cache; misses fetch from S3 once
+    cache = get_object_cache()
     try:
-        response = s3.get_object(Bucket=S3_BUCKET_NAME, Key=rec.s3_key)
+        # compressed_size is the stored object's size, so an object too big to cache
+        # goes straight to the streaming path below without being fetched first
+        path = await run_in_threadpool(
+            cache.acquire, rec.s3_key, rec.compressed_size
+        ) if cache else None
+        if path:
+            # Pinned until the response is over, so eviction cannot pull it away
+            return CachedFileResponse(
+                path,
+                cache,
+                media_type="application/octet-stream",
+                filename=rec.name
+            )
+
+        from s3_service import get_s3, bucket
+        response = await run_in_threadpool(
+            get_s3().get_object, Bucket=bucket(), Key=rec.s3_key
+        )
         return StreamingResponse(
             response["Body"],
             media_type="application/octet-stream",
             headers={"Content-Disposition": f'attachment; filename="{rec.name}"'}
         )
-    except botocore.exceptions.ClientError as e:
+    except client_error() as e:
         raise HTTPException(500, f"Error fetching from S3: {str(e)}")
 
 @router.post("/{file_id}/share")
-def share_file(
+async def share_file(
     file_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     expiration: int = 3600
 ):
     """Generate a presigned URL for sharing a file"""
-    rec = db.query(FileRecord)\
-        .filter(FileRecord.id == file_id)\
-        .filter(FileRecord.ngo_name == current_user.ngo_name)\
-        .first()
-    
-    if not rec:
-        raise HTTPException(404, "File not found")
-    
+    rec = await _get_file(db, file_id, current_user.ngo_name)
+
     from s3_service import generate_presigned_url
     
     url = generate_presigned_url(rec.s3_key, expiration)
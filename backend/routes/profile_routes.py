@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from models import User
+from dependencies import get_current_user
+from profiler import list_profiles, load_profile, collapsed
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin"])
+
+def _require_admin(current_user: User):
+    if current_user.role != "admin":
+        raise HTTPException(403, "Admin access required")
+
+@router.get("")
+def get_profiles(current_user: User = Depends(get_current_user)):
+    """This tenant's stored request profiles, newest first (stacks omitted)"""
+    _require_admin(current_user)
+    return list_profiles(current_user.ngo_name)
+
+@router.get("/{profile_id}")
+def get_profile(
+    profile_id: str,
+    format: str = "json", # pylint: disable=redefined-builtin
+    current_user: User = Depends(get_current_user)
+):
+    """One profile as JSON, or with format=collapsed as folded stacks for a flame graph"""
+    _require_admin(current_user)
+    profile = load_profile(profile_id)
+    if profile is None or profile["ngo_name"] != current_user.ngo_name:
+        raise HTTPException(404, "Profile not found")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed(profile))
+    return profile
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from database import get_db
+from db_router import get_sync_read_db
+from models import User
+from dependencies import get_current_user
+from usage_stats import get_stats, reconcile
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+@router.get("")
+def tenant_stats(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_sync_read_db)
+):
+    """Dashboard totals and per-category breakdown from the tenant_usage counters"""
+    return get_stats(db, current_user.ngo_name)
+
+@router.post("/reconcile")
+def reconcile_stats(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Recompute this tenant's counters from the files table (admin only)"""
+    if current_user.role != "admin":
+        raise HTTPException(403, "Admin access required")
+    reconcile(db, current_user.ngo_name)
+    return get_stats(db, current_user.ngo_name)
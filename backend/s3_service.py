@@ -1,25 +1,80 @@
-from datetime import datetime
-import boto3
-from config import S3_BUCKET_NAME, AWS_REGION
+import os
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import metrics
+import config
+from config import (
+    AWS_REGION, FILE_ID_PREFIX,
+    DIRECT_UPLOAD_PREFIX, DIRECT_UPLOAD_MAX_BYTES, DIRECT_UPLOAD_EXPIRY
+)
 
-s3 = boto3.client("s3", region_name=AWS_REGION)
+# boto3 costs ~100ms to import and a client more to build, so both wait for the first S3 call
+_s3 = None
+_s3_lock = threading.Lock()
 
-def upload_bytes_to_s3(
-    data: bytes, filename: str, category: str, metadata: dict, content_type: str
+def get_s3():
+    """Shared S3 client, created on first use."""
+    global _s3 # pylint: disable=global-statement
+    with _s3_lock:
+        if _s3 is None:
+            import boto3 # pylint: disable=import-outside-toplevel
+            _s3 = boto3.client("s3", region_name=AWS_REGION)
+            metrics.instrument_s3(_s3)
+        return _s3
+
+def bucket() -> str:
+    """
+    The vault bucket. Read on each call rather than imported, because it may come
+    from Secrets Manager and importing this module must not fetch it.
+    """
+    return config.S3_BUCKET_NAME
+
+def client_error():
+    """
+    botocore's ClientError, for except clauses. Those are only evaluated when an
+    exception is raised, so callers don't import botocore at startup.
+    """
+    from botocore.exceptions import ClientError # pylint: disable=import-outside-toplevel
+    return ClientError
+
+# boto3 clients are thread-safe; PUTs are network-bound so they get their own pool
+S3_UPLOAD_CONCURRENCY = int(os.getenv("S3_UPLOAD_CONCURRENCY", "8"))
+_upload_pool = None
+_upload_pool_lock = threading.Lock()
+
+def get_upload_pool():
+    """Shared executor for pipelined S3 PUTs, created on first use."""
+    global _upload_pool # pylint: disable=global-statement
+    with _upload_pool_lock:
+        if _upload_pool is None:
+            _upload_pool = ThreadPoolExecutor(
+                max_workers=S3_UPLOAD_CONCURRENCY, thread_name_prefix="s3-put"
+            )
+            metrics.watch_executor("s3_upload", _upload_pool)
+        return _upload_pool
+
+def upload_file_to_s3( # pylint: disable=R0913, R0917
+    path: str, file_id: str, filename: str, category: str, metadata: dict, content_type: str
 ):
+    """
+    Stream a local file to S3 (multipart above the transfer threshold).
+
+    The key carries the file's ULID, which is unique and sorts by upload time,
+    so two uploads of the same name in the same second get separate objects.
+    """
     safe_category = category.lower()
-    ts = datetime.utcnow().strftime("%Y%m%d_%H%M%S")
-    key = f"{safe_category}/{ts}_{filename}"
+    key = f"{safe_category}/{file_id[len(FILE_ID_PREFIX):]}_{filename}"
 
-    s3.put_object(
-        Bucket=S3_BUCKET_NAME,
-        Key=key,
-        Body=data,
-        ContentType=content_type,
-        Metadata={k: str(v) for k, v in metadata.items()}
+    get_s3().upload_file(
+        path, bucket(), key,
+        ExtraArgs={
+            "ContentType": content_type,
+            "Metadata": {k: str(v) for k, v in metadata.items()}
+        }
     )
 
-    return key, f"s3://{S3_BUCKET_NAME}/{key}"
+    return key, f"s3://{bucket()}/{key}"
 
 def generate_presigned_url(s3_key: str, expiration: int = 3600) -> str:
     """
@@ -33,12 +88,71 @@ def generate_presigned_url(s3_key: str, expiration: int = 3600) -> str:
         Presigned URL string
     """
     try:
-        url = s3.generate_presigned_url(
+        url = get_s3().generate_presigned_url(
             'get_object',
-            Params={'Bucket': S3_BUCKET_NAME, 'Key': s3_key},
+            Params={'Bucket': bucket(), 'Key': s3_key},
             ExpiresIn=expiration
         )
         return url
     except Exception as e:
         print(f"Error generating presigned URL: {e}")
         return None
+
+def generate_presigned_upload(
+    filename: str, category: str, ngo_name: str, uploaded_by: str
+) -> dict:
+    """
+    Generate a presigned POST so the client can upload straight to S3.
+
+    The object lands under the incoming/direct/ prefix. Tenant, category and
+    uploader are pinned in the signed policy as object metadata, so the
+    completion step can trust them without a DB row per pending upload.
+
+    Returns:
+        dict with upload_id, key, url, fields and expires_in
+    """
+    upload_id = uuid.uuid4().hex
+    safe_name = os.path.basename(filename) or "upload"
+    key = f"{DIRECT_UPLOAD_PREFIX}/{upload_id}/{safe_name}"
+
+    fields = {
+        "x-amz-meta-ngo-name": ngo_name,
+        "x-amz-meta-category": category,
+        "x-amz-meta-uploaded-by": uploaded_by,
+    }
+    conditions = [{k: v} for k, v in fields.items()]
+    conditions.append(["content-length-range", 1, DIRECT_UPLOAD_MAX_BYTES])
+
+    post = get_s3().generate_presigned_post(
+        Bucket=bucket(),
+        Key=key,
+        Fields=fields,
+        Conditions=conditions,
+        ExpiresIn=DIRECT_UPLOAD_EXPIRY
+    )
+
+    return {
+        "upload_id": upload_id,
+        "key": key,
+        "url": post["url"],
+        "fields": post["fields"],
+        "expires_in": DIRECT_UPLOAD_EXPIRY
+    }
+
+def head_direct_upload(key: str):
+    """
+    Size and metadata of a pending direct upload, without reading its body.
+
+    Returns:
+        (metadata, size) where metadata holds ngo-name, category, uploaded-by
+    """
+    response = get_s3().head_object(Bucket=bucket(), Key=key)
+    return response.get("Metadata", {}), response["ContentLength"]
+
+def download_to_file(key: str, path: str):
+    """Stream an object to a local file, so its size never has to fit in memory."""
+    get_s3().download_file(bucket(), key, path)
+
+def delete_object(key: str):
+    """Remove an object, e.g. a processed incoming upload."""
+    get_s3().delete_object(Bucket=bucket(), Key=key)
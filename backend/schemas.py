@@ -1,9 +1,13 @@
 from pydantic import BaseModel
+from typing import List, Optional
 
 class LoginRequest(BaseModel):
     email: str
     password: str
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
 class RegisterRequest(BaseModel):
     ngo_name: str
     email: str
@@ -26,3 +30,24 @@ class UploadResponse(BaseModel):
     compression_method: str
     uploaded_by: str
     s3_path: str
+
+class DirectUploadInitRequest(BaseModel):
+    filename: str
+    category: str
+    size: Optional[int] = None
+
+class DirectUploadCompleteRequest(BaseModel):
+    key: str
+    compression_level: str = "medium"
+    user_email: Optional[str] = None
+
+class ResumableUploadCreateRequest(BaseModel):
+    filename: str
+    category: str
+    size: int
+    compression_level: str = "medium"
+    sha256: Optional[str] = None
+
+class ExportRequest(BaseModel):
+    file_ids: Optional[List[str]] = None
+    category: Optional[str] = None
@@ -0,0 +1,160 @@
+"""
+Full-text search over file names, categories and extracted document text.
+
+SQLite uses an FTS5 virtual table ranked with bm25(); PostgreSQL uses a
+table with a weighted, stored tsvector behind a GIN index. Rows are written
+in the same transaction as the FileRecord, so the index is built
+incrementally at upload time.
+"""
+import re
+import threading
+from sqlalchemy import text
+from config import SEARCH_MAX_CONTENT_CHARS
+
+TEXT_EXTENSIONS = ["txt", "csv", "md"]
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+_fitz = None
+_fitz_loaded = False
+_fitz_lock = threading.Lock()
+
+def load_fitz():
+    """PyMuPDF, imported on the first PDF rather than at startup. None if not installed."""
+    global _fitz, _fitz_loaded # pylint: disable=global-statement
+    with _fitz_lock:
+        if not _fitz_loaded:
+            # pylint: disable=import-outside-toplevel
+            try:
+                import pymupdf as fitz  # PyMuPDF >= 1.24
+            except ImportError:
+                try:
+                    import fitz
+                except ImportError:
+                    fitz = None
+            _fitz, _fitz_loaded = fitz, True
+        return _fitz
+
+
+def _is_sqlite(bind) -> bool:
+    return bind.dialect.name == "sqlite"
+
+
+def ensure_search_schema(engine):
+    """Create the search table/indexes if missing and backfill names of existing files."""
+    with engine.begin() as conn:
+        if _is_sqlite(conn):
+            exists = conn.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE name = 'file_search'"
+            )).first()
+            if exists:
+                return
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE file_search USING fts5("
+                "file_id UNINDEXED, ngo_name UNINDEXED, name, category, content, "
+                "tokenize = 'unicode61 remove_diacritics 2')"
+            ))
+        else:
+            exists = conn.execute(text("SELECT to_regclass('file_search')")).scalar()
+            if exists:
+                return
+            conn.execute(text(
+                "CREATE TABLE file_search ("
+                "file_id VARCHAR PRIMARY KEY, ngo_name VARCHAR NOT NULL, "
+                "name VARCHAR NOT NULL, category VARCHAR NOT NULL, content TEXT NOT NULL DEFAULT '', "
+                "tsv tsvector GENERATED ALWAYS AS ("
+                "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+                "setweight(to_tsvector('simple', coalesce(category, '')), 'B') || "
+                "setweight(to_tsvector('simple', coalesce(content, '')), 'C')) STORED)"
+            ))
+            conn.execute(text("CREATE INDEX ix_file_search_tsv ON file_search USING GIN (tsv)"))
+            conn.execute(text("CREATE INDEX ix_file_search_ngo ON file_search (ngo_name)"))
+
+        # Existing files get name/category entries; content fills in on re-upload
+        conn.execute(text(
+            "INSERT INTO file_search (file_id, ngo_name, name, category, content) "
+            "SELECT id, ngo_name, name, category, '' FROM files WHERE status = 'active'"
+        ))
+
+
+def extract_text(path: str, file_name: str) -> str:
+    """Best-effort plain text for indexing, read from the file at path. Never raises."""
+    ext = file_name.lower().split(".")[-1]
+    try:
+        fitz = load_fitz() if ext == "pdf" else None
+        if fitz is not None:
+            parts, length = [], 0
+            with fitz.open(path, filetype="pdf") as doc:
+                for page in doc:
+                    page_text = page.get_text()
+                    parts.append(page_text)
+                    length += len(page_text)
+                    if length >= SEARCH_MAX_CONTENT_CHARS:
+                        break
+            return "".join(parts)[:SEARCH_MAX_CONTENT_CHARS]
+        if ext in TEXT_EXTENSIONS:
+            # At most 4 bytes per character in UTF-8, so this prefix is always enough
+            with open(path, "rb") as f:
+                head = f.read(SEARCH_MAX_CONTENT_CHARS * 4)
+            return head.decode("utf-8", errors="ignore")[:SEARCH_MAX_CONTENT_CHARS]
+    except Exception as e: # pylint: disable=broad-except
+        print(f"SEARCH: Text extraction failed for {file_name}: {str(e)}")
+    return ""
+
+
+def index_file(db, file_id: str, ngo_name: str, name: str, category: str, content: str = ""):
+    """Add a file to the index inside the caller's transaction."""
+    db.execute(text(
+        "INSERT INTO file_search (file_id, ngo_name, name, category, content) "
+        "VALUES (:file_id, :ngo_name, :name, :category, :content)"
+    ), {"file_id": file_id, "ngo_name": ngo_name, "name": name,
+        "category": category, "content": content or ""})
+
+
+def remove_file(db, file_id: str):
+    db.execute(text("DELETE FROM file_search WHERE file_id = :file_id"), {"file_id": file_id})
+
+
+def _tokens(query: str):
+    return _TOKEN_RE.findall(query.lower())[:16]
+
+
+def search(db, ngo_name: str, query: str, category: str = None, limit: int = 20, offset: int = 0):
+    """
+    Ranked matches for query within a tenant.
+
+    Every term must match (prefix match on the last one, so results appear while typing).
+    Returns a list of {"file_id", "rank", "snippet"} best first.
+    """
+    terms = _tokens(query)
+    if not terms:
+        return []
+
+    params = {"ngo_name": ngo_name, "limit": limit, "offset": offset}
+    category_clause = ""
+    if category:
+        category_clause = "AND category = :category"
+        params["category"] = category
+
+    if _is_sqlite(db.get_bind()):
+        # Quote every term so user input can't inject FTS5 operators
+        params["match"] = " ".join(f'"{t}"' for t in terms[:-1]) + f' "{terms[-1]}"*'
+        rows = db.execute(text(
+            "SELECT file_id, bm25(file_search, 0, 0, 10.0, 4.0, 1.0) AS rank, "
+            "snippet(file_search, 4, '[', ']', '…', 12) AS snippet "
+            "FROM file_search WHERE file_search MATCH :match AND ngo_name = :ngo_name "
+            f"{category_clause} ORDER BY rank LIMIT :limit OFFSET :offset"
+        ), params).all()
+        return [{"file_id": r.file_id, "rank": -r.rank, "snippet": r.snippet} for r in rows]
+
+    params["tsquery"] = " & ".join(f"{t}:*" for t in terms)
+    rows = db.execute(text(
+        "SELECT file_id, "
+        "ts_rank_cd(tsv, to_tsquery('simple', :tsquery)) AS rank, "
+        "ts_headline('simple', content, to_tsquery('simple', :tsquery), "
+        "'StartSel=[, StopSel=], MaxWords=24, MinWords=8') AS snippet "
+        "FROM file_search WHERE ngo_name = :ngo_name "
+        f"{category_clause} AND tsv @@ to_tsquery('simple', :tsquery) "
+        "ORDER BY rank DESC, file_id LIMIT :limit OFFSET :offset"
+    ), params).all()
+    return [{"file_id": r.file_id, "rank": float(r.rank), "snippet": r.snippet} for r in rows]
@@ -0,0 +1,125 @@
+"""
+Secrets for config.py, fetched lazily and cached encrypted on local disk.
+
+Nothing is fetched until the first secret-backed setting is read. A worker
+that finds a fresh cache file (younger than the TTL) starts without any
+network call. With a stale cache it starts on the cached values and
+refreshes in the background. Only a first boot with no usable cache waits
+for the fetch. After that, a daemon thread refetches every TTL and rewrites
+the cache. config reads JWT_SECRET and S3_BUCKET_NAME through get() on every
+access, so a rotated value reaches running code within one TTL; DATABASE_URL
+is read once and needs a restart.
+
+The cache file is a Fernet token (AES-128-CBC + HMAC-SHA256) under
+SECRETS_CACHE_KEY. Without that key, or without the cryptography package,
+secrets are kept in memory only. fetch is any callable returning a dict or
+None, so tests and local setups can pass a stub in place of Secrets Manager.
+"""
+import os
+import json
+import time
+import threading
+from typing import Callable, Optional
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+    InvalidToken = Exception
+
+
+class SecretsProvider:
+    """Lazy, TTL-refreshed view of one secret, backed by an encrypted cache file."""
+
+    def __init__(
+        self, fetch: Callable[[], Optional[dict]], cache_path: Optional[str] = None,
+        cache_key: Optional[str] = None, ttl: float = 3600.0
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self._fernet = None
+        if cache_path and cache_key:
+            if Fernet is None:
+                print("SECRETS: cryptography not installed, not caching secrets on disk")
+            else:
+                self._fernet = Fernet(cache_key)
+        self._lock = threading.Lock()
+        self._values = None
+        self._fetched_at = 0.0
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def get(self, name: str, default=None):
+        if self._values is None:
+            self._load()
+        return self._values.get(name, default)
+
+    def _load(self):
+        with self._lock:
+            if self._values is not None:
+                return
+            cached = self._read_cache()
+            if cached is not None:
+                self._values, self._fetched_at = cached
+            elif not self._refresh_locked():
+                print("SECRETS: Fetch failed, falling back to environment variables")
+                self._values = {}
+            self._start_refresher()
+
+    def refresh(self) -> bool:
+        """Refetch now; keeps the current values if the fetch fails."""
+        with self._lock:
+            return self._refresh_locked()
+
+    def _refresh_locked(self) -> bool:
+        try:
+            values = self.fetch()
+        except Exception as e: # pylint: disable=broad-except
+            print(f"SECRETS: Fetch failed: {e}")
+            values = None
+        if values is None:
+            return False
+        self._values, self._fetched_at = values, time.time()
+        self._write_cache()
+        return True
+
+    def _start_refresher(self):
+        self._thread = threading.Thread(target=self._run, name="secrets-refresh", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        delay = max(0.0, self._fetched_at + self.ttl - time.time())
+        while not self._stopping.wait(delay):
+            # Retry a failed refresh sooner than a full TTL
+            delay = self.ttl if self.refresh() else min(self.ttl, 60.0)
+
+    def close(self):
+        self._stopping.set()
+
+    def _read_cache(self):
+        if self._fernet is None or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, "rb") as f:
+                payload = json.loads(self._fernet.decrypt(f.read()))
+            return payload["values"], payload["fetched_at"]
+        except (OSError, ValueError, KeyError, InvalidToken) as e:
+            # Unreadable, tampered with or written under another key: fetch instead
+            print(f"SECRETS: Ignoring cache {self.cache_path}: {type(e).__name__}")
+            return None
+
+    def _write_cache(self):
+        if self._fernet is None:
+            return
+        token = self._fernet.encrypt(json.dumps(
+            {"values": self._values, "fetched_at": self._fetched_at}
+        ).encode("utf-8"))
+        tmp = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "wb") as f:
+                f.write(token)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            print(f"SECRETS: Could not write cache {self.cache_path}: {e}")
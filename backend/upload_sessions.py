@@ -0,0 +1,242 @@
+"""
+Resumable upload sessions backed by local scratch storage.
+
+Each session is a directory holding a preallocated data file and a
+meta.json describing the received byte ranges. Chunks may arrive out of
+order or in parallel; each one must carry its SHA-256 and is verified
+before it is written at its offset, so a dropped connection only costs the
+chunks in flight.
+
+Chunks of one session can reach different uvicorn workers, so updates to
+meta.json hold an flock on the session's meta.lock as well as a thread lock.
+Without fcntl (Windows) only the thread lock is taken, which is safe with a
+single worker.
+"""
+import os
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import threading
+from contextlib import contextmanager
+from config import (
+    UPLOAD_SCRATCH_DIR, UPLOAD_CHUNK_SIZE, UPLOAD_SESSION_TTL, UPLOAD_SESSION_MAX_BYTES
+)
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class UploadSessionError(Exception):
+    """Raised for invalid session operations. Carries an HTTP-style status code."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def _session_dir(upload_id: str) -> str:
+    # Session ids are uuid4 hex; reject anything else so ids can't escape the scratch dir
+    if len(upload_id) != 32 or not all(c in "0123456789abcdef" for c in upload_id):
+        raise UploadSessionError(404, "Upload session not found")
+    return os.path.join(UPLOAD_SCRATCH_DIR, upload_id)
+
+
+def _lock_for(upload_id: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(upload_id, threading.Lock())
+
+
+def _forget_lock(upload_id: str):
+    with _locks_guard:
+        _locks.pop(upload_id, None)
+
+
+@contextmanager
+def _meta_lock(upload_id: str):
+    """Serialize read-modify-write of meta.json across threads and worker processes."""
+    with _lock_for(upload_id):
+        if fcntl is None:
+            yield
+            return
+        # meta.json itself is swapped by os.replace, so the lock lives in a file of its own
+        try:
+            f = open(os.path.join(_session_dir(upload_id), "meta.lock"), "a", encoding="utf-8")
+        except FileNotFoundError as e:
+            raise UploadSessionError(404, "Upload session not found") from e
+        with f:
+            fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+            yield
+
+
+def _read_meta(upload_id: str) -> dict:
+    path = os.path.join(_session_dir(upload_id), "meta.json")
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError as e:
+        raise UploadSessionError(404, "Upload session not found") from e
+
+
+def _write_meta(upload_id: str, meta: dict):
+    session_dir = _session_dir(upload_id)
+    tmp_path = os.path.join(session_dir, "meta.json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(session_dir, "meta.json"))
+
+
+def _merge_range(ranges: list, start: int, end: int) -> list:
+    """Insert [start, end) into a sorted list of disjoint ranges."""
+    merged = []
+    for r_start, r_end in sorted(ranges + [[start, end]]):
+        if merged and r_start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], r_end)
+        else:
+            merged.append([r_start, r_end])
+    return merged
+
+
+def _contiguous_offset(ranges: list) -> int:
+    if ranges and ranges[0][0] == 0:
+        return ranges[0][1]
+    return 0
+
+
+def cleanup_expired_sessions():
+    """Drop sessions that have not been touched within UPLOAD_SESSION_TTL."""
+    if not os.path.isdir(UPLOAD_SCRATCH_DIR):
+        return
+    cutoff = time.time() - UPLOAD_SESSION_TTL
+    for name in os.listdir(UPLOAD_SCRATCH_DIR):
+        meta_path = os.path.join(UPLOAD_SCRATCH_DIR, name, "meta.json")
+        try:
+            if os.path.getmtime(meta_path) < cutoff:
+                shutil.rmtree(os.path.join(UPLOAD_SCRATCH_DIR, name), ignore_errors=True)
+                _forget_lock(name)
+        except OSError:
+            continue
+
+
+def create_session( # pylint: disable=R0913, R0917
+    ngo_name: str,
+    user_email: str,
+    filename: str,
+    category: str,
+    size: int,
+    compression_level: str = "medium",
+    sha256: str = None
+) -> dict:
+    """Start a new upload session and preallocate its scratch file."""
+    if size <= 0:
+        raise UploadSessionError(400, "Upload size must be positive")
+    if size > UPLOAD_SESSION_MAX_BYTES:
+        raise UploadSessionError(413, f"File exceeds {UPLOAD_SESSION_MAX_BYTES} bytes")
+
+    cleanup_expired_sessions()
+
+    upload_id = uuid.uuid4().hex
+    session_dir = _session_dir(upload_id)
+    os.makedirs(session_dir, exist_ok=True)
+
+    with open(os.path.join(session_dir, "data"), "wb") as f:
+        f.truncate(size)
+
+    meta = {
+        "upload_id": upload_id,
+        "ngo_name": ngo_name,
+        "user_email": user_email,
+        "filename": os.path.basename(filename) or "upload",
+        "category": category,
+        "compression_level": compression_level,
+        "size": size,
+        "sha256": sha256,
+        "chunk_size": UPLOAD_CHUNK_SIZE,
+        "ranges": [],
+        "created_at": time.time()
+    }
+    _write_meta(upload_id, meta)
+    return session_status(meta)
+
+
+def get_session(upload_id: str, ngo_name: str) -> dict:
+    """Load a session's metadata, enforcing tenant isolation."""
+    meta = _read_meta(upload_id)
+    if meta["ngo_name"] != ngo_name:
+        raise UploadSessionError(404, "Upload session not found")
+    return meta
+
+
+def session_status(meta: dict) -> dict:
+    """Public view of a session: what the client needs to resume."""
+    received = sum(end - start for start, end in meta["ranges"])
+    return {
+        "upload_id": meta["upload_id"],
+        "size": meta["size"],
+        "chunk_size": meta["chunk_size"],
+        "offset": _contiguous_offset(meta["ranges"]),
+        "received": received,
+        "ranges": meta["ranges"],
+        "complete": received == meta["size"]
+    }
+
+
+def write_chunk(upload_id: str, ngo_name: str, offset: int, data: bytes, checksum: str) -> dict:
+    """Verify and store one chunk at its byte offset."""
+    meta = get_session(upload_id, ngo_name)
+
+    if offset < 0 or offset + len(data) > meta["size"]:
+        raise UploadSessionError(416, "Chunk is outside the declared upload size")
+    if not data:
+        raise UploadSessionError(400, "Empty chunk")
+    if not checksum:
+        raise UploadSessionError(400, "Chunk checksum is required")
+    if hashlib.sha256(data).hexdigest() != checksum.lower():
+        raise UploadSessionError(400, "Chunk checksum mismatch")
+
+    # Each writer has its own handle, so parallel chunks don't share a file position
+    with open(os.path.join(_session_dir(upload_id), "data"), "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+    with _meta_lock(upload_id):
+        meta = _read_meta(upload_id)
+        meta["ranges"] = _merge_range(meta["ranges"], offset, offset + len(data))
+        _write_meta(upload_id, meta)
+
+    return session_status(meta)
+
+
+def read_completed(upload_id: str, ngo_name: str):
+    """
+    Return (meta, data_path) once every byte has arrived. The data file stays
+    in the session directory until the session is discarded.
+    Verifies the whole-file checksum if one was declared at creation.
+    """
+    meta = get_session(upload_id, ngo_name)
+    status = session_status(meta)
+    if not status["complete"]:
+        raise UploadSessionError(409, f"Upload incomplete: {status['received']}/{meta['size']} bytes")
+
+    data_path = os.path.join(_session_dir(upload_id), "data")
+    if meta.get("sha256"):
+        digest = hashlib.sha256()
+        with open(data_path, "rb") as f:
+            for block in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(block)
+        if digest.hexdigest() != meta["sha256"].lower():
+            raise UploadSessionError(422, "File checksum mismatch")
+
+    return meta, data_path
+
+
+def discard_session(upload_id: str):
+    shutil.rmtree(_session_dir(upload_id), ignore_errors=True)
+    _forget_lock(upload_id)
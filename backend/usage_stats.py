@@ -0,0 +1,140 @@
+"""
+Incrementally maintained per-tenant usage counters.
+
+Upload and delete apply a delta to tenant_usage inside the caller's
+transaction with an atomic upsert, so /stats reads a handful of rows
+instead of scanning files. reconcile() recomputes the counters from the
+files table to repair any drift. Every change also bumps the tenant's
+"files" version, which invalidates its cached listings (response_cache.py).
+
+Usage (from backend/):
+    python usage_stats.py            # reconcile every tenant
+    python usage_stats.py "My NGO"   # reconcile one tenant
+"""
+import sys
+from sqlalchemy import func, delete, select, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from models import FileRecord, TenantUsage
+from response_cache import bump_version
+
+
+def _upsert(db, values: dict, updates: dict):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(TenantUsage).values(**values)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(TenantUsage).values(**values)
+    else:
+        raise RuntimeError(f"tenant_usage upsert not supported on {dialect}")
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[TenantUsage.ngo_name, TenantUsage.category],
+        set_={k: v(stmt.excluded) for k, v in updates.items()}
+    )
+    db.execute(stmt)
+
+
+def record_upload( # pylint: disable=R0913, R0917
+    db, ngo_name: str, category: str, original_size: int, compressed_size: int, count: int = 1
+):
+    """Add uploaded file(s) to the counters. Caller commits."""
+    _upsert(db, {
+        "ngo_name": ngo_name,
+        "category": category,
+        "file_count": count,
+        "original_bytes": original_size,
+        "compressed_bytes": compressed_size,
+        "last_upload_at": func.now()
+    }, {
+        "file_count": lambda ex: TenantUsage.file_count + ex.file_count,
+        "original_bytes": lambda ex: TenantUsage.original_bytes + ex.original_bytes,
+        "compressed_bytes": lambda ex: TenantUsage.compressed_bytes + ex.compressed_bytes,
+        "last_upload_at": lambda ex: ex.last_upload_at
+    })
+    bump_version(db, ngo_name, "files")
+
+
+def record_delete(db, ngo_name: str, category: str, original_size: int, compressed_size: int):
+    """Remove a file from the counters. Caller commits."""
+    db.query(TenantUsage)\
+        .filter(TenantUsage.ngo_name == ngo_name)\
+        .filter(TenantUsage.category == category)\
+        .update({
+            TenantUsage.file_count: TenantUsage.file_count - 1,
+            TenantUsage.original_bytes: TenantUsage.original_bytes - original_size,
+            TenantUsage.compressed_bytes: TenantUsage.compressed_bytes - compressed_size
+        }, synchronize_session=False)
+    bump_version(db, ngo_name, "files")
+
+
+def get_stats(db, ngo_name: str) -> dict:
+    rows = db.query(TenantUsage)\
+        .filter(TenantUsage.ngo_name == ngo_name)\
+        .filter(TenantUsage.file_count > 0)\
+        .order_by(TenantUsage.category)\
+        .all()
+
+    total_original = sum(r.original_bytes for r in rows)
+    total_compressed = sum(r.compressed_bytes for r in rows)
+    last_upload = max((r.last_upload_at for r in rows if r.last_upload_at), default=None)
+
+    return {
+        "total_files": sum(r.file_count for r in rows),
+        "total_storage_original": total_original,
+        "total_storage_compressed": total_compressed,
+        "compression_savings_pct": (
+            (total_original - total_compressed) / total_original * 100
+            if total_original else 0
+        ),
+        "last_upload": last_upload.isoformat() if last_upload else None,
+        "categories": [{
+            "category": r.category,
+            "files": r.file_count,
+            "original_bytes": r.original_bytes,
+            "compressed_bytes": r.compressed_bytes
+        } for r in rows]
+    }
+
+
+def reconcile(db, ngo_name: str = None) -> int:
+    """Rebuild counters from the files table (one tenant, or all). Returns rows written."""
+    stmt = delete(TenantUsage)
+    source = select(
+        FileRecord.ngo_name,
+        FileRecord.category,
+        func.count(FileRecord.id),
+        func.coalesce(func.sum(FileRecord.original_size), 0),
+        func.coalesce(func.sum(FileRecord.compressed_size), 0),
+        func.max(FileRecord.uploaded_at)
+    ).where(FileRecord.status == "active")
+
+    if ngo_name:
+        stmt = stmt.where(TenantUsage.ngo_name == ngo_name)
+        source = source.where(FileRecord.ngo_name == ngo_name)
+    source = source.group_by(FileRecord.ngo_name, FileRecord.category)
+
+    db.execute(stmt)
+    result = db.execute(insert(TenantUsage).from_select(
+        ["ngo_name", "category", "file_count", "original_bytes",
+         "compressed_bytes", "last_upload_at"],
+        source
+    ))
+    db.commit()
+    return result.rowcount
+
+
+def backfill_if_empty(db):
+    """First start after this table appears: seed it from existing files."""
+    if db.query(TenantUsage).first() is None and db.query(FileRecord.id).first() is not None:
+        rows = reconcile(db)
+        print(f"USAGE: Backfilled tenant_usage ({rows} rows)")
+
+
+if __name__ == "__main__":
+    # pylint: disable=import-outside-toplevel
+    from database import SessionLocal
+    session = SessionLocal()
+    try:
+        written = reconcile(session, sys.argv[1] if len(sys.argv) > 1 else None)
+        print(f"USAGE: Reconciled tenant_usage ({written} rows)")
+    finally:
+        session.close()
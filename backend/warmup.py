@@ -0,0 +1,204 @@
+"""
+Startup warm-up, so a worker's first real upload is not its slowest.
+
+The lifespan starts Warmup.run() as a background task. /health (liveness)
+answers straight away, while /ready (readiness) answers 503 until the
+warm-up has finished, so load balancers route no traffic to a cold worker.
+The stages, in order:
+
+  database     open WARMUP_DB_CONNECTIONS connections on every engine
+  s3           build the client and HEAD the bucket (credentials, TLS)
+  codecs       import Pillow and register its plugins, PyPDF2, pikepdf, PyMuPDF
+  ghostscript  locate the binary (cached for the life of the process)
+  compression  start every compression worker on a canary image or PDF
+
+Only the database stage is required. The worker retries it every
+WARMUP_RETRY_SECONDS until it succeeds. Other stages that fail or do not
+apply (no bucket configured, Ghostscript missing) are reported and skipped.
+Each stage is bounded by WARMUP_STAGE_TIMEOUT.
+"""
+import io
+import os
+import time
+import asyncio
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from config import (
+    WARMUP_DB_CONNECTIONS, WARMUP_STAGE_TIMEOUT, WARMUP_RETRY_SECONDS
+)
+from database import engine, async_engine, replica_engine, async_replica_engine
+
+
+class WarmupSkipped(Exception):
+    """The stage does not apply to this deployment."""
+
+
+def _open_sync_connections(eng, count: int):
+    # Held together, so the pool really opens count separate connections
+    conns = [eng.connect() for _ in range(count)]
+    try:
+        for conn in conns:
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in conns:
+            conn.close()
+
+
+async def _open_async_connections(eng, count: int):
+    async def ping():
+        async with eng.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+    await asyncio.gather(*(ping() for _ in range(count)))
+
+
+async def warm_database() -> str:
+    count = max(1, WARMUP_DB_CONNECTIONS)
+    for eng in (engine, replica_engine):
+        if eng is not None:
+            await run_in_threadpool(_open_sync_connections, eng, count)
+    for eng in (async_engine, async_replica_engine):
+        if eng is not None:
+            await _open_async_connections(eng, count)
+    return f"{count} connection(s) per engine"
+
+
+def _head_bucket() -> str:
+    # pylint: disable=import-outside-toplevel
+    from config import S3_BUCKET_NAME
+    if not S3_BUCKET_NAME:
+        raise WarmupSkipped("S3_BUCKET_NAME not set")
+    from s3_service import get_s3
+    get_s3().head_bucket(Bucket=S3_BUCKET_NAME)
+    return S3_BUCKET_NAME
+
+
+async def warm_s3() -> str:
+    return await run_in_threadpool(_head_bucket)
+
+
+def _load_codecs() -> str:
+    # pylint: disable=import-outside-toplevel, unused-import
+    from PIL import Image
+    Image.init()  # registers every format plugin up front instead of on first open
+    import PyPDF2
+    loaded = ["Pillow", "PyPDF2"]
+    try:
+        import pikepdf
+        loaded.append("pikepdf")
+    except ImportError:
+        pass
+    from search_index import load_fitz
+    if load_fitz() is not None:
+        loaded.append("PyMuPDF")
+    return ", ".join(loaded)
+
+
+async def warm_codecs() -> str:
+    return await run_in_threadpool(_load_codecs)
+
+
+def _find_ghostscript() -> str:
+    from compression_engine import find_ghostscript # pylint: disable=import-outside-toplevel
+    path = find_ghostscript()
+    if not path:
+        raise WarmupSkipped("not installed, PDFs use the fallback compressors")
+    return path
+
+
+async def warm_ghostscript() -> str:
+    return await run_in_threadpool(_find_ghostscript)
+
+
+def canary_files() -> list:
+    """A noisy PNG (over the 50KB skip threshold) and a one-page PDF, as (name, bytes)."""
+    # pylint: disable=import-outside-toplevel
+    from PIL import Image
+    from PyPDF2 import PdfWriter
+    image = io.BytesIO()
+    Image.frombytes("RGB", (160, 160), os.urandom(160 * 160 * 3)).save(image, format="PNG")
+    pdf = io.BytesIO()
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    writer.write(pdf)
+    return [("warmup.png", image.getvalue()), ("warmup.pdf", pdf.getvalue())]
+
+
+async def warm_compression() -> str:
+    # pylint: disable=import-outside-toplevel
+    from compression_engine import compress_upload, get_compression_pool, COMPRESSION_WORKERS
+    pool = get_compression_pool()
+    loop = asyncio.get_running_loop()
+    files = await run_in_threadpool(canary_files)
+    # One job per worker submitted together makes the executor start all its threads
+    jobs = [
+        loop.run_in_executor(pool, compress_upload, data, name)
+        for name, data in (files[i % len(files)] for i in range(COMPRESSION_WORKERS))
+    ]
+    methods = {result[1] for result in await asyncio.gather(*jobs)}
+    return f"{COMPRESSION_WORKERS} worker(s): {', '.join(sorted(methods))}"
+
+
+STAGES = [
+    ("database", warm_database),
+    ("s3", warm_s3),
+    ("codecs", warm_codecs),
+    ("ghostscript", warm_ghostscript),
+    ("compression", warm_compression),
+]
+REQUIRED_STAGES = ("database",)
+
+
+class Warmup:
+    """Runs the warm-up stages once and records how each one went."""
+
+    def __init__(
+        self, stages=None, required=REQUIRED_STAGES, timeout: float = WARMUP_STAGE_TIMEOUT,
+        retry_seconds: float = WARMUP_RETRY_SECONDS
+    ):
+        self.stages = stages if stages is not None else STAGES
+        self.required = required
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self.ready = False
+        self.results = {name: {"status": "pending"} for name, _ in self.stages}
+        self.total_ms = None
+
+    def mark_ready(self):
+        self.ready = True
+
+    async def _run_stage(self, name: str, fn) -> bool:
+        start = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(fn(), self.timeout)
+            result = {"status": "ok", "detail": detail}
+        except WarmupSkipped as e:
+            result = {"status": "skipped", "detail": str(e)}
+        except Exception as e: # pylint: disable=broad-except
+            result = {"status": "failed", "detail": f"{type(e).__name__}: {e}"}
+            print(f"WARMUP: {name} failed: {result['detail']}")
+        result["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        self.results[name] = result
+        return result["status"] != "failed"
+
+    async def run(self):
+        start = time.perf_counter()
+        for name, fn in self.stages:
+            await self._run_stage(name, fn)
+        for name, fn in self.stages:
+            if name in self.required:
+                while self.results[name]["status"] == "failed":
+                    await asyncio.sleep(self.retry_seconds)
+                    await self._run_stage(name, fn)
+        self.total_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.mark_ready()
+        print(f"WARMUP: Ready after {self.total_ms} ms")
+
+    def snapshot(self) -> dict:
+        return {"ready": self.ready, "warmup_ms": self.total_ms, "stages": self.results}
+
+
+_warmup = Warmup()
+
+def get_warmup() -> Warmup:
+    """The process's warm-up state, as reported by /ready."""
+    return _warmup
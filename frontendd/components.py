@@ -3,6 +3,7 @@ Reusable UI Components - Premium Dark Theme
 """
 from datetime import datetime
 import streamlit as st
+from services import logout_user
 
 # ---------------- THEME SETUP ----------------
 def setup_page_styling():
@@ -49,6 +50,7 @@ def page_header(title: str, subtitle: str = "", show_logout: bool = False):
         with col_logout:
             st.markdown("<br>", unsafe_allow_html=True)
             if st.button("🚪 Logout", type="secondary", key="header_logout"):
+                logout_user()
                 st.session_state.authenticated = False
                 st.session_state.user = None
                 st.switch_page("app.py")
@@ -131,6 +133,7 @@ def sidebar_navigation():
             st.divider()
 
             if st.button("🚪 Logout", width="stretch", key="sidebar_logout"):
+                logout_user()
                 st.session_state.authenticated = False
                 st.session_state.user = None
                 st.switch_page("app.py")
@@ -8,7 +8,7 @@ from components import (
     sidebar_navigation,
     format_datetime
 )
-from services import get_dashboard_stats, format_bytes, list_files
+from services import get_dashboard_stats, format_bytes, list_files, logout_user
 
 st.set_page_config(
     page_title="Dashboard • Safekeep",
@@ -159,8 +159,7 @@ split_col1, split_col2 = st.columns([1.8, 1])
 # Left: Recent Uploads
 with split_col1:
     st.markdown("### 📤 Recent Uploads")
-    files = list_files()
-    recent_files = files[:5] if files else []
+    recent_files = list_files(limit=5)
 
     if not recent_files:
         st.markdown("""
@@ -207,6 +206,7 @@ with split_col1:
     # Logout button below Recent Uploads
     st.markdown("<br>", unsafe_allow_html=True)
     if st.button("🚪 Logout", use_container_width=True, type="secondary", key="dashboard_logout"):
+        logout_user()
         st.session_state.authenticated = False
         st.session_state.user = None
         st.switch_page("app.py")
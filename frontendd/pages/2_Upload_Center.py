@@ -5,7 +5,7 @@ from components import (
     load_custom_css, page_header, require_auth,
     sidebar_navigation, format_datetime
 )
-from services import upload_file, format_bytes, list_files
+from services import upload_file, upload_files_batch, format_bytes, list_files
 
 
 st.set_page_config(
@@ -38,16 +38,51 @@ with col_left:
         )
 
         # File uploader
-        uploaded_file = st.file_uploader(
-            "Choose a file",
+        uploaded_files = st.file_uploader(
+            "Choose files",
             type=["pdf", "xlsx", "xls", "docx", "doc", "csv", "zip", "jpg", "png"],
+            accept_multiple_files=True,
             help="Supported formats: PDF, Excel, Word, CSV, ZIP, Images"
         )
+        uploaded_file = uploaded_files[0] if len(uploaded_files or []) == 1 else None
 
         # Upload button
         upload_btn = st.form_submit_button("🚀 Upload & Compress", width="stretch")
 
-        if upload_btn and uploaded_file:
+        if upload_btn and uploaded_files and len(uploaded_files) > 1:
+            # Batch: one request, files compressed in parallel, results stream back
+            with st.status(f"Processing {len(uploaded_files)} files...", expanded=True) as status:
+                try:
+                    summary = None
+                    for item in upload_files_batch(
+                        uploaded_files, category, st.session_state.user['email']
+                    ):
+                        if item.get("done"):
+                            summary = item
+                        elif item["status"] == "stored":
+                            st.write(
+                                f"✅ {item['name']} — {format_bytes(item['compressed_size'])} "
+                                f"(saved {item['compression_ratio'] * 100:.0f}%)"
+                            )
+                        else:
+                            st.write(f"❌ {item['name']} — {item.get('error', 'failed')}")
+
+                    if summary and not summary.get("error"):
+                        status.update(
+                            label=f"Uploaded {summary['committed']} of {len(uploaded_files)} files",
+                            state="complete" if not summary["failed"] else "error",
+                            expanded=True
+                        )
+                        st.session_state.show_upload_actions = True
+                    else:
+                        status.update(label="Batch Upload Failed", state="error")
+                        st.error(f"Error saving batch: {(summary or {}).get('error', 'no response')}")
+
+                except Exception as e: # pylint: disable=broad-exception-caught
+                    status.update(label="Batch Upload Failed", state="error")
+                    st.error(f"Error during upload: {str(e)}")
+
+        elif upload_btn and uploaded_file:
             # Use Streamlit Status Container for cleaner look
             with st.status("Processing Upload...", expanded=True) as status:
                 st.write("⬆️ Uploading file...")
@@ -98,7 +133,7 @@ with col_left:
                     status.update(label="Upload Failed", state="error")
                     st.error(f"Error during upload: {str(e)}")
 
-        elif upload_btn and not uploaded_file:
+        elif upload_btn and not uploaded_files:
             st.error("Please select a file to upload")
 
 
@@ -163,7 +198,7 @@ with col_right:
 
 # Upload history
 st.markdown("### 📜 Recent Uploads")
-recent_files = list_files()[:5]
+recent_files = list_files(limit=5)
 
 if recent_files:
     for file in recent_files:
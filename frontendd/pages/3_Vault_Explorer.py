@@ -4,7 +4,9 @@ from components import (
     load_custom_css, page_header, require_auth,
     sidebar_navigation, format_datetime, empty_state
 )
-from services import list_files, delete_file, format_bytes, get_file_content, share_file
+from services import (
+    list_files_page, search_files_page, delete_file, format_bytes, get_file_content, share_file, export_files
+)
 
 
 st.set_page_config(
@@ -25,7 +27,7 @@ page_header("Vault Explorer", "Browse and manage your secure files")
 col1, col2, col3 = st.columns([2, 1, 1])
 
 with col1:
-    search_query = st.text_input("🔍 Search files", placeholder="Search by filename...")
+    search_query = st.text_input("🔍 Search files", placeholder="Search names and document text...")
 
 with col2:
     category_filter = st.selectbox(
@@ -39,26 +41,64 @@ with col3:
         options=["Newest First", "Oldest First", "Name A-Z", "Name Z-A", "Largest First"]
     )
 
-# Get files based on filters
-files = list_files(search_query, category_filter)
-
-# Apply sorting
-if sort_by == "Newest First":
-    files = sorted(files, key=lambda x: x['uploaded_at'], reverse=True)
-elif sort_by == "Oldest First":
-    files = sorted(files, key=lambda x: x['uploaded_at'])
-elif sort_by == "Name A-Z":
-    files = sorted(files, key=lambda x: x['name'])
-elif sort_by == "Name Z-A":
-    files = sorted(files, key=lambda x: x['name'], reverse=True)
-elif sort_by == "Largest First":
-    files = sorted(files, key=lambda x: x['original_size'], reverse=True)
+SORT_OPTIONS = {
+    "Newest First": "newest",
+    "Oldest First": "oldest",
+    "Name A-Z": "name_asc",
+    "Name Z-A": "name_desc",
+    "Largest First": "largest",
+}
+PAGE_SIZE = 50
+
+# Cursor stack for Prev/Next; reset whenever the query changes
+query_key = (search_query, category_filter, sort_by)
+if st.session_state.get("vault_query") != query_key:
+    st.session_state.vault_query = query_key
+    st.session_state.vault_cursors = [None]
+
+# Get files based on filters (search, filter and sort run on the backend)
+if search_query:
+    # Full-text search over names and document contents, best match first
+    page = search_files_page(
+        search_query, category_filter,
+        limit=PAGE_SIZE, cursor=st.session_state.vault_cursors[-1]
+    )
+    st.caption("Results ranked by relevance (names and document text)")
+else:
+    page = list_files_page(
+        search_query, category_filter, SORT_OPTIONS[sort_by],
+        limit=PAGE_SIZE, cursor=st.session_state.vault_cursors[-1], include_total=True
+    )
+files = page["items"]
+total_files = page["total"] if page["total"] is not None else len(files)
 
 st.markdown("---")
 
 # Display file count
 if files:
-    st.markdown(f"**{len(files)}** file(s) found")
+    col_count, col_export = st.columns([3, 1])
+    with col_count:
+        page_no = len(st.session_state.vault_cursors)
+        st.markdown(f"**{total_files}** file(s) found • page {page_no}")
+    with col_export:
+        # Export everything currently shown as a single ZIP
+        if st.session_state.get("export_requested"):
+            archive = export_files(file_ids=[f['id'] for f in files])
+            if archive:
+                st.download_button(
+                    label="⬇️ Save ZIP",
+                    data=archive,
+                    file_name="safekeep_export.zip",
+                    mime="application/zip",
+                    key="export_zip",
+                    width="stretch"
+                )
+            else:
+                st.error("Export failed")
+            st.session_state.export_requested = False
+        elif st.button("📦 Export ZIP", key="export_btn", width="stretch"):
+            st.session_state.export_requested = True
+            st.rerun()
     st.markdown("<br>", unsafe_allow_html=True)
 else:
     empty_state("No files found. Upload your first file to get started!")
@@ -120,6 +160,9 @@ for idx, file in enumerate(files):
 
     st.markdown("</div>", unsafe_allow_html=True) # End card
 
+    if file.get('snippet'):
+        st.caption(f"…{file['snippet']}…")
+
     # We put expander properly
     with st.expander(f"📋 Actions for {file['name']}"):
         col1, col2, col3, col4 = st.columns(4)
@@ -169,10 +212,22 @@ for idx, file in enumerate(files):
                 delete_file(file['id'], st.session_state.user)
                 st.rerun()
 
+# Pagination controls
+if files and (page["next_cursor"] or len(st.session_state.vault_cursors) > 1):
+    col_prev, _, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if len(st.session_state.vault_cursors) > 1 and st.button("◀ Previous", width="stretch"):
+            st.session_state.vault_cursors.pop()
+            st.rerun()
+    with col_next:
+        if page["next_cursor"] and st.button("Next ▶", width="stretch"):
+            st.session_state.vault_cursors.append(page["next_cursor"])
+            st.rerun()
+
 # Summary statistics at bottom
 if files:
     st.markdown("---")
-    st.markdown("### 📊 Summary Statistics")
+    st.markdown("### 📊 Summary Statistics (this page)")
 
     col1, col2, col3, col4 = st.columns(4)
 
@@ -1,10 +1,11 @@
 # pylint: disable=invalid-name
+from datetime import datetime, time
 import streamlit as st
 from components import (
     load_custom_css, page_header, require_auth,
     sidebar_navigation, format_datetime, metric_card
 )
-from services import list_audit_logs
+from services import list_audit_logs, export_audit_logs
 import pandas as pd
 
 st.set_page_config(
@@ -35,7 +36,7 @@ with col1:
 with col2:
     action_filter = st.selectbox(
         "Action Type",
-        options=["All", "LOGIN", "UPLOAD", "DELETE", "DOWNLOAD", "LOGIN_FAILED"]
+        options=["All", "LOGIN", "UPLOAD", "DELETE", "DOWNLOAD", "LOGIN_FAILED", "EXPORT", "AUDIT_EXPORT"]
     )
 
 with col3:
@@ -45,8 +46,32 @@ with col3:
         index=1
     )
 
-# Get filtered logs
-logs = list_audit_logs(action_filter, limit)
+col4, col5, col6 = st.columns([1, 1, 1])
+
+with col4:
+    user_filter = st.text_input("User email", placeholder="staff@ngo.org")
+
+with col5:
+    target_filter = st.text_input("Target contains", placeholder="report.pdf")
+
+with col6:
+    date_range = st.date_input("Date range", value=(), format="YYYY-MM-DD")
+
+since = until = None
+if len(date_range) == 2:
+    since = datetime.combine(date_range[0], time.min)
+    until = datetime.combine(date_range[1], time.max)
+
+filters = {
+    "action_filter": action_filter,
+    "user_filter": user_filter.strip(),
+    "target_filter": target_filter.strip(),
+    "since": since,
+    "until": until
+}
+
+# Get filtered logs (filtering runs server-side)
+logs = list_audit_logs(limit=limit, **filters)
 
 st.markdown("---")
 
@@ -118,16 +143,20 @@ if logs:
         hide_index=True
     )
 
-    # Export
+    # Export every matching entry, not just the rows shown
     st.markdown("<br>", unsafe_allow_html=True)
     if st.button("📥 Export Audit Log (CSV)", width="content"):
-        csv = df.to_csv(index=False)
-        st.download_button(
-            label="Download CSV",
-            data=csv,
-            file_name="audit_logs.csv",
-            mime="text/csv"
-        )
+        with st.spinner("Preparing export..."):
+            csv = export_audit_logs("csv", **filters)
+        if csv is None:
+            st.error("Export failed. Please try again.")
+        else:
+            st.download_button(
+                label="Download CSV",
+                data=csv,
+                file_name="audit_logs.csv",
+                mime="text/csv"
+            )
 
 else:
     st.info("No audit logs found matching criteria.")
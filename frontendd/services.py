@@ -11,10 +11,15 @@ Backend expected endpoints:
 - GET    /files
 - DELETE /files/{file_id}
 - GET    /audit
+- GET    /audit/export
 """
 
 import os
+import json
+import time
+import hashlib
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 
 # ============================
@@ -25,17 +30,54 @@ API_URL = os.getenv("SAFEKEEP_API_URL", "http://localhost:8000")
 
 DEFAULT_TIMEOUT = 30
 
+# Files at or above this size use a large-file upload path instead of one form POST:
+#   "resumable" - chunked, checksummed, parallel upload that survives dropped connections
+#   "direct"    - single presigned POST straight to S3 (bytes never touch the API)
+DIRECT_UPLOAD_THRESHOLD = int(os.getenv("SAFEKEEP_DIRECT_UPLOAD_THRESHOLD", str(8 * 1024 * 1024)))
+LARGE_UPLOAD_MODE = os.getenv("SAFEKEEP_LARGE_UPLOAD_MODE", "resumable")
+UPLOAD_CHUNK_SIZE = int(os.getenv("SAFEKEEP_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_PARALLELISM = int(os.getenv("SAFEKEEP_UPLOAD_PARALLELISM", "4"))
+UPLOAD_MAX_ATTEMPTS = 5
+
+# Listing responses kept for If-None-Match revalidation across Streamlit reruns
+ETAG_CACHE_ENTRIES = int(os.getenv("SAFEKEEP_ETAG_CACHE_ENTRIES", "64"))
+_etag_cache = {}
 
 
 # ============================
 # Helpers
 # ============================
 
+def _store_tokens(st, data: dict):
+    st.session_state.token = data["token"]
+    # Renew a little before the access token actually expires
+    st.session_state.token_expires_at = time.time() + data.get("expires_in", 900) - 30
+    if data.get("refresh_token"):
+        st.session_state.refresh_token = data["refresh_token"]
+
+
+def _refresh_token(st):
+    """Swap the refresh token for a new short-lived access token."""
+    res = requests.post(
+        f"{API_URL}/auth/refresh",
+        json={"refresh_token": st.session_state.refresh_token},
+        timeout=DEFAULT_TIMEOUT,
+    )
+    if res.status_code == 200:
+        _store_tokens(st, res.json())
+    else:
+        # Revoked or expired: the next call gets a 401 and the user signs in again
+        st.session_state.refresh_token = None
+
+
 def _auth_headers():
     """Return Authorization headers from session token stored in Streamlit session state."""
     try:
         # pylint: disable=import-outside-toplevel
         import streamlit as st
+        if st.session_state.get("refresh_token") and \
+                time.time() >= st.session_state.get("token_expires_at", 0):
+            _refresh_token(st)
         token = st.session_state.get("token")
         if token:
             return {"Authorization": f"Bearer {token}"}
@@ -59,6 +101,32 @@ def _handle_response(res: requests.Response):
     return data
 
 
+def _get_listing(url: str, params: dict):
+    """
+    GET a listing, revalidating with the ETag of the last identical request.
+    A 304 reuses the stored body, so an unchanged listing costs the backend one
+    version read and sends no body.
+    """
+    headers = _auth_headers()
+    key = (headers.get("Authorization"), url, tuple(sorted((k, str(v)) for k, v in params.items())))
+    cached = _etag_cache.get(key)
+    if cached:
+        headers = {**headers, "If-None-Match": cached[0]}
+
+    res = requests.get(url, params=params, headers=headers, timeout=DEFAULT_TIMEOUT)
+    if res.status_code == 304 and cached:
+        return json.loads(cached[1])
+
+    data = _handle_response(res)
+    etag = res.headers.get("ETag")
+    if etag:
+        _etag_cache.pop(key, None)
+        _etag_cache[key] = (etag, res.content)
+        while len(_etag_cache) > ETAG_CACHE_ENTRIES:
+            _etag_cache.pop(next(iter(_etag_cache)))
+    return data
+
+
 # ============================
 # Auth
 # ============================
@@ -81,7 +149,7 @@ def login_user(email: str, password: str):
         # store token in streamlit session_state for later API calls
         # pylint: disable=import-outside-toplevel
         import streamlit as st
-        st.session_state.token = data["token"]
+        _store_tokens(st, data)
 
         # Matches your UI expectation: {email, name, ngo}
         return {
@@ -96,6 +164,20 @@ def login_user(email: str, password: str):
         return None
 
 
+def logout_user():
+    """Revoke the session's tokens on the backend and forget them locally."""
+    headers = _auth_headers()
+    try:
+        if headers:
+            requests.post(f"{API_URL}/auth/logout", headers=headers, timeout=DEFAULT_TIMEOUT)
+    except requests.exceptions.RequestException:
+        pass
+    # pylint: disable=import-outside-toplevel
+    import streamlit as st
+    for key in ("token", "refresh_token", "token_expires_at"):
+        st.session_state.pop(key, None)
+
+
 def register_user(ngo_name: str, email: str, password: str):
     """
     Register user via backend.
@@ -171,24 +253,33 @@ def upload_file(
     # Compression level (optional)
     compression_level = st.session_state.get("compression_level", "medium")
 
-    files = {
-        "upload": (file_name, file_bytes, "application/octet-stream")
-    }
+    if len(file_bytes) >= DIRECT_UPLOAD_THRESHOLD and LARGE_UPLOAD_MODE == "resumable":
+        result = _upload_resumable(
+            file_name, file_bytes, category, user_email, compression_level
+        )
+    elif len(file_bytes) >= DIRECT_UPLOAD_THRESHOLD:
+        result = _upload_direct(
+            file_name, file_bytes, category, user_email, compression_level
+        )
+    else:
+        files = {
+            "upload": (file_name, file_bytes, "application/octet-stream")
+        }
 
-    data = {
-        "category": category,
-        "compression_level": compression_level,
-        "user_email": user_email
-    }
+        data = {
+            "category": category,
+            "compression_level": compression_level,
+            "user_email": user_email
+        }
 
-    res = requests.post(
-        f"{API_URL}/files/upload",
-        files=files,
-        data=data,
-        headers=_auth_headers(),
-        timeout=600,  # 10 minutes for large PDF compression on free tier
-    )
-    result = _handle_response(res)
+        res = requests.post(
+            f"{API_URL}/files/upload",
+            files=files,
+            data=data,
+            headers=_auth_headers(),
+            timeout=600,  # 10 minutes for large PDF compression on free tier
+        )
+        result = _handle_response(res)
 
     # Backend returns compression ratio usually as percent; normalize if needed
     # We expect your UI uses: compression_ratio as 0-1 fraction.
@@ -211,48 +302,273 @@ def upload_file(
 
 
 
-
-def list_files(search_query: str = "", category_filter: str = "All"):
+def _upload_direct(
+    file_name: str, file_bytes: bytes, category: str, user_email: str, compression_level: str
+):
     """
-    Fetch file list from backend with search/filter done client-side
-    so your UI stays unchanged.
+    Send bytes straight to S3 with a presigned POST, then ask the backend
+    to compress and record the object. The API never receives the upload body.
     """
-    res = requests.get(
-        f"{API_URL}/files",
+    res = requests.post(
+        f"{API_URL}/files/upload/initiate",
+        json={"filename": file_name, "category": category, "size": len(file_bytes)},
         headers=_auth_headers(),
         timeout=DEFAULT_TIMEOUT,
     )
-    files = _handle_response(res)
+    target = _handle_response(res)
 
-    # Apply your existing filtering logic
-    results = []
-    for f in files:
-        if search_query and search_query.lower() not in f["name"].lower():
-            continue
-        # pylint: disable=consider-using-in
-        if category_filter != "All" and f["category"] != category_filter:
-            continue
+    s3_res = requests.post(
+        target["url"],
+        data=target["fields"],
+        files={"file": (file_name, file_bytes, "application/octet-stream")},
+        timeout=600,
+    )
+    if s3_res.status_code >= 300:
+        # pylint: disable=broad-exception-raised
+        raise Exception(f"S3 upload failed ({s3_res.status_code}): {s3_res.text[:200]}")
+
+    res = requests.post(
+        f"{API_URL}/files/upload/complete",
+        json={
+            "key": target["key"],
+            "compression_level": compression_level,
+            "user_email": user_email
+        },
+        headers=_auth_headers(),
+        timeout=600,
+    )
+    return _handle_response(res)
+
+def upload_files_batch(uploaded_files: list, category: str, user_email: str):
+    """
+    Upload several files in one request via /files/upload/batch.
+
+    Yields one dict per file as the backend finishes it ({"status": "stored"|"failed"}),
+    then a final {"done": True, "committed": n, "files": [...]} summary.
+    """
+    # pylint: disable=import-outside-toplevel
+    import streamlit as st
+    compression_level = st.session_state.get("compression_level", "medium")
 
-        # normalize ratio for UI
-        ratio = f.get("compression_ratio", 0)
+    files = [
+        ("uploads", (f.name, f.getvalue(), "application/octet-stream"))
+        for f in uploaded_files
+    ]
+    data = {
+        "category": category,
+        "compression_level": compression_level,
+        "user_email": user_email
+    }
+
+    res = requests.post(
+        f"{API_URL}/files/upload/batch",
+        files=files,
+        data=data,
+        headers=_auth_headers(),
+        timeout=1800,
+        stream=True
+    )
+    if res.status_code >= 400:
+        _handle_response(res)
+
+    for line in res.iter_lines():
+        if not line:
+            continue
+        item = json.loads(line)
+        ratio = item.get("compression_ratio", 0)
         if ratio > 1.0:
-            ratio = ratio / 100.0
+            item["compression_ratio"] = ratio / 100.0
+        yield item
+
+
+def _send_chunk(upload_id: str, offset: int, chunk: bytes, auth_headers: dict):
+    # auth_headers is passed in: worker threads have no Streamlit session context
+    res = requests.put(
+        f"{API_URL}/files/uploads/{upload_id}",
+        params={"offset": offset},
+        data=chunk,
+        headers={
+            **auth_headers,
+            "Content-Type": "application/octet-stream",
+            "X-Chunk-SHA256": hashlib.sha256(chunk).hexdigest()
+        },
+        timeout=120,
+    )
+    return _handle_response(res)
+
+
+def _missing_offsets(size: int, chunk_size: int, ranges: list):
+    """Chunk start offsets not fully covered by the server's received ranges."""
+    offsets = []
+    for offset in range(0, size, chunk_size):
+        end = min(offset + chunk_size, size)
+        if not any(start <= offset and end <= r_end for start, r_end in ranges):
+            offsets.append(offset)
+    return offsets
+
+
+def _upload_resumable(
+    file_name: str, file_bytes: bytes, category: str, user_email: str, compression_level: str
+):
+    """
+    Upload in checksummed chunks sent in parallel. After a failure only the
+    chunks the server has not acknowledged are re-sent, and the session id
+    is kept in session_state so a Streamlit rerun resumes the same upload.
+    """
+    # pylint: disable=import-outside-toplevel
+    import streamlit as st
+
+    file_sha = hashlib.sha256(file_bytes).hexdigest()
+    pending = st.session_state.setdefault("resumable_uploads", {})
+    upload_id = pending.get(file_sha)
+    status = None
+
+    if upload_id:
+        res = requests.get(
+            f"{API_URL}/files/uploads/{upload_id}",
+            headers=_auth_headers(),
+            timeout=DEFAULT_TIMEOUT,
+        )
+        status = res.json() if res.status_code == 200 else None
+
+    if not status:
+        res = requests.post(
+            f"{API_URL}/files/uploads",
+            json={
+                "filename": file_name,
+                "category": category,
+                "size": len(file_bytes),
+                "compression_level": compression_level,
+                "sha256": file_sha
+            },
+            headers=_auth_headers(),
+            timeout=DEFAULT_TIMEOUT,
+        )
+        status = _handle_response(res)
+        pending[file_sha] = status["upload_id"]
+
+    upload_id = status["upload_id"]
+    chunk_size = UPLOAD_CHUNK_SIZE
+    auth_headers = _auth_headers()
+
+    for _ in range(UPLOAD_MAX_ATTEMPTS):
+        offsets = _missing_offsets(len(file_bytes), chunk_size, status["ranges"])
+        if not offsets:
+            break
+        with ThreadPoolExecutor(max_workers=UPLOAD_PARALLELISM) as pool:
+            futures = [
+                pool.submit(
+                    _send_chunk, upload_id, off, file_bytes[off:off + chunk_size], auth_headers
+                )
+                for off in offsets
+            ]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except Exception as e: # pylint: disable=broad-exception-caught
+                    print(f"UPLOAD: Chunk failed, will retry: {str(e)}")
+        res = requests.get(
+            f"{API_URL}/files/uploads/{upload_id}",
+            headers=_auth_headers(),
+            timeout=DEFAULT_TIMEOUT,
+        )
+        status = _handle_response(res)
+
+    if not status["complete"]:
+        # pylint: disable=broad-exception-raised
+        raise Exception(
+            f"Upload interrupted at {status['received']}/{len(file_bytes)} bytes. "
+            "Retry to resume."
+        )
+
+    res = requests.post(
+        f"{API_URL}/files/uploads/{upload_id}/complete",
+        headers=_auth_headers(),
+        timeout=600,
+    )
+    result = _handle_response(res)
+    pending.pop(file_sha, None)
+    return result
+
+
+def _normalize_file(f: dict) -> dict:
+    # normalize ratio for UI
+    ratio = f.get("compression_ratio", 0)
+    if ratio > 1.0:
+        ratio = ratio / 100.0
+
+    return {
+        "id": f["id"],
+        "name": f["name"],
+        "category": f["category"],
+        "original_size": f["original_size"],
+        "compressed_size": f["compressed_size"],
+        "compression_ratio": ratio,
+        "uploaded_by": f.get("uploaded_by", ""),
+        "uploaded_at": f.get("uploaded_at", ""),
+        "s3_path": f.get("s3_path", "")
+    }
+
+
+def list_files_page( # pylint: disable=too-many-arguments, too-many-positional-arguments
+    search_query: str = "",
+    category_filter: str = "All",
+    sort: str = "newest",
+    limit: int = 50,
+    cursor: str = None,
+    include_total: bool = False
+):
+    """
+    Fetch one page of files. Search, filtering and sorting run on the backend.
+    Returns {"items": [...], "next_cursor": str|None, "total": int|None}.
+    """
+    params = {"sort": sort, "limit": limit, "include_total": include_total}
+    if search_query:
+        params["q"] = search_query
+    if category_filter != "All":
+        params["category"] = category_filter
+    if cursor:
+        params["cursor"] = cursor
 
-        results.append({
-            "id": f["id"],
-            "name": f["name"],
-            "category": f["category"],
-            "original_size": f["original_size"],
-            "compressed_size": f["compressed_size"],
-            "compression_ratio": ratio,
-            "uploaded_by": f.get("uploaded_by", ""),
-            "uploaded_at": f.get("uploaded_at", ""),
-            "s3_path": f.get("s3_path", "")
-        })
+    page = _get_listing(f"{API_URL}/files", params)
+    page["items"] = [_normalize_file(f) for f in page["items"]]
+    return page
 
-    # newest first
-    results.sort(key=lambda x: x["uploaded_at"], reverse=True)
-    return results
+
+def search_files_page(
+    search_query: str, category_filter: str = "All", limit: int = 50, cursor: str = None
+):
+    """
+    Ranked full-text search over file names and document text.
+    Returns {"items": [...], "next_cursor": str|None}; items carry a "snippet".
+    """
+    params = {"q": search_query, "limit": limit}
+    if category_filter != "All":
+        params["category"] = category_filter
+    if cursor:
+        params["cursor"] = cursor
+
+    page = _get_listing(f"{API_URL}/files/search", params)
+    page["items"] = [
+        {**_normalize_file(f), "snippet": f.get("snippet", "")} for f in page["items"]
+    ]
+    page["total"] = None
+    return page
+
+
+def list_files(search_query: str = "", category_filter: str = "All", limit: int = None):
+    """
+    Fetch files newest first, following cursors until limit (or the end) is reached.
+    Prefer list_files_page for anything that can grow large.
+    """
+    results, cursor = [], None
+    while True:
+        page_size = min(limit - len(results), 500) if limit else 500
+        page = list_files_page(search_query, category_filter, limit=page_size, cursor=cursor)
+        results.extend(page["items"])
+        cursor = page["next_cursor"]
+        if not cursor or (limit and len(results) >= limit):
+            return results
 
 
 def delete_file(file_id: str, user):
@@ -327,24 +643,98 @@ def get_file_content(file_id: str):
 
 
 
+def export_files(file_ids: list = None, category: str = None):
+    """Download a ZIP of many files (by id list or whole category) in one request."""
+    try:
+        res = requests.post(
+            f"{API_URL}/files/export",
+            json={"file_ids": file_ids, "category": category},
+            headers=_auth_headers(),
+            timeout=600,
+            stream=True
+        )
+        if res.status_code == 200:
+            return b"".join(res.iter_content(chunk_size=1024 * 1024))
+
+        print(f"Export failed: {res.status_code} - {res.text[:200]}")
+        return None
+    except Exception as e: # pylint: disable=broad-exception-caught
+        print(f"Export exception: {str(e)}")
+        return None
+
+
 # ============================
 # Audit logs
 # ============================
 
-def list_audit_logs(action_filter: str = "All", limit: int = 100):
-    """Fetch audit logs from backend."""
-    res = requests.get(
-        f"{API_URL}/audit",
-        params={"limit": limit},
-        headers=_auth_headers(),
-        timeout=DEFAULT_TIMEOUT,
-    )
-    logs = _handle_response(res)
+def list_audit_logs( # pylint: disable=too-many-arguments, too-many-positional-arguments
+    action_filter: str = "All",
+    limit: int = 100,
+    user_filter: str = "",
+    target_filter: str = "",
+    since: datetime = None,
+    until: datetime = None
+):
+    """
+    Fetch the newest audit logs matching the filters, newest first.
+    Filtering runs on the backend, so limit is honoured even for rare actions.
+    """
+    params = _audit_filter_params(action_filter, user_filter, target_filter, since, until)
+    logs, cursor = [], None
+    while len(logs) < limit:
+        page_params = {**params, "limit": min(limit - len(logs), 500)}
+        if cursor:
+            page_params["cursor"] = cursor
+        page = _get_listing(f"{API_URL}/audit", page_params)
+        logs.extend(page["items"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    return logs
+
+
+def export_audit_logs( # pylint: disable=too-many-arguments, too-many-positional-arguments
+    fmt: str = "csv",
+    action_filter: str = "All",
+    user_filter: str = "",
+    target_filter: str = "",
+    since: datetime = None,
+    until: datetime = None
+):
+    """Download every matching audit log entry (CSV or NDJSON), streamed by the backend."""
+    params = _audit_filter_params(action_filter, user_filter, target_filter, since, until)
+    params["fmt"] = fmt
+    try:
+        res = requests.get(
+            f"{API_URL}/audit/export",
+            params=params,
+            headers=_auth_headers(),
+            timeout=600,
+            stream=True
+        )
+        if res.status_code == 200:
+            return b"".join(res.iter_content(chunk_size=1024 * 1024))
+
+        print(f"Audit export failed: {res.status_code} - {res.text[:200]}")
+        return None
+    except Exception as e: # pylint: disable=broad-exception-caught
+        print(f"Audit export exception: {str(e)}")
+        return None
 
-    if action_filter != "All":
-        logs = [l for l in logs if l.get("action") == action_filter]
 
-    return logs[:limit]
+def _audit_filter_params(action_filter, user_filter, target_filter, since, until) -> dict:
+    params = {}
+    if action_filter and action_filter != "All":
+        params["action"] = action_filter
+    if user_filter:
+        params["user"] = user_filter
+    if target_filter:
+        params["target"] = target_filter
+    if since:
+        params["since"] = since.isoformat()
+    if until:
+        params["until"] = until.isoformat()
+    return params
 
 
 # ============================
@@ -380,42 +770,18 @@ def list_org_users(admin_user: dict = None):
 
 
 # ============================
-# Dashboard stats (computed from backend)
+# Dashboard stats
 # ============================
 
 def get_dashboard_stats(user: dict = None):
-    """Calculate dashboard statistics from backend files list."""
+    """Fetch dashboard statistics (incrementally maintained on the backend)."""
     # user arg accepted for compatibility but ignored as we use backend auth
-    files = list_files()
-
-    if not files:
-        return {
-            "total_files": 0,
-            "total_storage_original": 0,
-            "total_storage_compressed": 0,
-            "compression_savings_pct": 0,
-            "last_upload": None
-        }
-
-    total_original = sum(f["original_size"] for f in files)
-    total_compressed = sum(f["compressed_size"] for f in files)
-
-    savings_pct = (
-        ((total_original - total_compressed) / total_original * 100)
-        if total_original else 0
-    )
-    last_upload = (
-        max(files, key=lambda x: x["uploaded_at"])["uploaded_at"]
-        if files else None
+    res = requests.get(
+        f"{API_URL}/stats",
+        headers=_auth_headers(),
+        timeout=DEFAULT_TIMEOUT,
     )
-
-    return {
-        "total_files": len(files),
-        "total_storage_original": total_original,
-        "total_storage_compressed": total_compressed,
-        "compression_savings_pct": savings_pct,
-        "last_upload": last_upload
-    }
+    return _handle_response(res)
 
 
 # ============================
@@ -5,9 +5,17 @@ import os
 
 s3 = boto3.client('s3')
 
+# Direct browser uploads are compressed and recorded by the API's
+# /files/upload/complete endpoint, so the Lambda must leave them in place.
+DIRECT_UPLOAD_PREFIX = 'incoming/direct/'
+
 def lambda_handler(event, context):
     bucket = event['Records'][0]['s3']['bucket']['name']
     key = event['Records'][0]['s3']['object']['key']
+
+    if key.startswith(DIRECT_UPLOAD_PREFIX):
+        print(f"Skipping direct upload (handled by API): {key}")
+        return {"status": "skipped"}
     
     # Identify file type
     extension = key.split('.')[-1].lower()
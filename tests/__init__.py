@@ -0,0 +1,23 @@
+import os
+import sys
+import tempfile
+
+# Backend modules import each other as top-level modules (see Dockerfile PYTHONPATH)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "backend"))
+
+# Keep tests away from the real database and scratch space
+_TEST_DIR = tempfile.mkdtemp(prefix="safekeep-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}")
+os.environ.setdefault("UPLOAD_SCRATCH_DIR", os.path.join(_TEST_DIR, "uploads"))
+os.environ.setdefault("AUDIT_SPILL_DIR", os.path.join(_TEST_DIR, "audit-spill"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_TEST_DIR, "profiles"))
+
+# Cheap bcrypt, and every test client shares one address for the login throttle
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("LOGIN_IP_BURST", "1000")
+
+# The app no longer creates its schema on import; tests run the deploy-time migrations
+# pylint: disable=wrong-import-position
+from database import engine as _engine
+from migrations import run_all as _run_migrations
+_run_migrations(_engine)
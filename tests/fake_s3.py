@@ -0,0 +1,86 @@
+"""An in-memory stand-in for the boto3 S3 client, for the calls the backend makes."""
+import io
+import hashlib
+from contextlib import contextmanager
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+import config
+import s3_service
+
+
+def _etag(obj) -> str:
+    return f'"{hashlib.md5(obj["data"]).hexdigest()}"'
+
+
+def _missing(operation):
+    return ClientError({"Error": {"Code": "404", "Message": "Not Found"}}, operation)
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects = {}
+        self.calls = []
+
+    def add(self, key, data, metadata=None, size=None):
+        """Store an object; size overrides the length HEAD reports."""
+        self.objects[key] = {"data": data, "metadata": metadata or {}, "size": size}
+
+    def _get(self, key, operation):
+        self.calls.append((operation, key))
+        if key not in self.objects:
+            raise _missing(operation)
+        return self.objects[key]
+
+    def put_object(self, Bucket, Key, Body, **kwargs): # pylint: disable=invalid-name, unused-argument
+        self.calls.append(("PutObject", Key))
+        self.add(Key, Body if isinstance(Body, bytes) else Body.read(), kwargs.get("Metadata"))
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None): # pylint: disable=invalid-name, unused-argument
+        self.calls.append(("UploadFile", Key))
+        with open(Filename, "rb") as f:
+            self.add(Key, f.read(), (ExtraArgs or {}).get("Metadata"))
+
+    def head_object(self, Bucket, Key): # pylint: disable=invalid-name, unused-argument
+        obj = self._get(Key, "HeadObject")
+        size = obj["size"] if obj["size"] is not None else len(obj["data"])
+        return {"ContentLength": size, "Metadata": obj["metadata"], "ETag": _etag(obj)}
+
+    def get_object(self, Bucket, Key, **kwargs): # pylint: disable=invalid-name, unused-argument
+        obj = self._get(Key, "GetObject")
+        return {
+            "Body": io.BytesIO(obj["data"]), "ContentLength": len(obj["data"]), "ETag": _etag(obj)
+        }
+
+    def download_file(self, Bucket, Key, Filename): # pylint: disable=invalid-name, unused-argument
+        obj = self._get(Key, "DownloadFile")
+        with open(Filename, "wb") as f:
+            f.write(obj["data"])
+
+    def download_fileobj(self, Bucket, Key, Fileobj): # pylint: disable=invalid-name, unused-argument
+        obj = self._get(Key, "DownloadFileobj")
+        Fileobj.write(obj["data"])
+
+    def delete_object(self, Bucket, Key): # pylint: disable=invalid-name, unused-argument
+        self.calls.append(("DeleteObject", Key))
+        self.objects.pop(Key, None)
+
+    def generate_presigned_post(self, Bucket, Key, Fields, Conditions, ExpiresIn): # pylint: disable=invalid-name, unused-argument
+        return {"url": f"https://{Bucket}.s3.test/", "fields": {**Fields, "key": Key}}
+
+    def generate_presigned_url(self, operation, Params, ExpiresIn): # pylint: disable=invalid-name, unused-argument
+        return f"https://{Params['Bucket']}.s3.test/{Params['Key']}"
+
+    def operations(self, name):
+        return [key for operation, key in self.calls if operation == name]
+
+
+@contextmanager
+def fake_s3():
+    """Route every get_s3() call to a fresh FakeS3 and pin the bucket name."""
+    fake = FakeS3()
+    with mock.patch.object(s3_service, "_s3", fake), \
+            mock.patch.object(config, "S3_BUCKET_NAME", "test-bucket", create=True):
+        yield fake
+
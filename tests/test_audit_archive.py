@@ -0,0 +1,130 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from sqlalchemy import insert
+
+import audit_archive
+from audit_archive import archive_old_logs, query_logs, iter_logs
+from database import Base, engine, SessionLocal, AsyncSessionLocal
+from models import AuditLog, AuditArchiveSegment
+
+TENANT = "Archive NGO"
+OTHER = "Archive Other NGO"
+
+
+class FakeStore:
+    def __init__(self):
+        self.objects = {}
+        self.fetches = 0
+
+    def put(self, key, data):
+        self.objects[key] = data
+
+    def fetch(self, key):
+        self.fetches += 1
+        return self.objects[key]
+
+
+class TestAuditArchive(unittest.TestCase):
+    def setUp(self):
+        Base.metadata.create_all(bind=engine)
+        self.store = FakeStore()
+        self.now = datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+        with engine.begin() as conn:
+            conn.execute(AuditLog.__table__.delete().where(AuditLog.ngo_name.in_([TENANT, OTHER])))
+            conn.execute(AuditArchiveSegment.__table__.delete())
+            # 300 entries, one every 16 hours, covering the last 200 days
+            conn.execute(insert(AuditLog), [{
+                "timestamp": self.now - timedelta(hours=16 * i),
+                "user": "staff@ngo.org", "ngo_name": TENANT,
+                "action": "UPLOAD" if i % 2 else "LOGIN", "target": f"entry {i}",
+                "status": "Success", "ip": None
+            } for i in range(300)] + [{
+                "timestamp": self.now - timedelta(days=150),
+                "user": "x@other.org", "ngo_name": OTHER, "action": "LOGIN",
+                "target": "System", "status": "Success", "ip": None
+            }])
+        self.db = SessionLocal()
+        self.expected = [f"entry {i}" for i in range(300)]
+
+    def tearDown(self):
+        self.db.close()
+
+    def _archive(self, days=90):
+        return archive_old_logs(self.db, days, put=self.store.put)
+
+    def _query(self, limit, filters=None, cursor=None):
+        async def run():
+            async with AsyncSessionLocal() as db:
+                return await query_logs(db, TENANT, limit, filters, cursor, fetch=self.store.fetch)
+        return asyncio.run(run())
+
+    def _iter(self, filters=None):
+        async def run():
+            async with AsyncSessionLocal() as db:
+                return [r async for r in iter_logs(db, TENANT, filters, fetch=self.store.fetch)]
+        return asyncio.run(run())
+
+    def test_old_rows_move_to_monthly_segments(self):
+        result = self._archive()
+        hot = self.db.query(AuditLog).filter(AuditLog.ngo_name == TENANT).all()
+        self.assertTrue(all(r.timestamp >= self.now - timedelta(days=91) for r in hot))
+
+        segments = self.db.query(AuditArchiveSegment).filter_by(ngo_name=TENANT).all()
+        self.assertEqual(len({s.month for s in segments}), len(segments))
+        self.assertEqual(len(hot) + sum(s.row_count for s in segments), 300)
+        self.assertEqual(len(self.store.objects), result["segments"])
+
+    def test_segments_split_at_max_rows(self):
+        with mock.patch.object(audit_archive, "AUDIT_SEGMENT_MAX_ROWS", 10):
+            self._archive()
+        hot = self.db.query(AuditLog).filter(AuditLog.ngo_name == TENANT).count()
+        segments = self.db.query(AuditArchiveSegment).filter_by(ngo_name=TENANT).all()
+        self.assertTrue(all(s.row_count <= 10 for s in segments))
+        self.assertEqual(hot + sum(s.row_count for s in segments), 300)
+
+    def test_recent_page_does_not_read_archive(self):
+        self._archive()
+        rows, _ = self._query(50)
+        self.assertEqual([r["target"] for r in rows], self.expected[:50])
+        self.assertEqual(self.store.fetches, 0)
+
+    def test_full_history_merges_hot_and_archived(self):
+        self._archive()
+        rows, next_cursor = self._query(500)
+        self.assertEqual([r["target"] for r in rows], self.expected)
+        self.assertIsNone(next_cursor)
+        self.assertNotIn(OTHER, {r["ngo_name"] for r in rows})
+
+    def test_cursor_pages_cross_into_archive(self):
+        self._archive()
+        targets, cursor = [], None
+        while True:
+            rows, cursor = self._query(7, {"action": "UPLOAD"}, cursor)
+            targets.extend(r["target"] for r in rows)
+            if not cursor:
+                break
+        self.assertEqual(targets, [f"entry {i}" for i in range(300) if i % 2])
+
+    def test_export_iterates_archive_then_live_oldest_first(self):
+        self._archive()
+        rows = self._iter({"action": "LOGIN"})
+        self.assertEqual([r["target"] for r in rows], [f"entry {i}" for i in range(298, -1, -2)])
+
+    def test_time_range_reads_only_overlapping_segments(self):
+        self._archive()
+        since = self.now - timedelta(days=150)
+        until = self.now - timedelta(days=120)
+        rows, _ = self._query(500, {"since": since, "until": until})
+
+        in_range = [f"entry {i}" for i in range(300)
+                    if since <= self.now - timedelta(hours=16 * i) <= until]
+        self.assertEqual([r["target"] for r in rows], in_range)
+        segments = self.db.query(AuditArchiveSegment).filter_by(ngo_name=TENANT).count()
+        self.assertLess(self.store.fetches, segments)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import os
+import time
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+
+from audit_sink import AuditSink
+from database import Base
+from models import AuditLog, TenantVersion
+
+
+class FlakyBind:
+    """Engine wrapper whose transactions fail while .down is True, or start after .delay."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.down = False
+        self.delay = 0.0
+
+    def begin(self):
+        time.sleep(self.delay)
+        if self.down:
+            raise OperationalError("INSERT", {}, Exception("database is unavailable"))
+        return self.engine.begin()
+
+
+class TestAuditSink(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.dir, 'audit.db')}")
+        Base.metadata.create_all(
+            self.engine, tables=[AuditLog.__table__, TenantVersion.__table__]
+        )
+        self.bind = FlakyBind(self.engine)
+        self.spill_dir = os.path.join(self.dir, "spill")
+
+    def _sink(self, **kwargs):
+        options = {"batch_size": 50, "flush_interval": 0.05, "replay_interval": 0.05}
+        options.update(kwargs)
+        return AuditSink(self.bind, self.spill_dir, **options)
+
+    def _rows(self):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(AuditLog)).scalar()
+
+    def _wait_for_rows(self, expected, timeout=5.0):
+        deadline = time.time() + timeout
+        while time.time() < deadline and self._rows() < expected:
+            time.sleep(0.02)
+        return self._rows()
+
+    def _log(self, sink, n, action="LOGIN"):
+        for i in range(n):
+            sink.record(f"user{i}@ngo.org", "Test NGO", action, "System", "Success", "10.0.0.1")
+
+    def test_batches_are_written_in_background(self):
+        sink = self._sink()
+        self._log(sink, 120)
+        self.assertEqual(self._wait_for_rows(120), 120)
+        sink.close()
+        self.assertEqual(sink.stats["written"], 120)
+        self.assertEqual(sink.stats["spilled"], 0)
+
+    def test_close_flushes_pending_entries(self):
+        sink = self._sink(flush_interval=60)
+        self._log(sink, 10)
+        sink.close()
+        self.assertEqual(self._rows(), 10)
+
+    def test_full_queue_spills_instead_of_blocking(self):
+        # Slow DB: at most queue_max queued + batch_size held by the writer; the rest spills
+        self.bind.delay = 0.3
+        sink = self._sink(queue_max=5, batch_size=10, flush_interval=60, replay_interval=60)
+        started = time.perf_counter()
+        self._log(sink, 40)
+        self.assertLess(time.perf_counter() - started, 1.0)
+        self.assertGreaterEqual(sink.stats["spilled"], 25)
+        sink.close()
+        self.assertEqual(self._rows() + sink.stats["spilled"], 40)
+
+    def test_failed_batches_are_replayed(self):
+        self.bind.down = True
+        sink = self._sink()
+        self._log(sink, 30, action="DELETE")
+        deadline = time.time() + 5
+        while sink.stats["spilled"] < 30 and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(self._rows(), 0)
+
+        self.bind.down = False
+        self.assertEqual(self._wait_for_rows(30), 30)
+        sink.close()
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+    def test_dead_worker_spill_is_adopted(self):
+        os.makedirs(self.spill_dir)
+        # pid 0x7fffffff will not be a live process
+        with open(os.path.join(self.spill_dir, "spill-2147483647.ndjson"), "w", encoding="utf-8") as f:
+            f.write('{"timestamp": "2024-05-01T10:00:00+00:00", "user": "a@ngo.org", '
+                    '"ngo_name": "Test NGO", "action": "UPLOAD", "target": "x.pdf", '
+                    '"status": "Success", "ip": null}\n')
+            f.write('{"truncated')
+        sink = self._sink()
+        self.assertEqual(self._wait_for_rows(1), 1)
+        sink.close()
+        self.assertEqual(os.listdir(self.spill_dir), [])
+
+    def test_record_after_close_is_spilled(self):
+        sink = self._sink()
+        sink.close()
+        self._log(sink, 3)
+        self.assertEqual(sink.stats["spilled"], 3)
+        self.assertEqual(self._rows(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, inspect, text
+
+import main
+from auth import token_versions, create_token
+from database import engine, async_engine
+from migrations import ensure_columns
+from models import User
+
+EMAIL = "tokens@ngo.org"
+PASSWORD = "correct horse"
+
+
+class TestStatelessTokens(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        with engine.begin() as conn:
+            conn.execute(User.__table__.delete().where(User.email == EMAIL))
+        res = cls.client.post("/auth/register", json={
+            "ngo_name": "Token NGO", "email": EMAIL, "password": PASSWORD
+        })
+        assert res.status_code == 200, res.text
+
+    def _login(self) -> dict:
+        res = self.client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        self.assertEqual(res.status_code, 200)
+        return res.json()
+
+    def _stats(self, token: str):
+        return self.client.get("/stats", headers={"Authorization": f"Bearer {token}"})
+
+    def test_authenticated_request_skips_user_lookup(self):
+        token = self._login()["token"]
+        self.assertEqual(self._stats(token).status_code, 200)  # warms the version cache
+
+        statements = []
+
+        def _capture(_conn, _cursor, statement, _parameters, _context, _executemany):
+            statements.append(statement.lower())
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", _capture)
+        try:
+            self.client.get("/files", headers={"Authorization": f"Bearer {token}"})
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", _capture)
+        self.assertFalse([s for s in statements if "from users" in s])
+
+    def test_logout_revokes_access_and_refresh_tokens(self):
+        tokens = self._login()
+        res = self.client.post(
+            "/auth/logout", headers={"Authorization": f"Bearer {tokens['token']}"}
+        )
+        self.assertEqual(res.status_code, 200)
+
+        self.assertEqual(self._stats(tokens["token"]).status_code, 401)
+        res = self.client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(res.status_code, 401)
+        self.assertEqual(self._stats(self._login()["token"]).status_code, 200)
+
+    def test_refresh_issues_new_access_token(self):
+        tokens = self._login()
+        res = self.client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(self._stats(res.json()["token"]).status_code, 200)
+
+        # Tokens are not interchangeable
+        self.assertEqual(self._stats(tokens["refresh_token"]).status_code, 401)
+        res = self.client.post("/auth/refresh", json={"refresh_token": tokens["token"]})
+        self.assertEqual(res.status_code, 401)
+
+    def test_stale_version_is_rejected_after_cache_expiry(self):
+        token = self._login()["token"]
+        with engine.begin() as conn:
+            conn.execute(
+                User.__table__.update().where(User.email == EMAIL)
+                .values(token_version=User.token_version + 1)
+            )
+        token_versions.invalidate(EMAIL)  # as if TOKEN_VERSION_CACHE_SECONDS had passed
+        self.assertEqual(self._stats(token).status_code, 401)
+
+    def test_token_carries_claims(self):
+        user = User(email="x@ngo.org", ngo_name="X", role="staff", token_version=3)
+        res = self.client.get("/stats", headers={"Authorization": f"Bearer {create_token(user)}"})
+        self.assertEqual(res.status_code, 401)  # unknown user, even with well-formed claims
+
+
+class TestEnsureColumns(unittest.TestCase):
+    def test_adds_token_version_to_existing_users_table(self):
+        legacy = create_engine("sqlite://")
+        with legacy.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE users (id INTEGER PRIMARY KEY, ngo_name VARCHAR NOT NULL, "
+                "email VARCHAR NOT NULL, password_hash VARCHAR NOT NULL, role VARCHAR, "
+                "created_at DATETIME)"
+            ))
+            conn.execute(text(
+                "INSERT INTO users (ngo_name, email, password_hash) VALUES ('A', 'a@a', '-')"
+            ))
+        ensure_columns(legacy)
+        columns = {c["name"] for c in inspect(legacy).get_columns("users")}
+        self.assertIn("token_version", columns)
+        with legacy.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT token_version FROM users")).scalar(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import io
+import json
+import time
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from starlette.datastructures import UploadFile
+
+import main
+from config import FILE_ID_PREFIX
+from database import engine, SessionLocal
+from models import FileRecord, User
+from routes.file_routes import upload_batch
+from warmup import canary_files
+from tests.fake_s3 import fake_s3
+
+PASSWORD = "batch pass"
+EMAIL, NGO = "staff@batch.org", "Batch NGO"
+
+
+def _stored(names) -> list:
+    with SessionLocal() as db:
+        return db.query(FileRecord).filter(
+            FileRecord.ngo_name == NGO, FileRecord.name.in_(names)
+        ).all()
+
+
+class TestBatchUpload(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        with engine.begin() as conn:
+            conn.execute(User.__table__.delete().where(User.email == EMAIL))
+        cls.client.post("/auth/register", json={
+            "ngo_name": NGO, "email": EMAIL, "password": PASSWORD, "role": "staff"
+        })
+        res = cls.client.post("/auth/login", json={"email": EMAIL, "password": PASSWORD})
+        assert res.status_code == 200, res.text
+        cls.auth = {"Authorization": f"Bearer {res.json()['token']}"}
+
+    def setUp(self):
+        patcher = fake_s3()
+        self.s3 = patcher.__enter__() # pylint: disable=unnecessary-dunder-call
+        self.addCleanup(patcher.__exit__, None, None, None)
+        with engine.begin() as conn:
+            conn.execute(FileRecord.__table__.delete().where(FileRecord.ngo_name == NGO))
+
+    def _post(self, files) -> list:
+        res = self.client.post(
+            "/files/upload/batch", headers=self.auth,
+            data={"category": "Finance", "user_email": EMAIL},
+            files=[("uploads", (name, data, "application/octet-stream")) for name, data in files]
+        )
+        self.assertEqual(res.status_code, 200, res.text)
+        return [json.loads(line) for line in res.text.splitlines()]
+
+    def test_every_file_is_stored_and_committed(self):
+        png, pdf = canary_files()
+        lines = self._post([("a.png", png[1]), ("b.pdf", pdf[1])])
+
+        per_file, summary = lines[:-1], lines[-1]
+        self.assertEqual(sorted(line["name"] for line in per_file), ["a.png", "b.pdf"])
+        self.assertTrue(all(line["status"] == "stored" for line in per_file))
+        self.assertEqual((summary["done"], summary["committed"], summary["failed"]), (True, 2, 0))
+        self.assertEqual(
+            {rec.id for rec in _stored(["a.png", "b.pdf"])}, {line["id"] for line in per_file}
+        )
+        self.assertEqual(len(self.s3.operations("UploadFile")), 2)
+
+    def test_same_name_in_the_same_second_gets_separate_objects(self):
+        png = canary_files()[0][1]
+        lines = self._post([("scan.png", png), ("scan.png", png)])
+
+        keys = self.s3.operations("UploadFile")
+        self.assertEqual(len(set(keys)), 2)
+        for line in lines[:-1]:
+            ulid = line["id"][len(FILE_ID_PREFIX):]
+            self.assertIn(f"finance/{ulid}_scan.png", keys)
+            self.assertTrue(line["s3_path"].endswith(f"/finance/{ulid}_scan.png"))
+
+    def test_one_failing_file_does_not_sink_the_batch(self):
+        real_upload = self.s3.upload_file
+
+        def upload_file(Filename, Bucket, Key, ExtraArgs=None): # pylint: disable=invalid-name
+            if Key.endswith("bad.png"):
+                raise OSError("connection reset")
+            return real_upload(Filename, Bucket, Key, ExtraArgs)
+
+        png = canary_files()[0][1]
+        with mock.patch.object(self.s3, "upload_file", upload_file):
+            lines = self._post([("good.png", png), ("bad.png", png)])
+
+        by_name = {line["name"]: line for line in lines[:-1]}
+        self.assertEqual(by_name["good.png"]["status"], "stored")
+        self.assertEqual(by_name["bad.png"]["status"], "failed")
+        self.assertIn("connection reset", by_name["bad.png"]["error"])
+        self.assertEqual((lines[-1]["committed"], lines[-1]["failed"]), (1, 1))
+        self.assertEqual([rec.name for rec in _stored(["good.png", "bad.png"])], ["good.png"])
+
+    def test_rows_are_committed_without_the_client_reading_the_stream(self):
+        png = canary_files()[0][1]
+        uploads = [UploadFile(io.BytesIO(png), filename=f"unread{i}.png") for i in range(3)]
+        user = User(email=EMAIL, ngo_name=NGO, role="staff")
+
+        upload_batch(mock.Mock(client=None), user, "Finance", "medium", EMAIL, uploads)
+        # The request's files are gone once the endpoint returns
+        for upload in uploads:
+            upload.file.close()
+
+        names = [upload.filename for upload in uploads]
+        deadline = time.monotonic() + 30
+        while len(_stored(names)) < 3 and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(sorted(rec.name for rec in _stored(names)), names)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+import main
+from database import engine, async_engine, pool_stats, IS_SQLITE
+from models import AuditLog
+
+
+@unittest.skipUnless(IS_SQLITE, "SQLite pragma tuning")
+class TestSqliteTuning(unittest.TestCase):
+    def _pragmas(self, conn):
+        return {
+            name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "busy_timeout", "cache_size")
+        }
+
+    def test_sync_connections_use_wal(self):
+        with engine.connect() as conn:
+            pragmas = self._pragmas(conn)
+        self.assertEqual(pragmas["journal_mode"], "wal")
+        self.assertEqual(pragmas["synchronous"], 1)  # NORMAL
+        self.assertGreater(pragmas["busy_timeout"], 0)
+        self.assertLess(pragmas["cache_size"], 0)
+
+    def test_async_connections_use_wal(self):
+        async def run():
+            async with async_engine.connect() as conn:
+                return await conn.run_sync(self._pragmas)
+        self.assertEqual(asyncio.run(run())["journal_mode"], "wal")
+
+    def test_concurrent_writers_do_not_lock(self):
+        errors = []
+
+        def writer(n):
+            try:
+                for i in range(25):
+                    with engine.begin() as conn:
+                        conn.execute(AuditLog.__table__.insert().values(
+                            user=f"w{n}@ngo.org", ngo_name="Lock NGO", action="LOGIN",
+                            target=f"{n}-{i}", status="Success"
+                        ))
+            except Exception as e: # pylint: disable=broad-except
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        with engine.begin() as conn:
+            count = conn.execute(text(
+                "SELECT COUNT(*) FROM audit_logs WHERE ngo_name = 'Lock NGO'"
+            )).scalar()
+            conn.execute(AuditLog.__table__.delete().where(AuditLog.ngo_name == "Lock NGO"))
+        self.assertEqual(count, 200)
+
+
+class TestPoolStats(unittest.TestCase):
+    def test_health_reports_both_pools(self):
+        res = TestClient(main.app).get("/health/db")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(set(res.json()["pools"]), {"sync", "async"})
+
+    def test_checked_out_connections_are_counted(self):
+        with engine.connect():
+            self.assertGreaterEqual(pool_stats()["sync"]["checked_out"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+import db_router
+import main
+from database import engine, SessionLocal, IS_SQLITE
+from db_router import ReplicaRouter
+from dependencies import get_current_user
+from models import FileRecord, User
+from response_cache import bump_version
+
+TENANT = "Replica NGO"
+
+
+def _file(file_id: str) -> FileRecord:
+    return FileRecord(
+        id=file_id, name=f"{file_id}.pdf", category="Finance", original_size=1,
+        compressed_size=1, compression_ratio=0.0, compression_method="test",
+        uploaded_by="r@ngo.org", ngo_name=TENANT, s3_key=file_id, status="active"
+    )
+
+
+@unittest.skipUnless(IS_SQLITE, "uses a copy of the SQLite file as the replica")
+class TestReplicaRouting(unittest.TestCase):
+    def setUp(self):
+        with engine.begin() as conn:
+            conn.execute(FileRecord.__table__.delete().where(FileRecord.ngo_name == TENANT))
+            bump_version(conn, TENANT, "files")
+        self._store("replica_old")
+
+        # Snapshot the primary into a "replica" that will then fall behind
+        self.replica_path = os.path.join(tempfile.mkdtemp(), "replica.db")
+        with sqlite3.connect(engine.url.database) as src, \
+                sqlite3.connect(self.replica_path) as dst:
+            src.backup(dst)
+        self.replica = create_engine(f"sqlite:///{self.replica_path}")
+        self.async_replica = create_async_engine(f"sqlite+aiosqlite:///{self.replica_path}")
+        self.router = ReplicaRouter(self.replica, window=0.3, max_lag=10, check_interval=60)
+        self.router.check_lag()
+
+        self.patches = [
+            mock.patch.object(db_router, "replica_engine", self.replica),
+            mock.patch.object(db_router, "_router", self.router),
+            mock.patch.object(db_router, "AsyncReplicaSessionLocal", async_sessionmaker(
+                bind=self.async_replica, expire_on_commit=False
+            )),
+        ]
+        for p in self.patches:
+            p.start()
+        main.app.dependency_overrides[get_current_user] = lambda: User(
+            email="r@ngo.org", ngo_name=TENANT, role="admin"
+        )
+        self.client = TestClient(main.app)
+
+    def tearDown(self):
+        main.app.dependency_overrides.clear()
+        for p in self.patches:
+            p.stop()
+        self.replica.dispose()
+
+    def _store(self, file_id):
+        # As an upload does: the row plus a version bump so cached listings are invalidated
+        db = SessionLocal()
+        db.add(_file(file_id))
+        bump_version(db, TENANT, "files")
+        db.commit()
+        db.close()
+
+    def _listed_ids(self):
+        return {f["id"] for f in self.client.get("/files").json()["items"]}
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self._listed_ids(), {"replica_old"})
+        self.assertEqual(self.router.snapshot()["replica_reads"], 1)
+
+    def test_commit_opens_read_your_writes_window(self):
+        self._store("replica_new")
+
+        # Inside the window the tenant reads the primary and sees its upload
+        self.assertEqual(self._listed_ids(), {"replica_old", "replica_new"})
+        self.assertFalse(self.router.use_replica(TENANT))
+        self.assertTrue(self.router.use_replica("Some Other NGO"))
+
+        # Afterwards it is back on the (stale) replica
+        time.sleep(0.35)
+        self.assertEqual(self._listed_ids(), {"replica_old"})
+
+    def test_lagging_or_unreachable_replica_falls_back(self):
+        self.router.lag = 60.0
+        self.assertFalse(self.router.use_replica(TENANT))
+
+        broken = ReplicaRouter(create_engine("sqlite:////nonexistent/dir/replica.db"))
+        self.assertIsNone(broken.check_lag())
+        self.assertFalse(broken.use_replica(TENANT))
+
+    def test_rollback_does_not_open_window(self):
+        db = SessionLocal()
+        db.add(_file("replica_rolled_back"))
+        db.flush()
+        db.rollback()
+        db.close()
+        self.assertTrue(self.router.use_replica(TENANT))
+
+
+if __name__ == '__main__':
+    unittest.main()
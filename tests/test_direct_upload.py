@@ -0,0 +1,115 @@
+import unittest
+
+from fastapi.testclient import TestClient
+
+import main
+from config import DIRECT_UPLOAD_PREFIX, DIRECT_UPLOAD_MAX_BYTES
+from database import engine
+from models import User
+from warmup import canary_files
+from tests.fake_s3 import fake_s3
+
+PASSWORD = "direct pass"
+USERS = {
+    "owner": ("staff@direct.org", "Direct NGO"),
+    "other": ("staff@other-direct.org", "Other Direct NGO"),
+}
+_tokens = {}
+
+
+def _auth(who: str = "owner") -> dict:
+    return {"Authorization": f"Bearer {_tokens[who]}"}
+
+
+class TestDirectUpload(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        for who, (email, ngo_name) in USERS.items():
+            with engine.begin() as conn:
+                conn.execute(User.__table__.delete().where(User.email == email))
+            cls.client.post("/auth/register", json={
+                "ngo_name": ngo_name, "email": email, "password": PASSWORD, "role": "staff"
+            })
+            res = cls.client.post("/auth/login", json={"email": email, "password": PASSWORD})
+            assert res.status_code == 200, res.text
+            _tokens[who] = res.json()["token"]
+
+    def setUp(self):
+        patcher = fake_s3()
+        self.s3 = patcher.__enter__() # pylint: disable=unnecessary-dunder-call
+        self.addCleanup(patcher.__exit__, None, None, None)
+
+    def _initiate(self, **overrides):
+        body = {"filename": "receipt.png", "category": "Finance", **overrides}
+        return self.client.post("/files/upload/initiate", json=body, headers=_auth())
+
+    def _client_uploads(self, post, data, size=None):
+        """What the browser does with the presigned POST."""
+        metadata = {
+            name[len("x-amz-meta-"):]: value
+            for name, value in post["fields"].items() if name.startswith("x-amz-meta-")
+        }
+        self.s3.add(post["key"], data, metadata, size)
+
+    def test_initiate_then_complete(self):
+        res = self._initiate()
+        self.assertEqual(res.status_code, 200, res.text)
+        post = res.json()
+        self.assertTrue(post["key"].startswith(f"{DIRECT_UPLOAD_PREFIX}/"))
+        self.assertEqual(post["fields"]["x-amz-meta-ngo-name"], "Direct NGO")
+
+        self._client_uploads(post, canary_files()[0][1])
+        res = self.client.post(
+            "/files/upload/complete", json={"key": post["key"]}, headers=_auth()
+        )
+        self.assertEqual(res.status_code, 200, res.text)
+        stored = res.json()
+        self.assertEqual((stored["name"], stored["category"]), ("receipt.png", "Finance"))
+        self.assertLess(stored["compressed_size"], stored["original_size"])
+
+        # Streamed to disk and back, never read into memory, and the incoming object is gone
+        self.assertEqual(self.s3.operations("DownloadFile"), [post["key"]])
+        self.assertEqual(self.s3.operations("GetObject"), [])
+        self.assertEqual(len(self.s3.operations("UploadFile")), 1)
+        self.assertNotIn(post["key"], self.s3.objects)
+
+    def test_initiate_rejects_declared_size_over_the_limit(self):
+        res = self._initiate(size=DIRECT_UPLOAD_MAX_BYTES + 1)
+        self.assertEqual(res.status_code, 413)
+
+    def test_complete_rejects_object_over_the_limit_before_downloading(self):
+        post = self._initiate().json()
+        self._client_uploads(post, b"x", size=DIRECT_UPLOAD_MAX_BYTES + 1)
+        res = self.client.post(
+            "/files/upload/complete", json={"key": post["key"]}, headers=_auth()
+        )
+        self.assertEqual(res.status_code, 413)
+        self.assertEqual(self.s3.operations("DownloadFile"), [])
+
+    def test_complete_checks_the_tenant_pinned_on_the_object(self):
+        post = self._initiate().json()
+        self._client_uploads(post, canary_files()[0][1])
+        res = self.client.post(
+            "/files/upload/complete", json={"key": post["key"]}, headers=_auth("other")
+        )
+        self.assertEqual(res.status_code, 404)
+        self.assertEqual(self.s3.operations("DownloadFile"), [])
+        self.assertIn(post["key"], self.s3.objects)
+
+    def test_complete_rejects_keys_outside_the_incoming_prefix(self):
+        for key in ("finance/20240101_000000_receipt.png", f"{DIRECT_UPLOAD_PREFIX}/../x"):
+            res = self.client.post("/files/upload/complete", json={"key": key}, headers=_auth())
+            self.assertEqual(res.status_code, 400)
+        self.assertEqual(self.s3.calls, [])
+
+    def test_complete_of_a_missing_object_is_not_found(self):
+        res = self.client.post(
+            "/files/upload/complete",
+            json={"key": f"{DIRECT_UPLOAD_PREFIX}/{'0' * 32}/gone.png"}, headers=_auth()
+        )
+        self.assertEqual(res.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import io
+import zipfile
+import unittest
+
+from export_service import stream_zip, archive_names
+
+
+class TestStreamZip(unittest.TestCase):
+    def test_archive_preserves_order_and_content(self):
+        blobs = {f"k{i}": bytes([i]) * (1000 + i) for i in range(6)}
+        records = [
+            {"s3_key": key, "name": f"{key}.pdf", "category": "Finance"}
+            for key in blobs
+        ]
+
+        archive = b"".join(stream_zip(records, fetch=lambda k: io.BytesIO(blobs[k]), window=3))
+
+        with zipfile.ZipFile(io.BytesIO(archive)) as zf:
+            self.assertEqual(zf.namelist(), [f"Finance/k{i}.pdf" for i in range(6)])
+            for i in range(6):
+                self.assertEqual(zf.read(f"Finance/k{i}.pdf"), blobs[f"k{i}"])
+
+    def test_duplicate_names_are_suffixed(self):
+        records = [
+            {"name": "receipt.pdf", "category": "Donors"},
+            {"name": "receipt.pdf", "category": "Donors"},
+            {"name": "notes", "category": "Donors"},
+            {"name": "notes", "category": "Donors"},
+        ]
+        self.assertEqual(archive_names(records), [
+            "Donors/receipt.pdf", "Donors/receipt (2).pdf", "Donors/notes", "Donors/notes (2)"
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
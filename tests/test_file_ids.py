@@ -0,0 +1,118 @@
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, insert, text
+from sqlalchemy.orm import Session
+
+import search_index
+from config import FILE_ID_PREFIX
+from ids import new_ulid, ulid_at, ulid_time, is_ulid
+from migrations import migrate_legacy_file_ids, run_all
+from models import FileRecord, TenantVersion
+
+
+class TestUlid(unittest.TestCase):
+    def test_ids_increase_within_a_millisecond(self):
+        ids = [new_ulid() for _ in range(5000)]
+        self.assertEqual(ids, sorted(ids))
+        self.assertEqual(len(set(ids)), len(ids))
+        self.assertTrue(all(is_ulid(i) for i in ids))
+
+    def test_unique_across_threads(self):
+        ids = []
+
+        def worker():
+            batch = [new_ulid() for _ in range(2000)]
+            ids.extend(batch)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(set(ids)), 16000)
+
+    def test_time_roundtrip_and_ordering(self):
+        moment = datetime(2024, 3, 1, 12, 30, 15, 250000)
+        self.assertEqual(ulid_time(ulid_at(moment)).replace(tzinfo=None), moment)
+        self.assertLess(ulid_at(moment), ulid_at(moment + timedelta(milliseconds=1)))
+        self.assertLess(ulid_at(moment), new_ulid())
+
+
+class TestLegacyIdMigration(unittest.TestCase):
+    def setUp(self):
+        # A database of its own: the migration rewrites every table it is given
+        directory = tempfile.mkdtemp()
+        self.engine = create_engine(f"sqlite:///{os.path.join(directory, 'ids.db')}")
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        self.addCleanup(self.engine.dispose)
+        run_all(self.engine)
+
+        base = datetime(2023, 5, 1)
+        self.legacy = [f"file_{1682900000 + i}_abc{i}" for i in range(4)] + ["file_1682900004"]
+        self.others = ["f_1", "file_draft", "doc_1682900005", "file_1682900006_XYZ"]
+        with self.engine.begin() as conn:
+            conn.execute(insert(FileRecord), [{
+                "id": file_id, "name": f"legacy_{i}.pdf", "category": "Finance",
+                "original_size": 1, "compressed_size": 1, "compression_ratio": 0.0,
+                "compression_method": "test", "uploaded_by": "i@ngo.org", "ngo_name": "Id NGO",
+                "uploaded_at": base + timedelta(hours=i), "s3_key": file_id, "status": "active"
+            } for i, file_id in enumerate(self.legacy + self.others)])
+            conn.execute(insert(FileRecord), {
+                "id": "file_1682900100_abc", "name": "other.pdf", "category": "Finance",
+                "original_size": 1, "compressed_size": 1, "compression_ratio": 0.0,
+                "compression_method": "test", "uploaded_by": "o@ngo.org",
+                "ngo_name": "Other Id NGO", "uploaded_at": base, "s3_key": "other",
+                "status": "deleted"
+            })
+        with Session(self.engine) as db:
+            search_index.index_file(db, self.legacy[2], "Id NGO", "legacy_2.pdf", "Finance", "grant")
+            db.commit()
+
+    def _ids_by_upload(self):
+        with self.engine.connect() as conn:
+            return [r.id for r in conn.execute(text(
+                "SELECT id FROM files WHERE ngo_name = 'Id NGO' ORDER BY uploaded_at"
+            ))]
+
+    def _file_versions(self) -> dict:
+        with Session(self.engine) as db:
+            return {
+                v.ngo_name: v.version
+                for v in db.query(TenantVersion).filter(TenantVersion.scope == "files")
+            }
+
+    def test_legacy_ids_become_time_sorted_ulids(self):
+        migrate_legacy_file_ids(self.engine, batch_size=2)
+        ids = self._ids_by_upload()
+        migrated, untouched = ids[:len(self.legacy)], ids[len(self.legacy):]
+        self.assertTrue(all(i.startswith(FILE_ID_PREFIX) for i in migrated))
+        self.assertTrue(all(is_ulid(i[len(FILE_ID_PREFIX):]) for i in migrated))
+        self.assertEqual(migrated, sorted(migrated))
+
+        with Session(self.engine) as db:
+            hits = search_index.search(db, "Id NGO", "grant")
+        self.assertEqual([h["file_id"] for h in hits], [migrated[2]])
+
+        # Only the legacy format is rewritten; other ids and migrated ones are left alone
+        self.assertEqual(untouched, self.others)
+        migrate_legacy_file_ids(self.engine)
+        self.assertEqual(self._ids_by_upload(), ids)
+
+    def test_renaming_invalidates_the_cached_listings_of_each_tenant(self):
+        before = self._file_versions()
+        migrate_legacy_file_ids(self.engine, batch_size=2)
+        after = self._file_versions()
+        for ngo_name in ("Id NGO", "Other Id NGO"):
+            self.assertGreater(after[ngo_name], before.get(ngo_name, 0))
+
+        # Nothing left to rename, so cached listings stay valid
+        migrate_legacy_file_ids(self.engine)
+        self.assertEqual(self._file_versions(), after)
+
+if __name__ == '__main__':
+    unittest.main()
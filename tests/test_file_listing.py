@@ -0,0 +1,168 @@
+import json
+import unittest
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, text
+
+import main
+from database import SessionLocal, engine
+from migrations import normalize_sqlite_timestamps
+from dependencies import get_current_user
+from models import FileRecord, User
+from responses import FastJSONResponse
+
+
+class TestFileListing(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        main.app.dependency_overrides[get_current_user] = lambda: User(
+            email="lister@ngo.org", ngo_name="Listing NGO", role="admin"
+        )
+        cls.client = TestClient(main.app)
+
+        base = datetime(2024, 1, 1)
+        db = SessionLocal()
+        db.query(FileRecord).filter(FileRecord.ngo_name.in_(["Listing NGO", "Other NGO"])).delete()
+        for i in range(25):
+            db.add(FileRecord(
+                id=f"list_{i:03d}", name=f"report_{i:03d}.pdf",
+                category="Finance" if i % 2 else "Donors",
+                original_size=1000 * i, compressed_size=500 * i, compression_ratio=50.0,
+                compression_method="test", uploaded_by="lister@ngo.org",
+                # Pairs share a timestamp so the id tiebreaker is exercised
+                ngo_name="Listing NGO", uploaded_at=base + timedelta(minutes=i // 2),
+                s3_key=f"finance/{i}", status="deleted" if i == 24 else "active"
+            ))
+        db.add(FileRecord(
+            id="list_other", name="report_other.pdf", category="Finance",
+            original_size=1, compressed_size=1, compression_ratio=0.0,
+            compression_method="test", uploaded_by="x@other.org", ngo_name="Other NGO",
+            s3_key="finance/other", status="active"
+        ))
+        db.commit()
+        db.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        main.app.dependency_overrides.clear()
+
+    def _all_pages(self, **params):
+        ids, cursor = [], None
+        while True:
+            page = self.client.get("/files", params={**params, "cursor": cursor} if cursor else params).json()
+            ids.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+            if not cursor:
+                return ids
+
+    def test_pages_cover_every_row_once_in_order(self):
+        ids = self._all_pages(limit=7)
+        self.assertEqual(ids, [f"list_{i:03d}" for i in range(23, -1, -1)])
+
+        ids = self._all_pages(limit=5, sort="oldest")
+        self.assertEqual(ids, [f"list_{i:03d}" for i in range(24)])
+
+    def test_filters_and_total_run_server_side(self):
+        page = self.client.get("/files", params={
+            "category": "Finance", "min_size": 5000, "max_size": 15000,
+            "include_total": True, "sort": "largest"
+        }).json()
+        self.assertEqual(page["total"], 6)
+        self.assertEqual([i["original_size"] for i in page["items"]],
+                         [15000, 13000, 11000, 9000, 7000, 5000])
+
+        page = self.client.get("/files", params={"q": "_00"}).json()
+        self.assertEqual(len(page["items"]), 10)
+
+    @unittest.skipUnless(engine.dialect.name == "sqlite", "SQLite timestamp format")
+    def test_same_second_server_default_rows_page_once(self):
+        # Rows stamped by CURRENT_TIMESTAMP (e.g. created before client-side defaults)
+        with engine.begin() as conn:
+            conn.execute(text("DELETE FROM files WHERE ngo_name = 'Listing NGO' AND id LIKE 'legacy_%'"))
+            for i in range(6):
+                conn.execute(text(
+                    "INSERT INTO files (id, name, category, original_size, compressed_size, "
+                    "compression_ratio, compression_method, uploaded_by, ngo_name, s3_key, status) "
+                    "VALUES (:id, 'legacy.pdf', 'Legacy', 1, 1, 0, 'test', 'lister@ngo.org', "
+                    "'Listing NGO', 'legacy', 'active')"
+                ), {"id": f"legacy_{i}"})
+        normalize_sqlite_timestamps(engine)
+
+        ids = self._all_pages(limit=4, category="Legacy")
+        self.assertEqual(ids, [f"legacy_{i}" for i in range(5, -1, -1)])
+
+    def test_bad_cursor_is_rejected(self):
+        self.assertEqual(self.client.get("/files", params={"cursor": "nope"}).status_code, 400)
+
+
+
+class TestListingEncoding(unittest.TestCase):
+    """FastJSONResponse over column rows must send the JSON the ORM + jsonable_encoder path sent."""
+    TENANT = "Encoding NGO"
+
+    @classmethod
+    def setUpClass(cls):
+        main.app.dependency_overrides[get_current_user] = lambda: User(
+            email="enc@ngo.org", ngo_name=cls.TENANT, role="admin"
+        )
+        cls.client = TestClient(main.app)
+        with engine.begin() as conn:
+            conn.execute(FileRecord.__table__.delete().where(FileRecord.ngo_name == cls.TENANT))
+            conn.execute(insert(FileRecord), [{
+                "id": f"enc_{i}", "name": name, "category": "Finanzen ü",
+                "original_size": 3 * (i + 1), "compressed_size": i + 1,
+                "compression_ratio": ratio, "compression_method": "test",
+                "uploaded_by": "zoë@ngo.org", "ngo_name": cls.TENANT,
+                "uploaded_at": uploaded_at, "s3_key": f"finanzen/{name}", "status": "active"
+            } for i, (name, ratio, uploaded_at) in enumerate([
+                ("Jahresbericht_Ü.pdf", 66.66666666666667, datetime(2024, 2, 29, 23, 59, 59, 123456)),
+                ("报告 2024.pdf", 0.0, datetime(2024, 3, 1)),
+                ("quote\"and\\slash.pdf", 1e-05, datetime(2024, 3, 1, 0, 0, 0, 1)),
+                ("no-date.pdf", 50.0, None),
+                ("🎉.pdf", 100.0, datetime(2024, 3, 2, 12, 0)),
+            ])])
+
+    @classmethod
+    def tearDownClass(cls):
+        main.app.dependency_overrides.clear()
+
+    def test_listing_matches_the_orm_response(self):
+        res = self.client.get("/files", params={"sort": "name_asc", "include_total": True})
+        self.assertEqual(res.status_code, 200)
+
+        with SessionLocal() as db:
+            records = db.query(FileRecord)\
+                .filter(FileRecord.ngo_name == self.TENANT)\
+                .order_by(FileRecord.name, FileRecord.id).all()
+            # The item built from a hydrated FileRecord, as the route did before
+            old = JSONResponse(jsonable_encoder({
+                "items": [{
+                    "id": f.id,
+                    "name": f.name,
+                    "category": f.category,
+                    "original_size": f.original_size,
+                    "compressed_size": f.compressed_size,
+                    "compression_ratio": f.compression_ratio,
+                    "uploaded_by": f.uploaded_by,
+                    "uploaded_at": f.uploaded_at.isoformat() if f.uploaded_at else None,
+                    "s3_path": f.s3_key
+                } for f in records],
+                "next_cursor": None,
+                "total": len(records)
+            }))
+        self.assertEqual(len(records), 5)
+        self.assertEqual(res.json(), json.loads(old.body))
+        self.assertEqual(res.headers["content-type"], old.headers["content-type"])
+
+    def test_floats_orjson_writes_differently_parse_the_same(self):
+        content = {"ratios": [1e-05, 1.5e-07, 1e16, 1.5e+300, -0.0001, 123.456, 0.0]}
+        self.assertEqual(
+            json.loads(FastJSONResponse(content).body), json.loads(JSONResponse(content).body)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
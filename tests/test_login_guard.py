@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+
+import bcrypt
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import login_guard
+import main
+from auth import _prehash, needs_rehash
+from database import engine, SessionLocal
+from login_guard import PasswordPool, RateLimiter
+from models import User
+
+EMAIL = "guard@ngo.org"
+PASSWORD = "hunter22"
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_burst_then_refill(self):
+        limiter = RateLimiter(burst=2, per_minute=600)  # one token per 0.1s
+        self.assertEqual(limiter.acquire("a"), 0)
+        self.assertEqual(limiter.acquire("a"), 0)
+        wait = limiter.acquire("a")
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 0.1)
+        self.assertEqual(limiter.acquire("b"), 0)  # keys are independent
+        time.sleep(0.11)
+        self.assertEqual(limiter.acquire("a"), 0)
+
+
+class TestPasswordPool(unittest.TestCase):
+    def test_rejects_beyond_max_pending(self):
+        pool = PasswordPool(workers=1, max_pending=1)
+        release = threading.Event()
+
+        async def scenario():
+            first = asyncio.ensure_future(pool.run(release.wait, 5))
+            await asyncio.sleep(0.05)
+            with self.assertRaises(HTTPException) as ctx:
+                await pool.run(len, "x")
+            release.set()
+            self.assertTrue(await first)
+            self.assertEqual(await pool.run(len, "xy"), 2)
+            return ctx.exception
+
+        exc = asyncio.run(scenario())
+        self.assertEqual(exc.status_code, 503)
+        self.assertEqual(pool.snapshot()["rejected_busy"], 1)
+        self.assertEqual(pool.snapshot()["pending"], 0)
+
+    def test_cancelled_callers_still_count_until_their_job_ends(self):
+        pool = PasswordPool(workers=1, max_pending=2)
+        release = threading.Event()
+
+        async def scenario():
+            running = asyncio.ensure_future(pool.run(release.wait, 5))
+            queued = asyncio.ensure_future(pool.run(len, "x"))
+            await asyncio.sleep(0.05)
+            running.cancel()
+            await asyncio.sleep(0.05)
+            # The hash is still running, so the pool is still full
+            self.assertEqual(pool.snapshot()["pending"], 2)
+            with self.assertRaises(HTTPException):
+                await pool.run(len, "y")
+            release.set()
+            self.assertEqual(await queued, 1)
+
+        asyncio.run(scenario())
+        deadline = time.monotonic() + 5
+        while pool.snapshot()["pending"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(pool.snapshot()["pending"], 0)
+
+
+class TestLoginGuard(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        with engine.begin() as conn:
+            conn.execute(User.__table__.delete().where(User.email == EMAIL))
+        res = cls.client.post("/auth/register", json={
+            "ngo_name": "Guard NGO", "email": EMAIL, "password": PASSWORD
+        })
+        assert res.status_code == 200, res.text
+
+    def setUp(self):
+        self.patch = mock.patch.object(login_guard, "account_limiter", RateLimiter(3, 1))
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def _login(self, password: str):
+        return self.client.post("/auth/login", json={"email": EMAIL, "password": password})
+
+    def test_account_throttled_before_bcrypt(self):
+        for _ in range(3):
+            self.assertEqual(self._login("wrong").status_code, 401)
+        with mock.patch("routes.auth_routes.verify_password") as verify:
+            res = self._login(PASSWORD)
+        self.assertEqual(res.status_code, 429)
+        self.assertGreaterEqual(int(res.headers["retry-after"]), 1)
+        verify.assert_not_called()
+
+    def test_account_throttle_is_per_address(self):
+        for _ in range(3):
+            self.assertEqual(self._login("wrong").status_code, 401)
+        self.assertEqual(self._login(PASSWORD).status_code, 429)
+        # The owner signing in from elsewhere is not locked out by those guesses
+        login_guard.throttle_login("203.0.113.9", EMAIL)
+        self.assertEqual(login_guard.throttle_stats()["account"], 1)
+
+    def test_account_total_throttle_spans_addresses(self):
+        with mock.patch.object(login_guard, "account_total_limiter", RateLimiter(2, 1)):
+            login_guard.throttle_login("203.0.113.1", EMAIL)
+            login_guard.throttle_login("203.0.113.2", EMAIL)
+            with self.assertRaises(HTTPException) as ctx:
+                login_guard.throttle_login("203.0.113.3", EMAIL)
+        self.assertEqual(ctx.exception.status_code, 429)
+
+    def test_ip_throttle(self):
+        with mock.patch.object(login_guard, "ip_limiter", RateLimiter(1, 1)):
+            self.assertEqual(self._login(PASSWORD).status_code, 200)
+            res = self.client.post("/auth/login", json={"email": "other@ngo.org", "password": "x"})
+        self.assertEqual(res.status_code, 429)
+
+    def test_rehash_on_login_when_cost_changes(self):
+        old_hash = bcrypt.hashpw(_prehash(PASSWORD), bcrypt.gensalt(rounds=5)).decode()
+        with engine.begin() as conn:
+            conn.execute(
+                User.__table__.update().where(User.email == EMAIL).values(password_hash=old_hash)
+            )
+        self.assertTrue(needs_rehash(old_hash))
+
+        self.assertEqual(self._login(PASSWORD).status_code, 200)
+        with SessionLocal() as db:
+            new_hash = db.query(User.password_hash).filter(User.email == EMAIL).scalar()
+        self.assertNotEqual(new_hash, old_hash)
+        self.assertFalse(needs_rehash(new_hash))
+        self.assertEqual(self._login(PASSWORD).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
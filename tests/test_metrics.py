@@ -0,0 +1,92 @@
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+import main
+import metrics
+from compression_engine import get_compression_pool
+from database import SessionLocal
+from models import User
+from routes.file_routes import _compress_file
+from warmup import canary_files
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class TestMetrics(unittest.TestCase):
+    def test_request_latency_is_labelled_by_route_template(self):
+        client = TestClient(main.app)
+        before = sample(
+            "safekeep_http_request_duration_seconds_count",
+            method="GET", route="/files/{file_id}/download", status="401"
+        )
+        self.assertEqual(client.get("/files/f_123/download").status_code, 401)
+        self.assertEqual(client.get("/files/f_456/download").status_code, 401)
+        after = sample(
+            "safekeep_http_request_duration_seconds_count",
+            method="GET", route="/files/{file_id}/download", status="401"
+        )
+        self.assertEqual(after - before, 2)
+
+        client.get("/no/such/path")
+        self.assertGreater(sample(
+            "safekeep_http_request_duration_seconds_count",
+            method="GET", route="unmatched", status="404"
+        ), 0)
+
+    def test_compress_stage_engine_and_ratio(self):
+        name, data = canary_files()[0]
+        before_stage = sample("safekeep_upload_stage_seconds_count", stage="compress")
+        before_engine = sample("safekeep_compression_engine_seconds_count", engine="pillow")
+
+        fd, path = tempfile.mkstemp()
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        self.addCleanup(os.remove, path)
+        item = _compress_file(path, name, "medium")
+        self.addCleanup(os.remove, item["compressed_path"])
+
+        self.assertEqual(
+            sample("safekeep_upload_stage_seconds_count", stage="compress") - before_stage, 1
+        )
+        self.assertEqual(
+            sample("safekeep_compression_engine_seconds_count", engine="pillow") - before_engine, 1
+        )
+        self.assertGreater(sample(
+            "safekeep_compression_ratio_percent_count", method=item["compression_method"]
+        ), 0)
+
+    def test_db_statements_are_timed(self):
+        before = sample("safekeep_db_query_seconds_count", engine="primary", statement="SELECT")
+        with SessionLocal() as db:
+            db.query(User).first()
+        self.assertGreater(
+            sample("safekeep_db_query_seconds_count", engine="primary", statement="SELECT"), before
+        )
+
+    def test_scrape_reports_pools_and_caches(self):
+        get_compression_pool()
+
+        class FakeCache:
+            stats = {"hits": 3, "misses": 1}
+
+            def snapshot(self):
+                return {**self.stats, "entries": 2}
+
+        metrics.watch_cache("fake", FakeCache())
+        res = TestClient(main.app).get("/metrics")
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("text/plain", res.headers["content-type"])
+        self.assertIn('safekeep_pool_queue_depth{pool="compression"} 0.0', res.text)
+        self.assertIn('safekeep_cache_events_total{cache="fake",event="hits"} 3.0', res.text)
+        self.assertNotIn('event="entries"', res.text)
+        self.assertIn('safekeep_db_pool_connections{engine="sync",state="checked_out"}', res.text)
+
+
+if __name__ == '__main__':
+    unittest.main()
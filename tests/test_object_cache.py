@@ -0,0 +1,189 @@
+import io
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import main
+from database import engine
+from models import User
+from object_cache import ObjectCache, get_object_cache
+from tests.fake_s3 import fake_s3
+
+
+class FakeStore:
+    def __init__(self, objects, delay=0.0):
+        self.objects = objects
+        self.delay = delay
+        self.gets = 0
+        self.heads = 0
+        self.lock = threading.Lock()
+
+    def head(self, key):
+        self.heads += 1
+        return {"etag": f"etag-{len(self.objects[key])}", "size": len(self.objects[key])}
+
+    def open(self, key):
+        with self.lock:
+            self.gets += 1
+        time.sleep(self.delay)
+        data = self.objects[key]
+        return f"etag-{len(data)}", len(data), io.BytesIO(data)
+
+
+class TestObjectCache(unittest.TestCase):
+    def _cache(self, store, max_bytes=1000):
+        return ObjectCache(tempfile.mkdtemp(), max_bytes, 300, store.head, store.open)
+
+    def test_hit_after_miss(self):
+        store = FakeStore({"a": b"x" * 100})
+        cache = self._cache(store)
+
+        path = cache.acquire("a")
+        self.assertEqual(cache.acquire("a"), path)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"x" * 100)
+        self.assertEqual(store.gets, 1)
+        self.assertEqual(cache.snapshot()["hits"], 1)
+
+    def test_concurrent_misses_are_coalesced(self):
+        store = FakeStore({"a": b"x" * 100}, delay=0.2)
+        cache = self._cache(store)
+
+        threads = [threading.Thread(target=cache.acquire, args=("a",)) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(store.gets, 1)
+        self.assertEqual(cache.snapshot()["coalesced"] + cache.snapshot()["hits"], 7)
+
+    def test_lru_eviction_respects_budget(self):
+        store = FakeStore({k: k.encode() * 400 for k in "abc"})
+        cache = self._cache(store, max_bytes=1000)
+
+        cache.acquire("a")
+        cache.acquire("b")
+        cache.acquire("a")  # a is now most recent
+        cache.acquire("c")  # evicts b
+
+        stats = cache.snapshot()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertLessEqual(stats["bytes"], 1000)
+        cache.acquire("a")
+        self.assertEqual(store.gets, 3)
+
+    def test_oversized_objects_bypass_cache_without_a_get(self):
+        store = FakeStore({"big": b"x" * 2000})
+        cache = self._cache(store, max_bytes=1000)
+        self.assertIsNone(cache.acquire("big"))
+        self.assertEqual((store.heads, store.gets), (1, 0))
+
+        # A caller that knows the size saves the HEAD too
+        self.assertIsNone(cache.acquire("big", size=2000))
+        self.assertEqual((store.heads, store.gets), (1, 0))
+        self.assertEqual(cache.snapshot()["bypassed"], 2)
+
+    def test_known_size_skips_the_head_on_a_miss(self):
+        store = FakeStore({"a": b"x" * 100})
+        cache = self._cache(store)
+        self.assertIsNotNone(cache.acquire("a", size=100))
+        self.assertEqual((store.heads, store.gets), (0, 1))
+
+    def test_evicted_file_survives_until_released(self):
+        store = FakeStore({k: k.encode() * 400 for k in "abc"})
+        cache = self._cache(store, max_bytes=1000)
+
+        path = cache.acquire("a")
+        cache.release(cache.acquire("b"))
+        cache.release(cache.acquire("c"))  # evicts a while it is still pinned
+
+        self.assertEqual(cache.snapshot()["evictions"], 1)
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), b"a" * 400)
+        cache.release(path)
+        self.assertFalse(os.path.exists(path))
+
+    def test_coalesced_waiters_each_hold_a_pin(self):
+        store = FakeStore({"a": b"a" * 400, "b": b"b" * 400, "c": b"c" * 400}, delay=0.2)
+        cache = self._cache(store, max_bytes=1000)
+
+        paths = []
+        threads = [
+            threading.Thread(target=lambda: paths.append(cache.acquire("a"))) for _ in range(3)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(store.gets, 1)
+
+        cache.release(cache.acquire("b"))
+        cache.release(cache.acquire("c"))  # evicts a
+        for path in paths:
+            self.assertTrue(os.path.exists(path))
+            cache.release(path)
+        self.assertFalse(os.path.exists(paths[0]))
+
+
+
+class TestCachedDownload(unittest.TestCase):
+    EMAIL, NGO = "staff@cache.org", "Cache NGO"
+
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        with engine.begin() as conn:
+            conn.execute(User.__table__.delete().where(User.email == cls.EMAIL))
+        cls.client.post("/auth/register", json={
+            "ngo_name": cls.NGO, "email": cls.EMAIL, "password": "cache pass", "role": "staff"
+        })
+        res = cls.client.post("/auth/login", json={"email": cls.EMAIL, "password": "cache pass"})
+        assert res.status_code == 200, res.text
+        cls.auth = {"Authorization": f"Bearer {res.json()['token']}"}
+
+    def setUp(self):
+        patcher = fake_s3()
+        self.s3 = patcher.__enter__() # pylint: disable=unnecessary-dunder-call
+        self.addCleanup(patcher.__exit__, None, None, None)
+        self.cache = get_object_cache()
+        self.cache.clear()
+
+        res = self.client.post(
+            "/files/upload", headers=self.auth,
+            data={"category": "Finance", "user_email": self.EMAIL},
+            files={"upload": ("notes.txt", b"plain text " * 50, "text/plain")}
+        )
+        self.assertEqual(res.status_code, 200, res.text)
+        self.file_id = res.json()["id"]
+        self.stored = self.s3.objects[self.s3.operations("UploadFile")[0]]["data"]
+
+    def _download(self):
+        res = self.client.get(
+            f"/files/{self.file_id}/download", params={"user_email": self.EMAIL}, headers=self.auth
+        )
+        self.assertEqual(res.status_code, 200, res.text)
+        return res.content
+
+    def test_served_from_the_cache_and_unpinned_afterwards(self):
+        self.assertEqual(self._download(), self.stored)
+        self.assertEqual(self._download(), self.stored)
+        # The record's size stands in for a HEAD, and the second request is a hit
+        self.assertEqual(self.s3.operations("HeadObject"), [])
+        self.assertEqual(len(self.s3.operations("GetObject")), 1)
+        self.assertEqual(self.cache._pins, {}) # pylint: disable=protected-access
+
+    def test_object_larger_than_the_cache_is_fetched_once(self):
+        with mock.patch.object(self.cache, "max_bytes", 10):
+            self.assertEqual(self._download(), self.stored)
+        self.assertEqual(len(self.s3.operations("GetObject")), 1)
+        self.assertEqual(self.cache.snapshot()["entries"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
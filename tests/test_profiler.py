@@ -0,0 +1,179 @@
+import os
+import asyncio
+import tempfile
+import threading
+import unittest
+
+from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.testclient import TestClient
+
+import main
+from auth import hash_password
+from compression_engine import compress_upload, get_compression_pool
+from database import engine
+from models import User
+from profiler import (
+    ProfilingMiddleware, UNATTRIBUTED_DIR, attributed, save_profile, list_profiles, load_profile
+)
+from warmup import canary_files
+
+
+PASSWORD = "profile pass"
+USERS = {
+    "admin": ("admin@profile.org", "Profile NGO", "admin"),
+    "staff": ("staff@profile.org", "Profile NGO", "staff"),
+    "other": ("admin@other-profile.org", "Other Profile NGO", "admin"),
+    "revoked": ("revoked@profile.org", "Profile NGO", "admin"),
+}
+_tokens = {}
+
+
+def _auth(who: str = "admin") -> dict:
+    return {"Authorization": f"Bearer {_tokens[who]}"}
+
+
+class TestRequestProfiling(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.client = TestClient(main.app)
+        for who, (email, ngo_name, role) in USERS.items():
+            with engine.begin() as conn:
+                conn.execute(User.__table__.delete().where(User.email == email))
+            cls.client.post("/auth/register", json={
+                "ngo_name": ngo_name, "email": email, "password": PASSWORD, "role": role
+            })
+            res = cls.client.post("/auth/login", json={"email": email, "password": PASSWORD})
+            assert res.status_code == 200, res.text
+            _tokens[who] = res.json()["token"]
+
+    def test_admin_flag_profiles_the_request(self):
+        res = self.client.get("/health", headers={**_auth(), "X-Profile": "1"})
+        self.assertEqual(res.status_code, 200)
+        profile_id = res.headers["x-profile-id"]
+
+        profile = self.client.get(f"/admin/profiles/{profile_id}", headers=_auth()).json()
+        self.assertEqual(profile["trigger"], "requested")
+        self.assertEqual(profile["path"], "/health")
+        self.assertEqual(profile["status"], 200)
+        self.assertGreaterEqual(profile["wall_ms"], 0)
+        self.assertIn("tracemalloc_peak_bytes", profile)
+
+        listed = self.client.get("/admin/profiles", headers=_auth()).json()
+        self.assertIn(profile_id, [p["id"] for p in listed])
+        self.assertNotIn("stacks", listed[0])
+
+        collapsed = self.client.get(
+            f"/admin/profiles/{profile_id}", params={"format": "collapsed"}, headers=_auth()
+        )
+        self.assertEqual(collapsed.headers["content-type"].split(";")[0], "text/plain")
+
+    def test_query_flag_works_too(self):
+        res = self.client.get("/health", params={"profile": "1"}, headers=_auth())
+        self.assertIn("x-profile-id", res.headers)
+
+    def test_flag_is_ignored_for_non_admins_and_anonymous_requests(self):
+        self.assertNotIn(
+            "x-profile-id",
+            self.client.get("/health", headers={**_auth("staff"), "X-Profile": "1"}).headers
+        )
+        self.assertNotIn("x-profile-id", self.client.get("/health?profile=1").headers)
+
+    def test_flag_is_ignored_for_revoked_tokens(self):
+        self.assertEqual(self.client.post("/auth/logout", headers=_auth("revoked")).status_code, 200)
+        res = self.client.get("/health", headers={**_auth("revoked"), "X-Profile": "1"})
+        self.assertNotIn("x-profile-id", res.headers)
+
+    def test_profiles_are_scoped_to_the_tenant(self):
+        res = self.client.get("/health", headers={**_auth(), "X-Profile": "1"})
+        profile_id = res.headers["x-profile-id"]
+        other = _auth("other")
+        self.assertEqual(
+            self.client.get(f"/admin/profiles/{profile_id}", headers=other).status_code, 404
+        )
+        self.assertEqual(
+            self.client.get(f"/admin/profiles/{profile_id}", headers=_auth("staff")).status_code,
+            403
+        )
+        self.assertEqual(
+            self.client.get("/admin/profiles/..%2F..%2Fetc", headers=_auth()).status_code, 404
+        )
+
+    def test_sampled_mode_sees_work_on_pool_threads(self):
+        app = FastAPI()
+        name, data = canary_files()[0]
+
+        @app.get("/compress")
+        async def compress():
+            for _ in range(10):
+                await run_in_threadpool(compress_upload, data, name)
+            return {"ok": True}
+
+        app.add_middleware(ProfilingMiddleware, sample_rate=1.0)
+        profile_id = TestClient(app).get("/compress").headers["x-profile-id"]
+        # Without a tenant it is kept apart, under a cap of its own
+        self.assertIsNone(load_profile(profile_id))
+        profile = load_profile(profile_id, UNATTRIBUTED_DIR)
+        self.assertEqual(profile["trigger"], "sampled")
+        self.assertIsNone(profile["ngo_name"])
+        self.assertGreater(profile["samples"], 0)
+        self.assertTrue(any(
+            "compression_engine.py:compress_image_really" in stack for stack in profile["stacks"]
+        ))
+
+    def test_concurrent_requests_stay_out_of_the_profile(self):
+        app = FastAPI()
+        name, data = canary_files()[0]
+        profiled_started, other_started, profiled_done = (threading.Event() for _ in range(3))
+
+        @app.get("/profiled")
+        async def profiled():
+            profiled_started.set()
+            await run_in_threadpool(other_started.wait, 10)
+            for _ in range(10):
+                # On the backend's own executor, not AnyIO's
+                job = get_compression_pool().submit(attributed(compress_upload), data, name)
+                await asyncio.wrap_future(job)
+            profiled_done.set()
+            return {"ok": True}
+
+        @app.get("/other")
+        def other():
+            other_started.set()
+            while not profiled_done.is_set():
+                hash_password("another tenant's request")
+            return {"ok": True}
+
+        # Everything is sampled, but one request at a time: /other runs unprofiled
+        app.add_middleware(ProfilingMiddleware, sample_rate=1.0)
+        client, responses = TestClient(app), {}
+
+        def get(path):
+            responses[path] = client.get(path)
+
+        first = threading.Thread(target=get, args=("/profiled",))
+        first.start()
+        self.assertTrue(profiled_started.wait(10))
+        get("/other")
+        first.join()
+
+        self.assertNotIn("x-profile-id", responses["/other"].headers)
+        profile = load_profile(responses["/profiled"].headers["x-profile-id"], UNATTRIBUTED_DIR)
+        stacks = "\n".join(profile["stacks"])
+        self.assertIn("compression_engine.py:compress_image_really", stacks)
+        self.assertNotIn("auth.py:hash_password", stacks)
+
+    def test_only_the_newest_profiles_are_kept(self):
+        directory = tempfile.mkdtemp()
+        for profile_id in ("01A", "01B", "01C"):
+            save_profile(
+                {"id": profile_id, "ngo_name": "Keep NGO", "stacks": {}}, directory, keep=2
+            )
+        self.assertEqual(sorted(os.listdir(directory)), ["01B.json", "01C.json"])
+        self.assertEqual(
+            [p["id"] for p in list_profiles("Keep NGO", directory)], ["01C", "01B"]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+import usage_stats
+from audit_sink import AuditSink
+from database import engine, async_engine, SessionLocal
+from dependencies import get_current_user
+from models import FileRecord, User
+from response_cache import ResponseCache
+
+TENANT = "Cache NGO"
+
+
+def _add_file(file_id: str):
+    db = SessionLocal()
+    db.add(FileRecord(
+        id=file_id, name=f"{file_id}.pdf", category="Finance", original_size=10,
+        compressed_size=5, compression_ratio=50.0, compression_method="test",
+        uploaded_by="c@ngo.org", ngo_name=TENANT, s3_key=file_id, status="active"
+    ))
+    usage_stats.record_upload(db, TENANT, "Finance", 10, 5)
+    db.commit()
+    db.close()
+
+
+class TestResponseCache(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        main.app.dependency_overrides[get_current_user] = lambda: User(
+            email="c@ngo.org", ngo_name=TENANT, role="admin"
+        )
+        cls.client = TestClient(main.app)
+        with engine.begin() as conn:
+            conn.execute(FileRecord.__table__.delete().where(FileRecord.ngo_name == TENANT))
+        _add_file("cache_1")
+
+    @classmethod
+    def tearDownClass(cls):
+        main.app.dependency_overrides.clear()
+
+    def _queries(self, path, headers=None):
+        statements = []
+
+        def _capture(_conn, _cursor, statement, _parameters, _context, _executemany):
+            statements.append(statement.lower())
+
+        event.listen(async_engine.sync_engine, "before_cursor_execute", _capture)
+        try:
+            res = self.client.get(path, headers=headers or {})
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", _capture)
+        return res, statements
+
+    def test_repeat_listing_costs_one_version_read(self):
+        first, _ = self._queries("/files?limit=7")
+        second, statements = self._queries("/files?limit=7")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.headers["etag"], first.headers["etag"])
+        self.assertEqual(len(statements), 1)
+        self.assertIn("tenant_versions", statements[0])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get("/files").headers["etag"]
+        res = self.client.get("/files", headers={"If-None-Match": etag})
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res.content, b"")
+        self.assertEqual(res.headers["etag"], etag)
+
+    def test_upload_and_delete_invalidate(self):
+        before = self.client.get("/files")
+        _add_file("cache_2")
+        after = self.client.get("/files", headers={"If-None-Match": before.headers["etag"]})
+        self.assertEqual(after.status_code, 200)
+        self.assertIn("cache_2", {f["id"] for f in after.json()["items"]})
+
+        self.client.delete("/files/cache_2", params={"user_email": "c@ngo.org"})
+        ids = {f["id"] for f in self.client.get("/files").json()["items"]}
+        self.assertNotIn("cache_2", ids)
+
+    def test_params_are_part_of_the_key(self):
+        a = self.client.get("/files", params={"sort": "newest"}).headers["etag"]
+        b = self.client.get("/files", params={"sort": "oldest"}).headers["etag"]
+        self.assertNotEqual(a, b)
+
+    def test_audit_batch_invalidates_audit_listing(self):
+        before = self.client.get("/audit").headers["etag"]
+        sink = AuditSink(engine, tempfile.mkdtemp(), flush_interval=0.01)
+        sink.record("c@ngo.org", TENANT, "LOGIN", "System", "Success")
+        sink.close()
+        res = self.client.get("/audit", headers={"If-None-Match": before})
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["items"][0]["action"], "LOGIN")
+
+
+class TestResponseCacheLru(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(max_bytes=10)
+        cache.put("a", b"aaaa")
+        cache.put("b", b"bbbb")
+        cache.get("a")
+        cache.put("c", b"cccc")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), b"aaaa")
+        self.assertEqual(cache.snapshot()["evictions"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
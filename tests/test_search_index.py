@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from fastapi.testclient import TestClient
+
+import main
+import search_index
+from database import SessionLocal
+from dependencies import get_current_user
+from models import FileRecord, User
+
+
+def _pdf_with_text(body: str) -> str:
+    doc = search_index.load_fitz().open()
+    doc.new_page().insert_text((72, 72), body)
+    path = os.path.join(tempfile.mkdtemp(), "r.pdf")
+    doc.save(path)
+    doc.close()
+    return path
+
+
+class TestSearchIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        main.app.dependency_overrides[get_current_user] = lambda: User(
+            email="s@ngo.org", ngo_name="Search NGO", role="admin"
+        )
+        cls.client = TestClient(main.app)
+
+        docs = [
+            ("srch_1", "scan_0001.pdf", "Donors", "Official donor receipt for Jane Doe"),
+            ("srch_2", "donor_list.csv", "Donors", "name,amount"),
+            ("srch_3", "budget.pdf", "Finance", "Quarterly budget overview"),
+        ]
+        db = SessionLocal()
+        for file_id, name, category, content in docs:
+            db.add(FileRecord(
+                id=file_id, name=name, category=category, original_size=1, compressed_size=1,
+                compression_ratio=0.0, compression_method="test", uploaded_by="s@ngo.org",
+                ngo_name="Search NGO", s3_key=file_id, status="active"
+            ))
+            search_index.index_file(db, file_id, "Search NGO", name, category, content)
+        search_index.index_file(db, "srch_x", "Other NGO", "donor.pdf", "Donors", "donor receipt")
+        db.commit()
+        db.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        main.app.dependency_overrides.clear()
+
+    @unittest.skipIf(search_index.load_fitz() is None, "PyMuPDF not installed")
+    def test_extracts_pdf_text(self):
+        text = search_index.extract_text(_pdf_with_text("Donor receipt 2024"), "r.pdf")
+        self.assertIn("Donor receipt 2024", text)
+
+    def test_content_and_name_matches_are_ranked_and_tenant_scoped(self):
+        items = self.client.get("/files/search", params={"q": "donor"}).json()["items"]
+        self.assertEqual({i["id"] for i in items}, {"srch_1", "srch_2"})
+        # Name hits are weighted above body text
+        self.assertEqual(items[0]["id"], "srch_2")
+
+        items = self.client.get("/files/search", params={"q": "donor rece"}).json()["items"]
+        self.assertEqual([i["id"] for i in items], ["srch_1"])
+        self.assertIn("[receipt]", items[0]["snippet"])
+
+    def test_pagination_and_category_filter(self):
+        page = self.client.get("/files/search", params={"q": "donor", "limit": 1}).json()
+        self.assertEqual(len(page["items"]), 1)
+        page2 = self.client.get(
+            "/files/search", params={"q": "donor", "limit": 1, "cursor": page["next_cursor"]}
+        ).json()
+        self.assertEqual(len(page2["items"]), 1)
+        self.assertIsNone(page2["next_cursor"])
+
+        items = self.client.get(
+            "/files/search", params={"q": "budget", "category": "Donors"}
+        ).json()["items"]
+        self.assertEqual(items, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
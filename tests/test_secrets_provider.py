@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import tempfile
+import subprocess
+import time
+import threading
+import unittest
+from unittest import mock
+
+from cryptography.fernet import Fernet
+
+import config
+import secrets_provider
+from secrets_provider import SecretsProvider
+from benchmarks.startup import BACKEND_DIR
+
+# Runs in a fresh interpreter with a stub in place of aws_secrets, which counts fetches
+IMPORT_WITH_SECRETS = """
+import sys, json, types
+fetches = []
+stub = types.ModuleType("aws_secrets")
+stub.get_secret = lambda name, region_name=None: fetches.append(name) or {"JWT_SECRET": "fetched"}
+sys.modules["aws_secrets"] = stub
+import main, config
+after_import = {
+    "fetches": len(fetches), "provider": config._provider is not None,
+    "aws_sdk": sorted(m for m in ("boto3", "botocore") if m in sys.modules),
+}
+import auth
+from models import User
+auth.decode_token(auth.create_token(User(email="a@ngo.org", ngo_name="N", role="admin")))
+print(json.dumps({"after_import": after_import, "fetches": len(fetches), "secret": config.JWT_SECRET}))
+"""
+
+
+class StubSecrets:
+    """Stands in for Secrets Manager: counts calls and can be made to fail."""
+
+    def __init__(self, values):
+        self.values = values
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("endpoint unreachable")
+        return dict(self.values)
+
+
+class TestSecretsProvider(unittest.TestCase):
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), "secrets.cache")
+        self.key = Fernet.generate_key().decode()
+        self.stub = StubSecrets({"JWT_SECRET": "s3cret-value"})
+        self.providers = []
+
+    def tearDown(self):
+        for provider in self.providers:
+            provider.close()
+
+    def _provider(self, key=None, ttl=3600.0):
+        provider = SecretsProvider(self.stub, self.path, key or self.key, ttl)
+        self.providers.append(provider)
+        return provider
+
+    def test_fetches_lazily_once(self):
+        provider = self._provider()
+        self.assertEqual(self.stub.calls, 0)
+        self.assertEqual(provider.get("JWT_SECRET"), "s3cret-value")
+        self.assertEqual(provider.get("MISSING", "default"), "default")
+        self.assertEqual(self.stub.calls, 1)
+
+    def test_warm_start_reads_encrypted_cache_without_fetching(self):
+        self._provider().get("JWT_SECRET")
+        with open(self.path, "rb") as f:
+            self.assertNotIn(b"s3cret-value", f.read())
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+        self.stub.fail = True
+        self.assertEqual(self._provider().get("JWT_SECRET"), "s3cret-value")
+        self.assertEqual(self.stub.calls, 1)
+
+    def test_cache_under_another_key_is_ignored(self):
+        self._provider().get("JWT_SECRET")
+        other = self._provider(key=Fernet.generate_key().decode())
+        self.assertEqual(other.get("JWT_SECRET"), "s3cret-value")
+        self.assertEqual(self.stub.calls, 2)
+
+    def test_stale_cache_serves_then_refreshes_in_background(self):
+        self._provider(ttl=0.2).get("JWT_SECRET")
+        time.sleep(0.25)
+        self.stub.values = {"JWT_SECRET": "rotated"}
+
+        provider = self._provider(ttl=0.2)
+        self.assertEqual(provider.get("JWT_SECRET"), "s3cret-value")
+        deadline = time.time() + 2
+        while provider.get("JWT_SECRET") != "rotated" and time.time() < deadline:
+            time.sleep(0.02)
+        self.assertEqual(provider.get("JWT_SECRET"), "rotated")
+
+    def test_failed_fetch_without_cache_falls_back(self):
+        self.stub.fail = True
+        provider = self._provider()
+        self.assertIsNone(provider.get("JWT_SECRET"))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_failed_refresh_keeps_values(self):
+        provider = self._provider()
+        provider.get("JWT_SECRET")
+        self.stub.fail = True
+        self.assertFalse(provider.refresh())
+        self.assertEqual(provider.get("JWT_SECRET"), "s3cret-value")
+
+
+class TestConfigSecrets(unittest.TestCase):
+    def test_rotated_jwt_secret_reaches_config_without_a_restart(self):
+        stub = StubSecrets({"JWT_SECRET": "before"})
+        provider = SecretsProvider(stub)
+        self.addCleanup(provider.close)
+        with mock.patch.object(config, "_provider", provider):
+            self.assertEqual(config.JWT_SECRET, "before")
+            stub.values = {"JWT_SECRET": "after"}
+            self.assertTrue(provider.refresh())
+            self.assertEqual(config.JWT_SECRET, "after")
+
+    def test_concurrent_first_reads_build_one_provider(self):
+        built = []
+
+        class SlowProvider(SecretsProvider):
+            def __init__(self, *args):
+                time.sleep(0.05)  # widen the window two unguarded threads would both enter
+                super().__init__(*args)
+                built.append(self)
+
+        stub_module = mock.Mock(get_secret=lambda name: {"JWT_SECRET": "x"})
+        barrier, seen = threading.Barrier(8), []
+
+        def first_read():
+            barrier.wait()
+            seen.append(config.get_secrets_provider())
+
+        with mock.patch.object(config, "_provider", None), \
+                mock.patch.object(config, "AWS_SECRET_NAME", "safekeep/test"), \
+                mock.patch.object(config, "SECRETS_CACHE_KEY", None), \
+                mock.patch.object(secrets_provider, "SecretsProvider", SlowProvider), \
+                mock.patch.dict(sys.modules, {"aws_secrets": stub_module}):
+            threads = [threading.Thread(target=first_read) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        self.assertEqual(len(built), 1)
+        self.assertEqual({id(p) for p in seen}, {id(built[0])})
+
+
+class TestSecretsAtStartup(unittest.TestCase):
+    def test_import_main_resolves_nothing_and_first_use_reads_the_cache(self):
+        directory = tempfile.mkdtemp()
+        path, key = os.path.join(directory, "secrets.cache"), Fernet.generate_key().decode()
+        warm = SecretsProvider(StubSecrets({"JWT_SECRET": "from-cache"}), path, key)
+        warm.get("JWT_SECRET")
+        warm.close()
+
+        env = {
+            **os.environ, "AWS_SECRET_NAME": "safekeep/test", "SECRETS_CACHE_PATH": path,
+            "SECRETS_CACHE_KEY": key, "DATABASE_URL": f"sqlite:///{directory}/startup.db",
+        }
+        env.pop("JWT_SECRET", None)
+        proc = subprocess.run(
+            [sys.executable, "-c", IMPORT_WITH_SECRETS],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        self.assertEqual(
+            result["after_import"], {"fetches": 0, "provider": False, "aws_sdk": []}
+        )
+        self.assertEqual(result["secret"], "from-cache")
+        self.assertEqual(result["fetches"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
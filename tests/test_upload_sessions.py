@@ -0,0 +1,127 @@
+import os
+import time
+import hashlib
+import unittest
+import multiprocessing
+
+import upload_sessions
+from config import UPLOAD_SCRATCH_DIR, UPLOAD_SESSION_MAX_BYTES
+from upload_sessions import UploadSessionError
+
+
+def _write_chunks(upload_id, chunks):
+    """One worker process writing its share of a session's chunks."""
+    for offset, chunk in chunks:
+        upload_sessions.write_chunk(
+            upload_id, "NGO A", offset, chunk, hashlib.sha256(chunk).hexdigest()
+        )
+
+
+class TestUploadSessions(unittest.TestCase):
+    def setUp(self):
+        self.data = bytes(range(256)) * 40  # 10240 bytes
+        self.session = upload_sessions.create_session(
+            "NGO A", "a@ngo.org", "report.pdf", "Finance", len(self.data),
+            sha256=hashlib.sha256(self.data).hexdigest()
+        )
+        self.upload_id = self.session["upload_id"]
+
+    def tearDown(self):
+        upload_sessions.discard_session(self.upload_id)
+
+    def _put(self, offset, size):
+        chunk = self.data[offset:offset + size]
+        return upload_sessions.write_chunk(
+            self.upload_id, "NGO A", offset, chunk, hashlib.sha256(chunk).hexdigest()
+        )
+
+    def test_out_of_order_chunks_resume_and_complete(self):
+        status = self._put(4096, 4096)
+        self.assertEqual(status["offset"], 0)
+        self.assertEqual(status["received"], 4096)
+
+        status = self._put(0, 4096)
+        self.assertEqual(status["offset"], 8192)
+        self.assertFalse(status["complete"])
+
+        with self.assertRaises(UploadSessionError) as ctx:
+            upload_sessions.read_completed(self.upload_id, "NGO A")
+        self.assertEqual(ctx.exception.status_code, 409)
+
+        status = self._put(8192, 4096)
+        self.assertTrue(status["complete"])
+        _, path = upload_sessions.read_completed(self.upload_id, "NGO A")
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_checksum_mismatch_is_rejected(self):
+        with self.assertRaises(UploadSessionError) as ctx:
+            upload_sessions.write_chunk(self.upload_id, "NGO A", 0, b"abc", "0" * 64)
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertEqual(upload_sessions.get_session(self.upload_id, "NGO A")["ranges"], [])
+
+    def test_chunk_without_checksum_is_rejected(self):
+        for checksum in (None, ""):
+            with self.assertRaises(UploadSessionError) as ctx:
+                upload_sessions.write_chunk(self.upload_id, "NGO A", 0, self.data[:10], checksum)
+            self.assertEqual(ctx.exception.status_code, 400)
+        self.assertEqual(upload_sessions.get_session(self.upload_id, "NGO A")["ranges"], [])
+
+    def test_size_above_the_limit_is_rejected_before_allocating(self):
+        before = set(os.listdir(UPLOAD_SCRATCH_DIR))
+        with self.assertRaises(UploadSessionError) as ctx:
+            upload_sessions.create_session(
+                "NGO A", "a@ngo.org", "huge.bin", "Finance", UPLOAD_SESSION_MAX_BYTES + 1
+            )
+        self.assertEqual(ctx.exception.status_code, 413)
+        self.assertEqual(set(os.listdir(UPLOAD_SCRATCH_DIR)), before)
+
+    def test_whole_file_checksum_mismatch_is_rejected(self):
+        session = upload_sessions.create_session(
+            "NGO A", "a@ngo.org", "report.pdf", "Finance", 3, sha256="0" * 64
+        )
+        self.addCleanup(upload_sessions.discard_session, session["upload_id"])
+        upload_sessions.write_chunk(
+            session["upload_id"], "NGO A", 0, b"abc", hashlib.sha256(b"abc").hexdigest()
+        )
+        with self.assertRaises(UploadSessionError) as ctx:
+            upload_sessions.read_completed(session["upload_id"], "NGO A")
+        self.assertEqual(ctx.exception.status_code, 422)
+
+    def test_chunks_from_several_workers_are_all_recorded(self):
+        chunks = [(offset, self.data[offset:offset + 64]) for offset in range(0, len(self.data), 64)]
+        workers = [
+            multiprocessing.get_context("fork").Process(
+                target=_write_chunks, args=(self.upload_id, chunks[i::4])
+            ) for i in range(4)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual([worker.exitcode for worker in workers], [0] * 4)
+
+        status = upload_sessions.session_status(
+            upload_sessions.get_session(self.upload_id, "NGO A")
+        )
+        self.assertEqual(status["ranges"], [[0, len(self.data)]])
+        self.assertTrue(status["complete"])
+
+    def test_cleanup_forgets_the_lock_of_an_expired_session(self):
+        self._put(0, 10)
+        self.assertIn(self.upload_id, upload_sessions._locks) # pylint: disable=protected-access
+        stale = time.time() - upload_sessions.UPLOAD_SESSION_TTL - 60
+        os.utime(os.path.join(UPLOAD_SCRATCH_DIR, self.upload_id, "meta.json"), (stale, stale))
+
+        upload_sessions.cleanup_expired_sessions()
+        self.assertFalse(os.path.exists(os.path.join(UPLOAD_SCRATCH_DIR, self.upload_id)))
+        self.assertNotIn(self.upload_id, upload_sessions._locks) # pylint: disable=protected-access
+
+    def test_other_tenant_cannot_see_session(self):
+        with self.assertRaises(UploadSessionError) as ctx:
+            upload_sessions.get_session(self.upload_id, "NGO B")
+        self.assertEqual(ctx.exception.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
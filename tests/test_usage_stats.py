@@ -0,0 +1,51 @@
+import unittest
+
+import usage_stats
+from database import SessionLocal
+from models import FileRecord
+
+
+class TestUsageStats(unittest.TestCase):
+    def setUp(self):
+        self.db = SessionLocal()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_counters_follow_uploads_and_deletes(self):
+        usage_stats.record_upload(self.db, "Usage NGO", "Finance", 1000, 400)
+        usage_stats.record_upload(self.db, "Usage NGO", "Finance", 500, 500)
+        usage_stats.record_upload(self.db, "Usage NGO", "Donors", 200, 100)
+        usage_stats.record_delete(self.db, "Usage NGO", "Donors", 200, 100)
+        self.db.commit()
+
+        stats = usage_stats.get_stats(self.db, "Usage NGO")
+        self.assertEqual(stats["total_files"], 2)
+        self.assertEqual(stats["total_storage_original"], 1500)
+        self.assertEqual(stats["total_storage_compressed"], 900)
+        self.assertAlmostEqual(stats["compression_savings_pct"], 40.0)
+        self.assertIsNotNone(stats["last_upload"])
+        self.assertEqual([c["category"] for c in stats["categories"]], ["Finance"])
+
+    def test_reconcile_rebuilds_from_files(self):
+        for i, status in enumerate(["active", "active", "deleted"]):
+            self.db.add(FileRecord(
+                id=f"usage_{i}", name=f"f{i}.pdf", category="Programs",
+                original_size=100, compressed_size=60, compression_ratio=40.0,
+                compression_method="test", uploaded_by="u@ngo.org",
+                ngo_name="Reconcile NGO", s3_key=f"k{i}", status=status
+            ))
+        # Drifted counters
+        usage_stats.record_upload(self.db, "Reconcile NGO", "Programs", 9999, 9999, count=7)
+        self.db.commit()
+
+        usage_stats.reconcile(self.db, "Reconcile NGO")
+
+        stats = usage_stats.get_stats(self.db, "Reconcile NGO")
+        self.assertEqual(stats["total_files"], 2)
+        self.assertEqual(stats["total_storage_original"], 200)
+        self.assertEqual(stats["total_storage_compressed"], 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from fastapi.testclient import TestClient
+
+import main
+from warmup import Warmup, WarmupSkipped
+
+
+class TestWarmup(unittest.TestCase):
+    def test_real_stages(self):
+        warmup = Warmup()
+        asyncio.run(warmup.run())
+        state = warmup.snapshot()
+        self.assertTrue(state["ready"])
+        self.assertEqual(state["stages"]["database"]["status"], "ok")
+        self.assertEqual(state["stages"]["s3"]["status"], "skipped")  # no bucket in tests
+        self.assertEqual(state["stages"]["codecs"]["status"], "ok")
+        self.assertEqual(state["stages"]["compression"]["status"], "ok")
+
+    def test_required_stage_is_retried_and_optional_failures_do_not_block(self):
+        attempts = []
+
+        async def flaky_db():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise ConnectionError("database starting")
+            return "up"
+
+        async def broken():
+            raise RuntimeError("no codec")
+
+        async def not_configured():
+            raise WarmupSkipped("not configured")
+
+        warmup = Warmup(
+            [("database", flaky_db), ("codecs", broken), ("s3", not_configured)],
+            retry_seconds=0.01
+        )
+        asyncio.run(warmup.run())
+        self.assertTrue(warmup.ready)
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(warmup.results["database"]["status"], "ok")
+        self.assertEqual(warmup.results["codecs"]["status"], "failed")
+        self.assertEqual(warmup.results["s3"]["status"], "skipped")
+
+    def test_slow_stage_times_out(self):
+        async def hangs():
+            await asyncio.sleep(5)
+
+        warmup = Warmup([("s3", hangs)], timeout=0.05)
+        asyncio.run(warmup.run())
+        self.assertTrue(warmup.ready)
+        self.assertIn("TimeoutError", warmup.results["s3"]["detail"])
+
+    def test_ready_is_503_until_warm(self):
+        client = TestClient(main.app)
+        warmup = Warmup([])
+        with mock.patch.object(main, "get_warmup", return_value=warmup):
+            res = client.get("/ready")
+            self.assertEqual(res.status_code, 503)
+            self.assertFalse(res.json()["ready"])
+            self.assertEqual(client.get("/health").status_code, 200)
+
+            warmup.mark_ready()
+            self.assertEqual(client.get("/ready").status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()